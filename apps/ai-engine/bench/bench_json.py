@@ -0,0 +1,212 @@
+"""
+Micro-benchmark jalur parsing output model & serialisasi response.
+
+Membandingkan jalur lama (split code fence + regex greedy `\\{.*\\}` + json.loads + Model(**data),
+`_completed_fields` yang men-scan ulang buffer setiap chunk, json.dumps) dengan
+src/services/json_parsing (bracket-balanced extractor, orjson jika terpasang, scanner inkremental)
+pada ukuran response yang realistis: analisis (~2 KB), data CV (~10 KB), dan mode combined (~25 KB).
+Juga menghitung berapa output terpotong yang bisa dipulihkan oleh `allow_partial`.
+
+Jalankan dari apps/ai-engine:
+    python -m bench.bench_json [--repeat 200]
+"""
+import re
+import json
+import time
+import random
+import argparse
+
+from bench.corpus import VOCABULARY
+from bench.fake_gemini import SAMPLE_ANALYSIS, SAMPLE_CV
+from src.schemas import AnalysisResponse, ImprovedCVResult, CombinedAnalysisResult
+from src.services.json_parsing import parse_model, dumps, JsonFieldScanner, JSON_BACKEND
+
+
+def legacy_clean_json_text(text: str) -> str:
+    """Salinan clean_json_text lama dari ai_engine sebagai baseline."""
+    try:
+        if "```json" in text:
+            return text.split("```json")[1].split("```")[0].strip()
+        elif "```" in text:
+            return text.split("```")[1].split("```")[0].strip()
+        match = re.search(r'\{.*\}', text, re.DOTALL)
+        if match:
+            return match.group(0)
+        return text.strip()
+    except Exception:
+        return text
+
+
+def legacy_completed_fields(text: str) -> dict:
+    """Salinan _completed_fields lama (scan ulang seluruh buffer) sebagai baseline streaming."""
+    start = text.find("{")
+    if start < 0:
+        return {}
+    depth = 0
+    in_string = False
+    escape = False
+    boundary = None
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                boundary = i
+                break
+        elif ch == "," and depth == 1:
+            boundary = i
+    if boundary is None:
+        return {}
+    try:
+        return json.loads(text[start:boundary] + "}")
+    except ValueError:
+        return {}
+
+
+def _sentence(rng: random.Random, low: int, high: int) -> str:
+    return " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(low, high))).capitalize() + "."
+
+
+def build_analysis(rng: random.Random) -> dict:
+    data = dict(SAMPLE_ANALYSIS)
+    for field in ("overall_summary", "ats_detail", "writing_detail", "skill_detail", "experience_detail"):
+        data[field] = " ".join(_sentence(rng, 10, 25) for _ in range(3))
+    data["critical_gaps"] = [{"gap": rng.choice(VOCABULARY).title(), "action": _sentence(rng, 10, 20)}
+                             for _ in range(6)]
+    return data
+
+
+def build_cv(rng: random.Random, experiences: int) -> dict:
+    data = dict(SAMPLE_CV)
+    data["professional_summary"] = " ".join(_sentence(rng, 12, 24) for _ in range(3))
+    data["full_name"] = "Siti Nurhaliza Pérez"
+    data["work_experience"] = [
+        {"title": rng.choice(VOCABULARY).title() + " Engineer", "company": rng.choice(VOCABULARY).title(),
+         "dates": "Jan 2020 - Present", "location": "Jakarta",
+         "achievements": [_sentence(rng, 12, 28) for _ in range(6)]}
+        for _ in range(experiences)
+    ]
+    data["projects"] = [{"name": rng.choice(VOCABULARY).title(), "description": _sentence(rng, 10, 20),
+                         "highlights": [_sentence(rng, 8, 16) for _ in range(3)]} for _ in range(4)]
+    data["hard_skills"] = rng.sample(VOCABULARY, min(20, len(VOCABULARY)))
+    return data
+
+
+def build_samples(seed: int = 0):
+    rng = random.Random(seed)
+    analysis = build_analysis(rng)
+    cv = build_cv(rng, 4)
+    combined = {"analysis": build_analysis(rng), "cv_data": build_cv(rng, 14)}
+    return [("analysis", analysis, AnalysisResponse), ("cv_data", cv, ImprovedCVResult),
+            ("combined", combined, CombinedAnalysisResult)]
+
+
+def wrappers(payload: dict):
+    text = json.dumps(payload, ensure_ascii=False, indent=2)
+    return {
+        "raw": text,
+        "fenced": f"```json\n{text}\n```",
+        "prose": f"Here is the analysis:\n{text}\nLet me know if you need {{anything}} else.",
+    }
+
+
+def best_time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"JSON backend: {JSON_BACKEND}")
+    print(f"{'payload':<10} {'wrap':<7} {'KB':>6} {'legacy us':>10} {'new us':>9} {'speedup':>8}  valid")
+    samples = build_samples()
+    for name, payload, model_cls in samples:
+        for wrap, text in wrappers(payload).items():
+            def legacy():
+                return model_cls(**json.loads(legacy_clean_json_text(text)))
+
+            def new():
+                return parse_model(text, model_cls)
+
+            try:
+                legacy_ok = legacy() == new()
+            except ValueError:
+                legacy_ok = False
+            legacy_time = best_time(legacy, args.repeat) if legacy_ok else float("nan")
+            new_time = best_time(new, args.repeat)
+            print(f"{name:<10} {wrap:<7} {len(text) / 1024:>6.1f} {legacy_time * 1e6:>10.0f} {new_time * 1e6:>9.0f} "
+                  f"{legacy_time / new_time:>7.1f}x  {'ok' if legacy_ok else 'legacy gagal'}")
+
+    print()
+    print(f"{'serialize':<10} {'KB':>6} {'json.dumps us':>14} {'dumps us':>9} {'speedup':>8}")
+    for name, payload, _ in samples:
+        legacy_time = best_time(lambda: json.dumps(payload, ensure_ascii=False), args.repeat)
+        new_time = best_time(lambda: dumps(payload), args.repeat)
+        size = len(dumps(payload)) / 1024
+        print(f"{name:<10} {size:>6.1f} {legacy_time * 1e6:>14.0f} {new_time * 1e6:>9.0f} "
+              f"{legacy_time / new_time:>7.1f}x")
+
+    print()
+    print(f"{'stream':<10} {'chunks':>6} {'legacy ms':>10} {'scanner ms':>11} {'speedup':>8}")
+    for name, payload, _ in samples:
+        text = json.dumps(payload, ensure_ascii=False)
+        chunks = [text[i:i + 120] for i in range(0, len(text), 120)]
+
+        def legacy_stream():
+            buffer = ""
+            emitted = {}
+            for chunk in chunks:
+                buffer += chunk
+                for field, value in legacy_completed_fields(buffer).items():
+                    emitted.setdefault(field, value)
+            return emitted
+
+        def new_stream():
+            scanner = JsonFieldScanner()
+            emitted = {}
+            for chunk in chunks:
+                emitted.update(scanner.feed(chunk))
+            return emitted
+
+        assert legacy_stream() == new_stream() == payload, f"Field stream berbeda untuk {name}"
+        legacy_time = best_time(legacy_stream, max(args.repeat // 10, 3))
+        new_time = best_time(new_stream, max(args.repeat // 10, 3))
+        print(f"{name:<10} {len(chunks):>6} {legacy_time * 1e3:>10.2f} {new_time * 1e3:>11.2f} "
+              f"{legacy_time / new_time:>7.1f}x")
+
+    print()
+    print("Recovery output terpotong (dipotong di 10%..90% panjang, langkah 5%):")
+    for name, payload, model_cls in samples:
+        text = json.dumps(payload, ensure_ascii=False)
+        cuts = [int(len(text) * fraction / 100) for fraction in range(10, 95, 5)]
+        recovered = 0
+        for cut in cuts:
+            try:
+                parse_model(text[:cut], model_cls, allow_partial=True)
+                recovered += 1
+            except ValueError:
+                pass
+        print(f"  {name:<10} {recovered}/{len(cuts)} dipulihkan (legacy: 0/{len(cuts)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Micro-benchmark pre-screening skill lokal (src/services/skill_match).
+
+JD diambil dari fake Jina (markdown lengkap dengan boilerplate, lalu dibersihkan seperti di endpoint),
+CV dibuat sintetis: "cocok" memuat sebagian requirement JD, "tidak cocok" berasal dari bidang lain.
+Mengukur waktu build index JD, waktu scoring per CV, sebaran skor kedua kelompok, dan berapa
+panggilan analisis LLM yang akan di-skip / di-downgrade pada PRESCREEN_THRESHOLD.
+
+Jalankan dari apps/ai-engine:
+    python -m bench.bench_skill_match [--cvs 500]
+"""
+import time
+import random
+import argparse
+
+from bench.corpus import VOCABULARY
+from bench.fake_jina import job_markdown, REQUIREMENTS
+from src.services.prompt_budget import clean_job_description, strip_jd_boilerplate
+from src.services.skill_match import JobIndex, prescreen_cv, PRESCREEN_THRESHOLD
+
+OTHER_FIELDS = [
+    "Registered nurse with ICU experience, patient care, triage, medication administration and BLS certification.",
+    "Chef de partie managing a kitchen brigade, menu costing, food safety (HACCP) and supplier relations.",
+    "Civil site supervisor for high-rise projects: formwork, rebar inspection, K3 safety and subcontractors.",
+    "Primary school teacher, lesson planning, classroom management, parent communication and tutoring.",
+    "Retail store manager handling inventory, visual merchandising, cashier shifts and weekly sales targets.",
+]
+
+
+def matching_cv(rng: random.Random, requirements) -> str:
+    skills = rng.sample(requirements, rng.randint(3, len(requirements)))
+    filler = " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(80, 200)))
+    return f"Experienced professional. Skills: {', '.join(skills)}. {filler}"
+
+
+def other_cv(rng: random.Random) -> str:
+    lines = rng.sample(OTHER_FIELDS, 2)
+    return " ".join(lines) + " Reliable, punctual, fluent in Bahasa Indonesia and English."
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cvs", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    url = "https://careers.example.com/jobs/1"
+    job_desc = clean_job_description(strip_jd_boilerplate(job_markdown(url)))
+    requirements = [req for req in REQUIREMENTS if req.lower() in job_desc.lower()]
+
+    start = time.perf_counter()
+    index = JobIndex(job_desc)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"JD: {len(job_desc)} karakter, {len(index.skills)} skill dikenal, {len(index.keywords)} kata kunci, "
+          f"build index {build_ms:.2f} ms")
+    print(f"Skill JD: {', '.join(sorted(index.skills))}")
+
+    groups = {"cocok": [matching_cv(rng, requirements) for _ in range(args.cvs // 2)],
+              "tidak cocok": [other_cv(rng) for _ in range(args.cvs - args.cvs // 2)]}
+    print()
+    print(f"{'kelompok':<12} {'n':>5} {'p50 us':>8} {'p99 us':>8} {'skor min':>9} {'skor p50':>9} {'skor max':>9}"
+          f" {'< ambang':>9}")
+    for name, cvs in groups.items():
+        timings = []
+        scores = []
+        for cv in cvs:
+            start = time.perf_counter()
+            match = prescreen_cv(cv, job_desc)
+            timings.append(time.perf_counter() - start)
+            scores.append(match.skill_score)
+        below = sum(1 for score in scores if score < PRESCREEN_THRESHOLD)
+        print(f"{name:<12} {len(cvs):>5} {percentile(timings, 0.5) * 1e6:>8.0f} {percentile(timings, 0.99) * 1e6:>8.0f}"
+              f" {min(scores):>9} {percentile(scores, 0.5):>9} {max(scores):>9} {below:>5}/{len(cvs)}")
+    print(f"\nAmbang PRESCREEN_THRESHOLD={PRESCREEN_THRESHOLD}: CV di bawah ambang di-skip / di-downgrade "
+          f"sesuai PRESCREEN_ACTION / PRESCREEN_BATCH_ACTION.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Waktu startup ai-engine: dari proses dijalankan sampai /health/live menjawab (menerima koneksi)
+dan sampai /health 200 (warm-up selesai), untuk `uvicorn main:app` (satu proses, seperti Dockerfile lama)
+dan `serve.py` (parent preload + fork WEB_CONCURRENCY worker).
+
+Ditampilkan juga fase startup dari payload /health (import, lifespan, warm-up) worker yang menjawab.
+Tidak ada panggilan Gemini: API key palsu cukup karena client hanya dibuat, tidak dipakai.
+
+Jalankan dari apps/ai-engine:
+    python -m bench.bench_startup [--runs 3] [--workers 1 2 4]
+"""
+import os
+import sys
+import time
+import signal
+import argparse
+import subprocess
+
+import httpx
+
+
+def wait_for(client: httpx.Client, url: str, started: float, timeout: float) -> float:
+    while time.perf_counter() - started < timeout:
+        try:
+            if client.get(url).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(url)
+
+
+def measure(command, env, port: int, timeout: float):
+    started = time.perf_counter()
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1) as client:
+            live = wait_for(client, "/health/live", started, timeout)
+            ready = wait_for(client, "/health", started, timeout)
+            phases = client.get("/health").json()["startup"]["phases_ms"]
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=30)
+    return live, ready, phases
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--port", type=int, default=8110)
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    env = dict(os.environ, GEMINI_API_KEY=os.getenv("GEMINI_API_KEY", "fake-key"), PORT=str(args.port))
+    modes = [("uvicorn main:app", [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port)], env)]
+    for workers in args.workers:
+        modes.append((f"serve.py x{workers}", [sys.executable, "serve.py"], dict(env, WEB_CONCURRENCY=str(workers))))
+
+    print(f"{'mode':<18} {'live ms':>8} {'ready ms':>9}  fase /health (ms)")
+    for name, command, mode_env in modes:
+        for _ in range(args.runs):
+            live, ready, phases = measure(command, mode_env, args.port, args.timeout)
+            detail = ", ".join(f"{phase} {ms:.0f}" for phase, ms in phases.items())
+            print(f"{name:<18} {live * 1000:>8.0f} {ready * 1000:>9.0f}  {detail}")
+
+
+if __name__ == "__main__":
+    main()
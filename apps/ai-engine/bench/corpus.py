@@ -0,0 +1,360 @@
+"""
+Generator korpus CV sintetis (PDF & DOCX) untuk benchmark, tanpa dependency tambahan.
+PDF ditulis manual (Helvetica + anotasi /Link URI) dan DOCX ditulis manual (zip + WordprocessingML)
+agar ukuran dokumen dan kepadatan hyperlink bisa diatur bebas.
+"""
+import io
+import random
+import zipfile
+from typing import List, Tuple
+from xml.sax.saxutils import escape as xml_escape
+
+PDF_TYPE = "application/pdf"
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+FONT_SIZE = 10
+LINE_HEIGHT = 14
+MARGIN = 50
+
+VOCABULARY = (
+    "engineer python docker kubernetes led team built scalable api reduced latency "
+    "percent improved revenue designed data pipeline stakeholders agile react node "
+    "analytics dashboard machine learning model deployed cloud aws gcp mentoring "
+    "project portfolio github linkedin university bachelor computer science award"
+).split()
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _text_width(text: str) -> float:
+    # Perkiraan lebar Helvetica; cukup untuk menaruh bbox link di atas kata
+    return len(text) * FONT_SIZE * 0.5
+
+
+def build_pdf(pages: List[List[Tuple[str, List[Tuple[int, int, str]]]]]) -> bytes:
+    """
+    `pages` = list halaman; tiap halaman = list baris (text, links) dengan
+    links = [(word_start, word_end, uri)] menunjuk rentang kata pada baris tersebut.
+    Halaman tanpa baris dibuat seperti hasil scan: hanya grafis, tanpa resource font.
+    """
+    objects = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog_id = add(b"")
+    pages_id = add(b"")
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    page_ids = []
+    for lines in pages:
+        if not lines:
+            content = b"q 0.6 g %d %d %d %d re f Q" % (MARGIN, MARGIN, PAGE_WIDTH - 2 * MARGIN,
+                                                        PAGE_HEIGHT - 2 * MARGIN)
+            content_id = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+            page_ids.append(add(
+                b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R /Resources << >> >>"
+                % (pages_id, PAGE_WIDTH, PAGE_HEIGHT, content_id)
+            ))
+            continue
+        stream = [b"BT", b"/F1 %d Tf" % FONT_SIZE]
+        annots = []
+        y = PAGE_HEIGHT - MARGIN
+        for text, links in lines:
+            stream.append(b"1 0 0 1 %d %d Tm (%s) Tj" % (MARGIN, y, _escape(text).encode("latin-1")))
+            words = text.split(" ")
+            for start, end, uri in links:
+                x0 = MARGIN + _text_width(" ".join(words[:start]) + (" " if start else ""))
+                x1 = x0 + _text_width(" ".join(words[start:end]))
+                annot_id = add(
+                    b"<< /Type /Annot /Subtype /Link /Border [0 0 0] /Rect [%.2f %d %.2f %d] "
+                    b"/A << /S /URI /URI (%s) >> >>"
+                    % (x0, y - 2, x1, y + FONT_SIZE, _escape(uri).encode("latin-1"))
+                )
+                annots.append(annot_id)
+            y -= LINE_HEIGHT
+        stream.append(b"ET")
+        content = b"\n".join(stream)
+        content_id = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+        annots_ref = b" ".join(b"%d 0 R" % a for a in annots)
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Annots [%s] >>"
+            % (pages_id, PAGE_WIDTH, PAGE_HEIGHT, content_id, font_id, annots_ref)
+        ))
+
+    objects[catalog_id - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+    kids = b" ".join(b"%d 0 R" % p for p in page_ids)
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = [b"%PDF-1.4\n"]
+    offsets = []
+    position = len(out[0])
+    for number, body in enumerate(objects, start=1):
+        chunk = b"%d 0 obj\n%s\nendobj\n" % (number, body)
+        offsets.append(position)
+        out.append(chunk)
+        position += len(chunk)
+
+    xref = [b"xref\n0 %d\n" % (len(objects) + 1), b"0000000000 65535 f \n"]
+    xref += [b"%010d 00000 n \n" % offset for offset in offsets]
+    trailer = b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog_id, position
+    )
+    return b"".join(out + xref + [trailer])
+
+
+def generate_cv_pdf(num_pages: int, links_per_page: int, seed: int = 0, scanned_pages: int = 0) -> bytes:
+    """
+    CV sintetis dengan jumlah halaman dan kepadatan link tertentu (deterministik per seed).
+    `scanned_pages` halaman gambar-saja (lampiran sertifikat hasil scan) ditambahkan di akhir.
+    """
+    rng = random.Random(seed)
+    lines_per_page = (PAGE_HEIGHT - 2 * MARGIN) // LINE_HEIGHT
+    pages = []
+    for page_number in range(num_pages):
+        lines = []
+        for _ in range(lines_per_page):
+            words = [rng.choice(VOCABULARY) for _ in range(rng.randint(4, 11))]
+            lines.append((" ".join(words), []))
+        for link_number in range(links_per_page):
+            text, links = lines[rng.randrange(lines_per_page)]
+            word_count = len(text.split(" "))
+            start = rng.randrange(word_count)
+            end = min(word_count, start + rng.randint(1, 2))
+            links.append((start, end, f"https://example.com/p{page_number}/l{link_number}"))
+        pages.append(lines)
+    pages.extend([] for _ in range(scanned_pages))
+    return build_pdf(pages)
+
+
+def generate_pdf_corpus(seed: int = 0) -> List[Tuple[str, bytes]]:
+    """Korpus campuran: CV pendek, CV akademik panjang, dan portfolio yang padat link."""
+    specs = [
+        ("short-1p-5links", 1, 5, 0),
+        ("standard-2p-10links", 2, 10, 0),
+        ("portfolio-2p-60links", 2, 60, 0),
+        ("portfolio-3p-150links", 3, 150, 0),
+        ("academic-12p-20links", 12, 20, 0),
+        ("attachments-2p-4scans", 2, 10, 4),
+    ]
+    return [(name, generate_cv_pdf(pages, links, seed + i, scans))
+            for i, (name, pages, links, scans) in enumerate(specs)]
+
+
+DOCX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+DOCX_PACKAGE_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+HYPERLINK_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink"
+MC_NS = "http://schemas.openxmlformats.org/markup-compatibility/2006"
+WP_NS = "http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing"
+WPS_NS = "http://schemas.microsoft.com/office/word/2010/wordprocessingShape"
+
+
+def build_docx(paragraphs: List[Tuple[str, List[Tuple[int, int, str]]]],
+               tables: List[List[List[str]]] = ()) -> bytes:
+    """
+    `paragraphs` = list (text, links) dengan format link yang sama seperti build_pdf;
+    `tables` = list tabel, tiap tabel = list baris berisi teks sel.
+    """
+    rels = []
+    body = []
+    for text, links in paragraphs:
+        words = text.split(" ")
+        spans = sorted(links)
+        runs = []
+        position = 0
+        for start, end, uri in spans:
+            if start < position:
+                continue
+            if start > position:
+                runs.append(_docx_run(" ".join(words[position:start]) + " "))
+            rel_id = f"rId{len(rels) + 1}"
+            rels.append((rel_id, uri))
+            runs.append(f'<w:hyperlink r:id="{rel_id}">{_docx_run(" ".join(words[start:end]))}</w:hyperlink>')
+            if end < len(words):
+                runs.append(_docx_run(" "))
+            position = end
+        if position < len(words):
+            runs.append(_docx_run(" ".join(words[position:])))
+        body.append(f"<w:p>{''.join(runs)}</w:p>")
+    for table in tables:
+        rows = "".join(
+            "<w:tr>" + "".join(f"<w:tc><w:p>{_docx_run(cell)}</w:p></w:tc>" for cell in row) + "</w:tr>"
+            for row in table
+        )
+        body.append(f"<w:tbl>{rows}</w:tbl>")
+
+    return _docx_package("".join(body), rels)
+
+
+def _docx_package(body: str, rels: List[Tuple[str, str]]) -> bytes:
+    document = (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<w:document xmlns:w="{W_NS}" xmlns:r="{R_NS}" xmlns:mc="{MC_NS}" xmlns:wp="{WP_NS}" '
+        f'xmlns:wps="{WPS_NS}" xmlns:v="urn:schemas-microsoft-com:vml"><w:body>{body}</w:body></w:document>'
+    )
+    document_rels = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        + "".join(f'<Relationship Id="{rel_id}" Type="{HYPERLINK_TYPE}" Target="{xml_escape(uri)}" '
+                  f'TargetMode="External"/>' for rel_id, uri in rels)
+        + '</Relationships>'
+    )
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", DOCX_CONTENT_TYPES)
+        archive.writestr("_rels/.rels", DOCX_PACKAGE_RELS)
+        archive.writestr("word/document.xml", document)
+        archive.writestr("word/_rels/document.xml.rels", document_rels)
+    return buffer.getvalue()
+
+
+def _docx_run(text: str) -> str:
+    return f'<w:r><w:t xml:space="preserve">{xml_escape(text)}</w:t></w:r>'
+
+
+def generate_cv_docx(num_paragraphs: int, num_links: int, num_tables: int = 0, seed: int = 0) -> bytes:
+    """CV DOCX sintetis: paragraf acak, hyperlink di paragraf acak, dan tabel skill opsional."""
+    rng = random.Random(seed)
+    paragraphs = []
+    for _ in range(num_paragraphs):
+        words = [rng.choice(VOCABULARY) for _ in range(rng.randint(6, 24))]
+        paragraphs.append((" ".join(words), []))
+    for link_number in range(num_links):
+        text, links = paragraphs[rng.randrange(num_paragraphs)]
+        word_count = len(text.split(" "))
+        start = rng.randrange(word_count)
+        links.append((start, min(word_count, start + rng.randint(1, 2)), f"https://example.com/d/l{link_number}"))
+    tables = [
+        [[rng.choice(VOCABULARY) for _ in range(3)] for _ in range(rng.randint(3, 8))]
+        for _ in range(num_tables)
+    ]
+    return build_docx(paragraphs, tables)
+
+
+def _docx_text_box(paragraphs: List[str]) -> str:
+    """Text box seperti template Word: mc:Choice (DrawingML) + mc:Fallback (VML) berisi salinan isi yang sama."""
+    content = f"<w:txbxContent>{''.join(paragraphs)}</w:txbxContent>"
+    return (
+        "<w:p><w:r><mc:AlternateContent>"
+        f"<mc:Choice Requires=\"wps\"><w:drawing><wp:anchor><wps:wsp><wps:txbx>{content}</wps:txbx>"
+        "</wps:wsp></wp:anchor></w:drawing></mc:Choice>"
+        f"<mc:Fallback><w:pict><v:shape><v:textbox>{content}</v:textbox></v:shape></w:pict></mc:Fallback>"
+        "</mc:AlternateContent></w:r></w:p>"
+    )
+
+
+def _docx_field_link(text: str, uri: str) -> str:
+    """Hyperlink sebagai field code (HYPERLINK "url"), bentuk yang sering dihasilkan Word / konversi PDF."""
+    return (
+        '<w:r><w:fldChar w:fldCharType="begin"/></w:r>'
+        f'<w:r><w:instrText xml:space="preserve"> HYPERLINK "{xml_escape(uri)}" </w:instrText></w:r>'
+        '<w:r><w:fldChar w:fldCharType="separate"/></w:r>'
+        f'{_docx_run(text)}'
+        '<w:r><w:fldChar w:fldCharType="end"/></w:r>'
+    )
+
+
+def generate_template_docx(num_roles: int, num_links: int, seed: int = 0) -> bytes:
+    """
+    CV DOCX bergaya template: header nama + kontak di text box, layout dua kolom lewat tabel
+    (kiri: skill dengan hyperlink field code, kanan: pengalaman dengan hyperlink relationship dan tab
+    sebelum periode), lalu paragraf body biasa. Bagian ini yang tidak terbaca lewat `doc.paragraphs`.
+    """
+    rng = random.Random(seed)
+    rels = []
+
+    def rel_link(text: str, uri: str) -> str:
+        rel_id = f"rId{len(rels) + 1}"
+        rels.append((rel_id, uri))
+        return f'<w:hyperlink r:id="{rel_id}">{_docx_run(text)}</w:hyperlink>'
+
+    def words(low: int, high: int) -> str:
+        return " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(low, high)))
+
+    header = _docx_text_box([
+        f"<w:p>{_docx_run('Budi Santoso')}</w:p>",
+        f"<w:p>{_docx_run('budi@example.com | ')}{rel_link('LinkedIn', 'https://linkedin.com/in/budi-' + str(seed))}"
+        f"</w:p>",
+    ])
+    left = [f"<w:p>{_docx_run('SKILLS')}</w:p>"]
+    for i in range(max(num_links // 2, 1)):
+        left.append(f"<w:p>{_docx_field_link(words(1, 2), f'https://example.com/skill/{seed}-{i}')}</w:p>")
+    right = [f"<w:p>{_docx_run('EXPERIENCE')}</w:p>"]
+    for i in range(num_roles):
+        company = rel_link(words(1, 2), f"https://example.com/company/{seed}-{i}") if i < num_links else ""
+        right.append(f"<w:p>{_docx_run(words(2, 4) + ' at ')}{company}"
+                     f"<w:r><w:tab/><w:t>20{10 + i % 14}</w:t></w:r></w:p>")
+        right.extend(f"<w:p>{_docx_run(words(8, 20))}</w:p>" for _ in range(rng.randint(2, 4)))
+    layout = ("<w:tbl><w:tr>"
+              f"<w:tc>{''.join(left)}</w:tc><w:tc>{''.join(right)}</w:tc>"
+              "</w:tr></w:tbl>")
+    body = [header, layout]
+    body.extend(f"<w:p>{_docx_run(words(6, 24))}</w:p>" for _ in range(num_roles))
+    return _docx_package("".join(body), rels)
+
+
+def generate_docx_corpus(seed: int = 0) -> List[Tuple[str, bytes]]:
+    specs = [
+        ("docx-short-20p-3links", 20, 3, 0),
+        ("docx-standard-60p-10links-1table", 60, 10, 1),
+        ("docx-long-300p-40links-4tables", 300, 40, 4),
+    ]
+    return [(name, generate_cv_docx(paragraphs, links, tables, seed + i))
+            for i, (name, paragraphs, links, tables) in enumerate(specs)]
+
+
+def generate_docx_template_corpus(seed: int = 0) -> List[Tuple[str, bytes]]:
+    """Korpus template (text box, layout tabel, field code) ditambah DOCX paragraf biasa dan satu dokumen besar."""
+    specs = [
+        ("template-3roles-6links", 3, 6),
+        ("template-8roles-16links", 8, 16),
+        ("template-40roles-40links", 40, 40),
+    ]
+    corpus = [(name, generate_template_docx(roles, links, seed + i)) for i, (name, roles, links) in enumerate(specs)]
+    corpus.extend(generate_docx_corpus(seed))
+    corpus.append(("docx-huge-20000p-500links-20tables", generate_cv_docx(20000, 500, 20, seed)))
+    return corpus
+
+
+def generate_mixed_corpus(size: int, seed: int = 0) -> List[Tuple[str, bytes, str]]:
+    """
+    `size` dokumen unik (PDF & DOCX bergantian dengan ukuran bervariasi), sehingga text cache,
+    cv_data cache, dan single-flight tidak membuat load test terlihat lebih cepat dari aslinya.
+    """
+    pdf_specs = [(1, 5), (2, 10), (2, 60), (3, 150), (12, 20)]
+    docx_specs = [(20, 3, 0), (60, 10, 1), (300, 40, 4)]
+    corpus = []
+    for i in range(size):
+        if i % 4 == 3:
+            paragraphs, links, tables = docx_specs[(i // 4) % len(docx_specs)]
+            name = f"docx-{paragraphs}p-{links}links-{i}"
+            corpus.append((name, generate_cv_docx(paragraphs, links, tables, seed + i), DOCX_TYPE))
+        else:
+            pages, links = pdf_specs[i % len(pdf_specs)]
+            name = f"pdf-{pages}p-{links}links-{i}"
+            corpus.append((name, generate_cv_pdf(pages, links, seed + i), PDF_TYPE))
+    return corpus
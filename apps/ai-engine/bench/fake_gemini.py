@@ -0,0 +1,311 @@
+"""
+Fake Gemini API lokal untuk load test tanpa memakai kuota.
+
+Mengimplementasikan `models/{model}:generateContent` dan `:streamGenerateContent` (SSE)
+dengan latency, error 5xx, dan 429 yang bisa diatur, plus `cachedContents` (context cache). Jenis output (analysis / CV data)
+ditentukan dari nama field pada response schema di request.
+
+Jalankan standalone:
+    python -m bench.fake_gemini --port 8090 --latency-ms 2000
+lalu arahkan ai-engine ke sana dengan GEMINI_BASE_URL=http://127.0.0.1:8090
+"""
+import json
+import math
+import random
+import asyncio
+import argparse
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+SAMPLE_ANALYSIS = {
+    "candidate_name": "Jane Candidate",
+    "overall_score": 72,
+    "overall_summary": "Strong backend profile with clear impact metrics; cloud depth is limited.",
+    "ats_score": 80,
+    "ats_detail": "Single-column layout with standard headings.",
+    "writing_score": 75,
+    "writing_detail": "Concise bullet points, minor tense inconsistencies.",
+    "skill_score": 68,
+    "skill_detail": "Python and SQL match; Kubernetes missing.",
+    "experience_score": 65,
+    "experience_detail": "Mid-level experience relevant to the role.",
+    "critical_gaps": [
+        {"gap": "Kubernetes", "action": "Deploy a side project on a managed Kubernetes cluster."},
+        {"gap": "Leadership", "action": "Lead a small cross-team initiative and quantify the result."},
+    ],
+}
+
+SAMPLE_CV = {
+    "full_name": "Jane Candidate",
+    "professional_summary": "Backend engineer with 5 years building data-heavy APIs.",
+    "contact_info": {"email": "jane@example.com", "phone": "+62 812 0000 0000", "location": "Jakarta",
+                     "linkedin": "<a href='https://linkedin.com/in/jane'>LinkedIn</a>", "portfolio": None},
+    "hard_skills": ["Python", "FastAPI", "PostgreSQL", "Docker"],
+    "soft_skills": ["Communication", "Mentoring"],
+    "work_experience": [
+        {"title": "Backend Engineer", "company": "Acme", "dates": "Jan 2022 - Present",
+         "achievements": ["Cut p95 latency by 40% by adding a caching layer."], "location": "Jakarta"},
+        {"title": "Software Engineer", "company": "Globex", "dates": "2019 - 2021",
+         "achievements": ["Built an ingestion pipeline processing 2M events/day."], "location": None},
+    ],
+    "education": [{"institution": "Universitas Indonesia", "degree": "B.Sc. Computer Science",
+                   "year": "2019", "location": "Depok"}],
+    "projects": [{"name": "CV Parser", "description": "Open-source resume parser.",
+                  "highlights": ["500+ GitHub stars"]}],
+    "certifications": ["AWS Certified Developer"],
+    "section_labels": None,
+}
+
+
+LATENCY_DISTRIBUTIONS = ("normal", "lognormal", "fixed")
+
+
+def sample_delay(latency_ms: float, jitter_ms: float, distribution: str = "normal") -> float:
+    """
+    Delay simulasi (detik). `lognormal` memakai latency sebagai median dengan ekor panjang
+    (mirip LLM sungguhan: sebagian kecil panggilan jauh lebih lambat dari p50).
+    """
+    if distribution == "fixed" or latency_ms <= 0:
+        return max(0.0, latency_ms) / 1000
+    if distribution == "lognormal":
+        sigma = max(jitter_ms, 1.0) / latency_ms
+        return random.lognormvariate(math.log(latency_ms), sigma) / 1000
+    return max(0.0, random.gauss(latency_ms, jitter_ms)) / 1000
+
+
+class FakeGeminiConfig:
+    def __init__(self, latency_ms: float = 1500, jitter_ms: float = 300,
+                 error_rate: float = 0.0, rate_limit_rate: float = 0.0, stream_chunks: int = 8,
+                 distribution: str = "normal", ms_per_output_token: float = 0.0, cv_experiences: int = 2):
+        self.latency_ms = latency_ms
+        # Latency tambahan per token output (decode), agar output panjang memang lebih lambat
+        self.ms_per_output_token = ms_per_output_token
+        # Jumlah entri work_experience pada output CV (CV senior -> output customize panjang)
+        self.cv_experiences = cv_experiences
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.stream_chunks = stream_chunks
+        self.distribution = distribution
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.cached_contents = {}
+
+
+def sample_cv(experiences: int = 2) -> dict:
+    """SAMPLE_CV dengan `experiences` entri pengalaman (masing-masing 4 achievement jika diperbanyak)."""
+    base = SAMPLE_CV["work_experience"]
+    if experiences == len(base):
+        return SAMPLE_CV
+    work = [dict(base[i % len(base)], achievements=base[i % len(base)]["achievements"] * 4)
+            for i in range(experiences)]
+    return dict(SAMPLE_CV, work_experience=work)
+
+
+def _sample_for(body: dict, experiences: int = 2) -> dict:
+    """Output ditentukan dari field top-level response schema (analysis, CV penuh, atau satu bagian CV)."""
+    schema = body.get("generationConfig", {}).get("responseSchema") or {}
+    fields = set(schema.get("properties", {}))
+    cv = sample_cv(experiences)
+    if {"analysis", "cv_data"} <= fields:
+        return {"analysis": SAMPLE_ANALYSIS, "cv_data": cv}
+    if "candidate_name" in fields:
+        return SAMPLE_ANALYSIS
+    if not fields or "full_name" in fields:
+        return cv
+    if "company" in fields:
+        return cv["work_experience"][0]
+    return {field: cv[field] for field in fields if field in cv}
+
+
+def _prompt_tokens(body: dict) -> int:
+    return len(json.dumps([body.get("systemInstruction"), body.get("contents", [])])) // 4
+
+
+def _usage(body: dict, output: str, cached_tokens: int = 0) -> dict:
+    # Seperti Gemini: promptTokenCount sudah termasuk token dari cached content
+    prompt_tokens = _prompt_tokens(body) + cached_tokens
+    output_tokens = len(output) // 4
+    usage = {"promptTokenCount": prompt_tokens, "candidatesTokenCount": output_tokens,
+             "totalTokenCount": prompt_tokens + output_tokens}
+    if cached_tokens:
+        usage["cachedContentTokenCount"] = cached_tokens
+    return usage
+
+
+def _candidate(text: str) -> dict:
+    return {"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP", "index": 0}
+
+
+def create_app(config: FakeGeminiConfig) -> FastAPI:
+    app = FastAPI(title="Fake Gemini")
+
+    def _decode_delay(text: str) -> float:
+        return len(text) // 4 * config.ms_per_output_token / 1000
+
+    async def _simulate(extra_delay: float = 0.0):
+        """Return response error (429/500) atau None setelah menunggu latency simulasi (+ `extra_delay`)."""
+        config.requests += 1
+        roll = random.random()
+        if roll < config.rate_limit_rate:
+            return JSONResponse(status_code=429, content={"error": {
+                "code": 429, "status": "RESOURCE_EXHAUSTED", "message": "Quota exceeded (fake).",
+                "details": [{"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": "1s"}]}})
+        delay = sample_delay(config.latency_ms, config.jitter_ms, config.distribution) + extra_delay
+        config.in_flight += 1
+        config.max_in_flight = max(config.max_in_flight, config.in_flight)
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            config.in_flight -= 1
+        if roll < config.rate_limit_rate + config.error_rate:
+            return JSONResponse(status_code=500, content={"error": {
+                "code": 500, "status": "INTERNAL", "message": "Fake internal error."}})
+        return None
+
+    def _cached_tokens(body: dict):
+        name = body.get("cachedContent")
+        if not name:
+            return 0
+        return config.cached_contents.get(name)
+
+    def _cache_not_found(body: dict) -> JSONResponse:
+        return JSONResponse(status_code=403, content={"error": {
+            "code": 403, "status": "PERMISSION_DENIED",
+            "message": f"CachedContent not found (or permission denied): {body.get('cachedContent')}"}})
+
+    @app.post("/{version}/models/{model}:generateContent")
+    async def generate_content(version: str, model: str, request: Request):
+        body = await request.json()
+        cached_tokens = _cached_tokens(body)
+        if cached_tokens is None:
+            return _cache_not_found(body)
+        text = json.dumps(_sample_for(body, config.cv_experiences))
+        error = await _simulate(_decode_delay(text))
+        if error is not None:
+            return error
+        return {"candidates": [_candidate(text)], "usageMetadata": _usage(body, text, cached_tokens),
+                "modelVersion": model}
+
+    @app.post("/{version}/models/{model}:streamGenerateContent")
+    async def stream_generate_content(version: str, model: str, request: Request):
+        body = await request.json()
+        cached_tokens = _cached_tokens(body)
+        if cached_tokens is None:
+            return _cache_not_found(body)
+        config.requests += 1
+        text = json.dumps(_sample_for(body, config.cv_experiences))
+        size = max(1, len(text) // config.stream_chunks + 1)
+        pieces = [text[i:i + size] for i in range(0, len(text), size)]
+
+        delay = sample_delay(config.latency_ms, config.jitter_ms, config.distribution) + _decode_delay(text)
+
+        async def events():
+            for i, piece in enumerate(pieces):
+                await asyncio.sleep(delay / len(pieces))
+                chunk = {"candidates": [_candidate(piece)], "modelVersion": model}
+                if i == len(pieces) - 1:
+                    chunk["usageMetadata"] = _usage(body, text, cached_tokens)
+                yield f"data: {json.dumps(chunk)}\r\n\r\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/{version}/cachedContents")
+    async def create_cached_content(version: str, request: Request):
+        body = await request.json()
+        name = f"cachedContents/fake-{len(config.cached_contents) + 1}"
+        config.cached_contents[name] = _prompt_tokens(body)
+        return {"name": name, "model": body.get("model"), "displayName": body.get("displayName"),
+                "usageMetadata": {"totalTokenCount": config.cached_contents[name]}}
+
+    @app.patch("/{version}/cachedContents/{cache_id}")
+    async def update_cached_content(version: str, cache_id: str):
+        name = f"cachedContents/{cache_id}"
+        if name not in config.cached_contents:
+            return _cache_not_found({"cachedContent": name})
+        return {"name": name}
+
+    @app.delete("/{version}/cachedContents/{cache_id}")
+    async def delete_cached_content(version: str, cache_id: str):
+        config.cached_contents.pop(f"cachedContents/{cache_id}", None)
+        return {}
+
+    @app.get("/__stats")
+    async def stats():
+        return {"requests": config.requests, "in_flight": config.in_flight, "max_in_flight": config.max_in_flight,
+                "cached_contents": len(config.cached_contents)}
+
+    return app
+
+
+class BackgroundServer:
+    """Menjalankan app ASGI di thread terpisah (untuk dipakai dari script benchmark)."""
+
+    def __init__(self, app, port: int):
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning",
+                                                    backlog=4096, timeout_keep_alive=60))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+        self.url = f"http://127.0.0.1:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.02)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+
+
+def add_arguments(parser: argparse.ArgumentParser, prefix: str = "", latency_ms: float = 1500,
+                  jitter_ms: float = 300):
+    """Argumen profil latency/error; `prefix` (mis. "jina-") untuk fake server kedua di CLI yang sama."""
+    parser.add_argument(f"--{prefix}latency-ms", type=float, default=latency_ms)
+    parser.add_argument(f"--{prefix}jitter-ms", type=float, default=jitter_ms)
+    parser.add_argument(f"--{prefix}latency-dist", choices=LATENCY_DISTRIBUTIONS, default="normal")
+    parser.add_argument(f"--{prefix}error-rate", type=float, default=0.0)
+    parser.add_argument(f"--{prefix}rate-limit-rate", type=float, default=0.0)
+
+
+def profile_from_args(args, prefix: str = "") -> dict:
+    attr = prefix.replace("-", "_")
+    return {
+        "latency_ms": getattr(args, f"{attr}latency_ms"),
+        "jitter_ms": getattr(args, f"{attr}jitter_ms"),
+        "distribution": getattr(args, f"{attr}latency_dist"),
+        "error_rate": getattr(args, f"{attr}error_rate"),
+        "rate_limit_rate": getattr(args, f"{attr}rate_limit_rate"),
+    }
+
+
+def add_output_arguments(parser: argparse.ArgumentParser):
+    """Argumen khusus fake Gemini: bentuk & ukuran output."""
+    parser.add_argument("--ms-per-output-token", type=float, default=0.0)
+    parser.add_argument("--cv-experiences", type=int, default=2)
+
+
+def output_from_args(args) -> dict:
+    return {"ms_per_output_token": args.ms_per_output_token, "cv_experiences": args.cv_experiences}
+
+
+def config_from_args(args) -> FakeGeminiConfig:
+    return FakeGeminiConfig(**profile_from_args(args), **output_from_args(args))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8090)
+    add_arguments(parser)
+    add_output_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(config_from_args(args)), host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
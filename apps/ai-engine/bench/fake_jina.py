@@ -0,0 +1,112 @@
+"""
+Fake r.jina.ai lokal: `GET /{url}` mengembalikan markdown lowongan kerja seperti Jina Reader,
+lengkap dengan navigasi, cookie banner, dan footer (boilerplate yang biasa ikut ter-scrape).
+Latency, error 5xx, dan 429 bisa diatur seperti fake Gemini.
+
+Jalankan standalone:
+    python -m bench.fake_jina --port 8091 --latency-ms 800
+lalu arahkan ai-engine ke sana dengan JINA_READER_URL=http://127.0.0.1:8091
+"""
+import random
+import asyncio
+import argparse
+import hashlib
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+from bench.fake_gemini import add_arguments, profile_from_args, sample_delay
+
+ROLES = ["Senior Backend Engineer", "Data Analyst", "Product Designer", "Business Development Manager",
+         "Machine Learning Engineer", "Marketing Specialist"]
+REQUIREMENTS = ["Python", "Go", "PostgreSQL", "Kubernetes", "Docker", "SQL", "Tableau", "Figma", "AWS",
+                "stakeholder management", "A/B testing", "REST API design", "CI/CD", "Terraform"]
+
+NAVIGATION = """[Skip to main content](#main)
+* [Jobs](https://careers.example.com/jobs)
+* [Teams](https://careers.example.com/teams)
+* [Life at Example](https://careers.example.com/life)
+* [Sign in](https://careers.example.com/login)
+"""
+
+FOOTER = """
+We use cookies to improve your experience. [Accept all](#) [Manage preferences](#)
+
+* [Privacy Policy](https://careers.example.com/privacy)
+* [Terms](https://careers.example.com/terms)
+* [Contact](https://careers.example.com/contact)
+
+(c) 2026 Example Corp. All rights reserved.
+"""
+
+
+class FakeJinaConfig:
+    def __init__(self, latency_ms: float = 800, jitter_ms: float = 200, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, distribution: str = "normal"):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.distribution = distribution
+        self.requests = 0
+
+
+def job_markdown(url: str) -> str:
+    """Konten deterministik per URL, jadi JD yang sama selalu menghasilkan teks yang sama."""
+    rng = random.Random(hashlib.sha256(url.encode()).hexdigest())
+    role = rng.choice(ROLES)
+    requirements = rng.sample(REQUIREMENTS, 6)
+    lines = [
+        f"Title: {role} - Example Corp Careers",
+        f"URL Source: {url}",
+        "Markdown Content:",
+        NAVIGATION,
+        f"# {role}",
+        "Jakarta, Indonesia (Hybrid) · Full-time",
+        "## About the role",
+        f"We are looking for a {role} to join our growing team and own critical parts of the product.",
+        "## Requirements",
+        *[f"* {rng.randint(2, 6)}+ years of experience with {skill}" for skill in requirements[:4]],
+        "## Nice to have",
+        *[f"* Familiarity with {skill}" for skill in requirements[4:]],
+        "## Benefits",
+        "* Competitive salary and equity",
+        "* Flexible working hours",
+        "[Apply now](https://careers.example.com/apply)",
+        FOOTER,
+    ]
+    return "\n".join(lines)
+
+
+def create_app(config: FakeJinaConfig) -> FastAPI:
+    app = FastAPI(title="Fake Jina Reader")
+
+    @app.get("/__stats")
+    async def stats():
+        return {"requests": config.requests}
+
+    @app.get("/{url:path}")
+    async def read(url: str):
+        config.requests += 1
+        roll = random.random()
+        if roll < config.rate_limit_rate:
+            return PlainTextResponse("Rate limit exceeded (fake).", status_code=429)
+        await asyncio.sleep(sample_delay(config.latency_ms, config.jitter_ms, config.distribution))
+        if roll < config.rate_limit_rate + config.error_rate:
+            return PlainTextResponse("Fake upstream error.", status_code=502)
+        return PlainTextResponse(job_markdown(url))
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8091)
+    add_arguments(parser, latency_ms=800, jitter_ms=200)
+    args = parser.parse_args()
+    uvicorn.run(create_app(FakeJinaConfig(**profile_from_args(args))), host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Load test kapasitas panggilan Gemini paralel: `asyncio.to_thread` (client sync, cara lama)
+vs `client.aio` dengan connection pool bersama (cara sekarang), terhadap fake Gemini lokal.
+
+Limiter per model sengaja dilewati agar yang terukur murni kapasitas transport.
+
+Jalankan dari apps/ai-engine:
+    python -m bench.load_gemini --latency-ms 1000 --concurrency 8 32 128
+"""
+import os
+import time
+import asyncio
+import argparse
+
+from bench.fake_gemini import BackgroundServer, FakeGeminiConfig, create_app
+
+PORT = int(os.getenv("FAKE_GEMINI_PORT", "8090"))
+os.environ["GEMINI_BASE_URL"] = f"http://127.0.0.1:{PORT}"
+os.environ.setdefault("GEMINI_API_KEY", "fake-key")
+
+from google.genai import types  # noqa: E402
+from src.schemas import AnalysisResponse  # noqa: E402
+from src.services import ai_engine  # noqa: E402
+
+CONTENTS = [types.Content(role="user", parts=[types.Part.from_text(text="Analyze this CV. " * 200)])]
+CONFIG = types.GenerateContentConfig(response_mime_type="application/json", response_schema=AnalysisResponse)
+
+
+async def call_thread():
+    return await asyncio.to_thread(ai_engine.client.models.generate_content,
+                                   model=ai_engine.REASONING_MODEL, contents=CONTENTS, config=CONFIG)
+
+
+async def call_aio():
+    return await ai_engine.client.aio.models.generate_content(
+        model=ai_engine.REASONING_MODEL, contents=CONTENTS, config=CONFIG)
+
+
+async def run(call, concurrency: int, config: FakeGeminiConfig):
+    config.max_in_flight = 0
+    start = time.perf_counter()
+    results = await asyncio.gather(*[call() for _ in range(concurrency)], return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    errors = sum(isinstance(r, Exception) for r in results)
+    return elapsed, errors, config.max_in_flight
+
+
+async def main_async(args, config: FakeGeminiConfig):
+    await ai_engine.start_client()
+    # Warm-up: buka koneksi & import lazy di SDK
+    await call_aio()
+    await call_thread()
+
+    print(f"{'mode':<10} {'concurrency':>11} {'wall s':>8} {'req/s':>8} {'peak in-flight':>15} {'errors':>7}")
+    for concurrency in args.concurrency:
+        for name, call in (("to_thread", call_thread), ("aio", call_aio)):
+            elapsed, errors, peak = await run(call, concurrency, config)
+            print(f"{name:<10} {concurrency:>11} {elapsed:>8.2f} {concurrency / elapsed:>8.1f} {peak:>15} {errors:>7}")
+    await ai_engine.close_client()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=1000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 32, 128])
+    args = parser.parse_args()
+
+    config = FakeGeminiConfig(latency_ms=args.latency_ms, jitter_ms=0)
+    with BackgroundServer(create_app(config), PORT):
+        print(f"default executor threads: {min(32, (os.cpu_count() or 1) + 4)}, "
+              f"GEMINI_MAX_CONNECTIONS: {ai_engine.GEMINI_MAX_CONNECTIONS}")
+        asyncio.run(main_async(args, config))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""
+Load test end-to-end ai-engine tanpa memakai kuota.
+
+Fake Gemini dan fake Jina berjalan di proses ini; ai-engine dijalankan sebagai subprocess
+uvicorn (seperti produksi) yang diarahkan ke fake server lewat GEMINI_BASE_URL / JINA_READER_URL.
+Korpus PDF/DOCX dibuat unik per request agar cache dan single-flight tidak mempercantik angka.
+
+Skenario:
+    analyze     POST /api/analyze (JD teks, atau URL lewat fake Jina dengan --jd-source url)
+    customize   POST /api/customize (mode job_desc)
+    extract     ExtractionPool saja, tanpa HTTP dan tanpa Gemini
+
+Output per skenario: p50/p95/p99/max latency, RPS, error per status, dan peak RSS
+(proses server + worker ekstraksi). `--save` menyimpan hasil sebagai baseline,
+`--compare` membandingkan dengan baseline dan exit 1 jika ada regresi di atas `--tolerance`.
+
+Jalankan dari apps/ai-engine:
+    python -m bench.load_test analyze customize extract --requests 200 --concurrency 32
+    python -m bench.load_test analyze --latency-dist lognormal --rate-limit-rate 0.02 --compare baseline.json
+"""
+import os
+import sys
+import json
+import math
+import time
+import asyncio
+import argparse
+import threading
+import subprocess
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from bench.corpus import generate_mixed_corpus
+from bench.fake_gemini import (
+    BackgroundServer, FakeGeminiConfig, create_app as create_gemini_app, add_arguments, profile_from_args,
+    add_output_arguments, output_from_args,
+)
+from bench.fake_jina import FakeJinaConfig, create_app as create_jina_app, job_markdown
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ("analyze", "customize", "extract")
+
+
+# --- MEMORY ---
+
+def _children_map() -> Dict[int, List[int]]:
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # Field ke-4 adalah PPID; nama proses (field 2) bisa mengandung spasi, jadi split setelah ")"
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    return children
+
+
+def _rss_bytes(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def tree_rss_bytes(pid: int) -> Optional[int]:
+    """RSS proses + semua turunannya (worker ekstraksi). None jika /proc tidak tersedia (non-Linux)."""
+    if not os.path.isdir("/proc"):
+        return None
+    children = _children_map()
+    total = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        total += _rss_bytes(current)
+        stack.extend(children.get(current, []))
+    return total
+
+
+class MemorySampler:
+    def __init__(self, pid: int, interval: float = 0.25):
+        self.pid = pid
+        self.interval = interval
+        self.peak: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = tree_rss_bytes(self.pid)
+            if rss is not None:
+                self.peak = max(self.peak or 0, rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+# --- STATISTIK ---
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank
+    index = max(0, math.ceil(q / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def summarize(results: List[Tuple[float, str]], wall: float, peak_rss: Optional[int]) -> dict:
+    latencies = sorted(latency for latency, status in results if status == "ok")
+    errors: Dict[str, int] = {}
+    for _, status in results:
+        if status != "ok":
+            errors[status] = errors.get(status, 0) + 1
+    return {
+        "requests": len(results),
+        "ok": len(latencies),
+        "errors": errors,
+        "wall_s": round(wall, 3),
+        "rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else 0.0,
+        "peak_rss_mb": round(peak_rss / 2 ** 20, 1) if peak_rss else None,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Daftar regresi (latency p95/p99 naik, RPS turun, atau memori naik lebih dari tolerance)."""
+    regressions = []
+    for scenario, current in results.items():
+        base = baseline.get(scenario)
+        if not base:
+            continue
+        for key in ("p95_ms", "p99_ms", "peak_rss_mb"):
+            if base.get(key) and current.get(key) and current[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{scenario}: {key} {base[key]} -> {current[key]}")
+        if base.get("rps") and current["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{scenario}: rps {base['rps']} -> {current['rps']}")
+        if current["ok"] < current["requests"] and base.get("ok") == base.get("requests"):
+            regressions.append(f"{scenario}: errors {current['errors']}")
+    return regressions
+
+
+# --- SKENARIO ---
+
+async def run_requests(send, count: int, concurrency: int) -> Tuple[List[Tuple[float, str]], float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    results: List[Tuple[float, str]] = []
+
+    async def one(index: int):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                status = await send(index)
+            except Exception as e:
+                status = type(e).__name__
+            results.append((time.perf_counter() - start, status))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    return results, time.perf_counter() - start
+
+
+def job_url_for(index: int, args) -> str:
+    return f"https://careers.example.com/jobs/{index % args.job_urls}"
+
+
+async def http_scenario(scenario: str, corpus, args, base_url: str):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.request_timeout) as client:
+        async def send(index: int) -> str:
+            name, content, content_type = corpus[index % len(corpus)]
+            files = {"file": (name, content, content_type)}
+            url = job_url_for(index, args)
+            if scenario == "analyze":
+                data = {"job_url": url} if args.jd_source == "url" else {"job_description": job_markdown(url)}
+                response = await client.post("/api/analyze", files=files, data=data)
+            else:
+                data = {"mode": "job_desc", "job_description": job_markdown(url)}
+                response = await client.post("/api/customize", files=files, data=data)
+            if response.status_code != 200:
+                return str(response.status_code)
+            body = response.json()
+            # Fallback AI (200 tapi berisi pesan error) dihitung sebagai gagal
+            summary = body.get("analysis", {}).get("overall_summary", "") if scenario == "analyze" else ""
+            if summary.startswith("Error: ") or body.get("full_name") == "Error Generating CV":
+                return "ai_fallback"
+            return "ok"
+
+        return await run_requests(send, args.requests, args.concurrency)
+
+
+async def extract_scenario(corpus, args):
+    from src.services.extraction_pool import ExtractionPool
+
+    pool = ExtractionPool(args.extraction_workers, 50, 60, args.requests)
+    pool.start()
+    try:
+        # Warm-up: spawn worker + import pdfplumber di tiap worker
+        await asyncio.gather(*(pool.extract(content, content_type)
+                               for _, content, content_type in corpus[:max(args.extraction_workers, 1)]))
+
+        async def send(index: int) -> str:
+            _, content, content_type = corpus[index % len(corpus)]
+            await pool.extract(content, content_type)
+            return "ok"
+
+        return await run_requests(send, args.requests, args.concurrency)
+    finally:
+        pool.shutdown()
+
+
+# --- SERVER ---
+
+def start_server(args, gemini_url: str, jina_url: str) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "GEMINI_API_KEY": env.get("GEMINI_API_KEY", "fake-key"),
+        "GEMINI_BASE_URL": gemini_url,
+        "JINA_READER_URL": jina_url,
+        "EXTRACTION_WORKERS": str(args.extraction_workers),
+        # Default tanpa result cache: yang diukur adalah pekerjaan sebenarnya
+        "RESULT_CACHE_BACKEND": env.get("RESULT_CACHE_BACKEND", "memory" if args.with_cache else "off"),
+    })
+    for item in args.server_env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    if args.web_workers:
+        # Mode produksi: parent preload + fork worker (serve.py)
+        env.update({"WEB_CONCURRENCY": str(args.web_workers), "HOST": "127.0.0.1", "PORT": str(args.port)})
+        command = [sys.executable, "serve.py"]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(args.port),
+                   "--log-level", "warning", "--timeout-keep-alive", "60"]
+    process = subprocess.Popen(command, cwd=APP_DIR, env=env)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"ai-engine berhenti saat startup (exit {process.returncode})")
+        try:
+            if httpx.get(f"http://127.0.0.1:{args.port}/health", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("ai-engine tidak siap dalam 60 detik")
+
+
+def print_report(results: dict):
+    header = (f"{'scenario':<10} {'ok/req':>9} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+              f"{'max ms':>9} {'peak RSS MB':>12}  errors")
+    print(header)
+    print("-" * len(header))
+    for scenario, r in results.items():
+        print(f"{scenario:<10} {r['ok']:>4}/{r['requests']:<4} {r['rps']:>8} {r['p50_ms']:>9} {r['p95_ms']:>9} "
+              f"{r['p99_ms']:>9} {r['max_ms']:>9} {str(r['peak_rss_mb']):>12}  {r['errors'] or '-'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("scenarios", nargs="+", choices=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--corpus-size", type=int, default=None, help="Default: sama dengan --requests (semua unik)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--jd-source", choices=("text", "url"), default="text")
+    parser.add_argument("--job-urls", type=int, default=10, help="Jumlah JD berbeda yang dipakai bergiliran")
+    parser.add_argument("--extraction-workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--with-cache", action="store_true", help="Aktifkan result cache di server")
+    parser.add_argument("--web-workers", type=int, default=0,
+                        help="Jalankan server lewat serve.py dengan N worker (default: satu proses uvicorn)")
+    parser.add_argument("--server-env", action="append", default=[], metavar="KEY=VALUE")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--gemini-port", type=int, default=8090)
+    parser.add_argument("--jina-port", type=int, default=8091)
+    parser.add_argument("--request-timeout", type=float, default=300)
+    add_arguments(parser)
+    add_output_arguments(parser)
+    add_arguments(parser, prefix="jina-", latency_ms=800, jitter_ms=200)
+    parser.add_argument("--save", help="Simpan hasil (JSON) sebagai baseline")
+    parser.add_argument("--compare", help="Baseline JSON; exit 1 jika regresi melebihi tolerance")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args()
+
+    corpus = generate_mixed_corpus(args.corpus_size or args.requests, args.seed)
+    gemini_config = FakeGeminiConfig(**profile_from_args(args), **output_from_args(args))
+    jina_config = FakeJinaConfig(**profile_from_args(args, "jina-"))
+    results = {}
+
+    with BackgroundServer(create_gemini_app(gemini_config), args.gemini_port) as gemini, \
+            BackgroundServer(create_jina_app(jina_config), args.jina_port) as jina:
+        http_scenarios = [s for s in args.scenarios if s != "extract"]
+        if http_scenarios:
+            server = start_server(args, gemini.url, jina.url)
+            try:
+                for scenario in http_scenarios:
+                    with MemorySampler(server.pid) as memory:
+                        runs, wall = asyncio.run(http_scenario(scenario, corpus, args, f"http://127.0.0.1:{args.port}"))
+                    results[scenario] = summarize(runs, wall, memory.peak)
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+
+        if "extract" in args.scenarios:
+            with MemorySampler(os.getpid()) as memory:
+                runs, wall = asyncio.run(extract_scenario(corpus, args))
+            results["extract"] = summarize(runs, wall, memory.peak)
+
+    print(f"corpus: {len(corpus)} dokumen, concurrency {args.concurrency}, "
+          f"fake gemini {gemini_config.latency_ms}ms ({gemini_config.distribution}), "
+          f"gemini requests {gemini_config.requests}, jina requests {jina_config.requests}")
+    print_report(results)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("REGRESSION:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"Tidak ada regresi (tolerance {args.tolerance:.0%}).")
+
+
+if __name__ == "__main__":
+    main()
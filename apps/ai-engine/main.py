@@ -1,17 +1,108 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+import time
+
+# Durasi import app (fastapi, google-genai, service) dilaporkan di /health & /metrics
+_IMPORT_STARTED = time.perf_counter()
+
+# .env dimuat sebelum service di-import: konfigurasi dibaca dari environment saat import modul
+from dotenv import load_dotenv
+load_dotenv()
+
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
 from fastapi.concurrency import run_in_threadpool
-from typing import Optional, Dict, Any
-import json
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, List
+import os
+import io
+import asyncio
+import zipfile
 from datetime import datetime
 
 
-from src.schemas import AnalysisResponse, ImprovedCVResult
-from src.services.extractor import extract_text_from_bytes
-from src.services.ai_engine import analyze_cv, customize_cv 
-from src.services.scraper import scrape_job_with_jina
+from src.schemas import ImprovedCVResult
+from src.services.extraction_pool import extraction_pool, ExtractionBusyError
+from src.services.ai_engine import (
+    analyze_cv, analyze_cv_stream, analyze_only, customize_cv, is_fallback_result, is_cacheable_result,
+    start_client, close_client, coalescing_snapshot, context_cache, customize_section_stats, CACHE_VERSION
+)
+from src.services.scraper import (
+    scrape_job_with_jina, scraper_snapshot, start_client as start_scraper_client,
+    close_client as close_scraper_client
+)
+from src.services.jobs import job_manager, JobQueueFullError, WebhookNotAllowedError
+from src.services.rate_limiter import limiter_snapshot
+from src.services.usage import track_usage, usage_snapshot
+from src.services.deadlines import (
+    request_deadline, deadline_from_header, deadline_snapshot, track_model_fallbacks, fallback_header_value,
+    REQUEST_DEADLINE
+)
+from src.services.prompt_budget import prompt_budget_stats
+from src.services.skill_match import prescreen_stats, PRESCREEN_BATCH_ACTION
+from src.services.json_parsing import FastJSONResponse, dumps_str
+from src.services.metrics import (
+    span, track_timings, server_timing_header, render_metrics, Gauge, HTTP_REQUEST_SECONDS
+)
+from src.services.cache import result_cache, result_cache_key, text_cache, cv_data_cache, hash_parts
+from src.services.extractor import DocumentRejectedError
+from src.services.uploads import (
+    StoredUpload, UploadTooLargeError, receive_upload, UPLOAD_MAX_BYTES
+)
+from src.services.startup import startup_state
+
 
-app = FastAPI(title="CV Analyzer API", version="1.6.0")
+async def warm_up():
+    """Worker ekstraksi di-spawn & library PDF di-import sebelum /health melaporkan siap."""
+    started = time.perf_counter()
+    try:
+        startup_state.warm_workers = await extraction_pool.warm_up()
+    except Exception as e:
+        # Pool dibuat ulang otomatis saat request pertama; jangan tahan replika di status starting
+        print(f"Warm-up Error: {e}")
+        startup_state.error = str(e)
+    startup_state.record("warmup", started)
+    startup_state.mark_ready()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Client dibuat per proses di sini (bukan saat import) agar aman di-fork oleh serve.py
+    started = time.perf_counter()
+    await start_client()
+    extraction_pool.start()
+    await start_scraper_client()
+    await job_manager.start()
+    startup_state.record("startup", started)
+    # Server langsung menerima koneksi; readiness (/health) menunggu warm-up selesai
+    warm_task = asyncio.create_task(warm_up())
+    yield
+    warm_task.cancel()
+    await job_manager.stop()
+    extraction_pool.shutdown()
+    await result_cache.close()
+    await close_client()
+    await close_scraper_client()
+
+
+# --- KONFIGURASI BATCH ANALYSIS ---
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "500"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_EXTRACT_CONCURRENCY = int(os.getenv("BATCH_EXTRACT_CONCURRENCY", str(max(extraction_pool.workers, 1) * 2)))
+
+PDF_TYPE = "application/pdf"
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+EXTENSION_TYPES = {".pdf": PDF_TYPE, ".docx": DOCX_TYPE}
+# Total body batch (beberapa file / satu zip); tiap CV tetap dibatasi UPLOAD_MAX_BYTES
+BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_BYTES", str(200 * 1024 * 1024)))
+# Ruang untuk field form + boundary multipart di atas ukuran file
+UPLOAD_FORM_OVERHEAD = 1024 * 1024
+# Total isi zip setelah dekompresi, dan rasio dekompresi maksimum per member (zip bomb)
+BATCH_MAX_UNCOMPRESSED_BYTES = int(os.getenv("BATCH_MAX_UNCOMPRESSED_BYTES", str(512 * 1024 * 1024)))
+BATCH_MAX_COMPRESSION_RATIO = float(os.getenv("BATCH_MAX_COMPRESSION_RATIO", "100"))
+
+
+# Response JSON lewat orjson (jika terpasang) tanpa escape non-ASCII
+app = FastAPI(title="CV Analyzer API", version="1.6.0", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,21 +110,141 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Gemini-Usage", "X-Model-Fallback", "Server-Timing"],
 )
 
+
+@app.middleware("http")
+async def reject_oversized_body(request: Request, call_next):
+    """Tolak upload dari header Content-Length sebelum body multipart dibaca & di-spool."""
+    length = request.headers.get("content-length")
+    if request.method == "POST" and length and length.isdigit():
+        limit = BATCH_MAX_BYTES if request.url.path == "/api/analyze/batch" else UPLOAD_MAX_BYTES
+        if int(length) > limit + UPLOAD_FORM_OVERHEAD:
+            return JSONResponse(
+                status_code=413,
+                content={"detail": f"Request melebihi batas ukuran {limit / (1024 * 1024):g} MB."},
+            )
+    return await call_next(request)
+
+
+@app.middleware("http")
+async def request_instrumentation(request: Request, call_next):
+    """
+    Per request: durasi tiap tahap di header Server-Timing, token usage Gemini
+    (termasuk porsi dari context cache) di header X-Gemini-Usage, fallback model karena deadline
+    di header X-Model-Fallback, dan histogram durasi per route.
+    Endpoint streaming masih berjalan saat header dikirim, jadi isinya hanya tahap sebelum stream dibuka.
+    Semua panggilan Gemini di bawah request ikut dibatasi deadline request (X-Request-Timeout / REQUEST_DEADLINE);
+    batch memakai deadline per CV.
+    """
+    started = time.perf_counter()
+    deadline = None if request.url.path == "/api/analyze/batch" else deadline_from_header(
+        request.headers.get("x-request-timeout"))
+    with track_usage() as usage, track_timings() as timings, request_deadline(deadline), \
+            track_model_fallbacks() as fallbacks:
+        response = await call_next(request)
+    elapsed = time.perf_counter() - started
+
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.observe(elapsed, method=request.method, route=getattr(route, "path", "unmatched"),
+                                 status=response.status_code)
+    response.headers["Server-Timing"] = server_timing_header(timings, elapsed)
+    response.headers["Timing-Allow-Origin"] = "*"
+    if usage.calls:
+        response.headers["X-Gemini-Usage"] = usage.header_value()
+    if fallbacks:
+        response.headers["X-Model-Fallback"] = fallback_header_value(fallbacks)
+    return response
+
 @app.api_route("/health", methods=["GET", "HEAD"])
 async def health_check():
-    """Health check endpoint for Docker healthcheck"""
-    return {"status": "healthy", "service": "ai-engine"}
+    """Readiness untuk Docker healthcheck / load balancer: 503 sampai warm-up selesai, plus durasi startup"""
+    if not startup_state.ready:
+        return JSONResponse(status_code=503, content={"status": "starting", "service": "ai-engine"})
+    return {"status": "healthy", "service": "ai-engine", "startup": startup_state.snapshot()}
 
-@app.post("/api/analyze")
-async def analyze_endpoint(
-    file: UploadFile = File(...),
-    job_description: Optional[str] = Form(None),
-    job_url: Optional[str] = Form(None),
-    current_date: Optional[str] = Form(None) 
-):
-  
+@app.api_route("/health/live", methods=["GET", "HEAD"])
+async def liveness_check():
+    """Liveness: proses menjawab request, tanpa menunggu warm-up"""
+    return {"status": "alive", "service": "ai-engine"}
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Counter hit/miss result cache untuk sizing"""
+    return {
+        "result_cache": result_cache.snapshot(),
+        "text_cache": text_cache.snapshot(),
+        "cv_data_cache": cv_data_cache.snapshot(),
+        "scraper": scraper_snapshot(),
+    }
+
+@app.get("/api/extraction/stats")
+async def extraction_stats():
+    """Status process pool ekstraksi dokumen (antrian, timeout, recycle)"""
+    return extraction_pool.snapshot()
+
+@app.get("/api/gemini/stats")
+async def gemini_stats():
+    """Queue depth, wait time, rate efektif per model Gemini, jumlah panggilan yang di-dedup, token usage, context cache, prompt budget, deadline/hedging, pre-screening skill & customize per bagian"""
+    return {
+        "models": limiter_snapshot(),
+        "coalescing": coalescing_snapshot(),
+        "usage": usage_snapshot(),
+        "context_cache": context_cache.snapshot(),
+        "prompt_budget": prompt_budget_stats.snapshot(),
+        "deadlines": deadline_snapshot(),
+        "prescreen": prescreen_stats.snapshot(),
+        "customize_sections": customize_section_stats.snapshot(),
+    }
+
+
+# Gauge diisi dari snapshot service setiap kali /metrics di-scrape
+GEMINI_QUEUE_DEPTH = Gauge("ai_engine_gemini_queue_depth", "Panggilan yang menunggu limiter", ("model",))
+GEMINI_IN_FLIGHT = Gauge("ai_engine_gemini_in_flight", "Panggilan Gemini yang sedang berjalan", ("model",))
+GEMINI_CURRENT_RPM = Gauge("ai_engine_gemini_current_rpm", "Rate efektif limiter (AIMD)", ("model",))
+EXTRACTION_PENDING = Gauge("ai_engine_extraction_pending", "Dokumen yang sedang / menunggu diekstrak")
+JOBS_QUEUED = Gauge("ai_engine_jobs_queued", "Job async di antrian")
+CACHE_HIT_RATIO = Gauge("ai_engine_cache_hit_ratio", "Hit ratio per cache", ("cache",))
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text format: histogram per tahap / model / attempt, token counter, dan gauge antrian."""
+    for model, snapshot in limiter_snapshot().items():
+        GEMINI_QUEUE_DEPTH.set(snapshot["queue_depth"], model=model)
+        GEMINI_IN_FLIGHT.set(snapshot["in_flight"], model=model)
+        GEMINI_CURRENT_RPM.set(snapshot["current_rpm"], model=model)
+    EXTRACTION_PENDING.set(extraction_pool.pending)
+    JOBS_QUEUED.set(job_manager.snapshot()["queued"])
+    for name, cache in (("result", result_cache), ("text", text_cache), ("cv_data", cv_data_cache)):
+        CACHE_HIT_RATIO.set(cache.snapshot()["hit_ratio"], cache=name)
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+async def read_upload(file: UploadFile, max_bytes: int = UPLOAD_MAX_BYTES) -> StoredUpload:
+    """Upload di-stream per chunk (file besar ke temp file); pemanggil wajib close()."""
+    try:
+        with span("upload_read"):
+            return await receive_upload(file, max_bytes)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
+async def extract_cv_text(upload: StoredUpload) -> str:
+    """Ekstraksi teks dengan cache berbasis hash upload, dipakai bersama oleh analyze & customize."""
+    key = hash_parts("text", upload.digest, upload.content_type)
+    cached = text_cache.get(key)
+    if cached is not None:
+        return cached
+
+    with span("extraction"):
+        text = await extraction_pool.extract(upload.source, upload.content_type)
+    text_cache.set(key, text, len(text.encode("utf-8")))
+    return text
+
+async def resolve_job_description(job_description: Optional[str], job_url: Optional[str]) -> str:
+    """Prioritas: teks JD -> scraping URL -> AUTO_DETECT_ROLE."""
     final_jd = ""
     if job_description and job_description.strip():
         final_jd = job_description
@@ -61,28 +272,63 @@ async def analyze_endpoint(
     # Blok ini tidak akan dieksekusi jika URL error, karena sudah terpotong oleh raise HTTPException di atas.
     if not final_jd:
         final_jd = "AUTO_DETECT_ROLE"
+    return final_jd
 
-    
-    content = await file.read()
+
+async def load_cv_text(upload: StoredUpload) -> str:
+    """extract_cv_text dengan mapping error ke HTTPException."""
     try:
-        cv_text = await run_in_threadpool(
-            extract_text_from_bytes, 
-            content, 
-            file.content_type
-        )
+        return await extract_cv_text(upload)
+    except ExtractionBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except DocumentRejectedError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Gagal membaca file: {str(e)}")
 
+
+def mark_result_cache_hit(result: Dict[str, Any], started: float) -> Dict[str, Any]:
+    """Meta hasil dari result cache menggantikan meta jalur (single/parallel/fast) saat pertama dihitung."""
+    result["meta"] = {"path": "result_cache", "reason": "cache_hit",
+                      "latency_ms": round((time.perf_counter() - started) * 1000, 1)}
+    return result
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {dumps_str(data)}\n\n"
+
+
+async def run_analyze(upload: StoredUpload, final_jd: str, current_date: str,
+                      prescreen_action: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Result cache -> ekstraksi -> analyze_cv. Dipakai oleh endpoint sinkron maupun job worker.
+    `prescreen_action` menimpa PRESCREEN_ACTION (batch memakai PRESCREEN_BATCH_ACTION).
+    """
+    # Upload + JD + tanggal yang identik -> kembalikan hasil sebelumnya tanpa memanggil Gemini
+    started = time.perf_counter()
+    cache_key = result_cache_key("analyze", upload.digest, final_jd, None, current_date, CACHE_VERSION)
+    with span("result_cache"):
+        cached = await result_cache.get(cache_key)
+    if cached is not None:
+        return mark_result_cache_hit(cached, started)
+
+    cv_text = await load_cv_text(upload)
+
     if len(cv_text) < 50:
         raise HTTPException(status_code=400, detail="CV terlalu pendek atau kosong.")
 
    
     try:
         
-        result = await analyze_cv(cv_text, final_jd, current_date)
+        result = await analyze_cv(cv_text, final_jd, current_date, prescreen_action)
         
         if not result:
             raise HTTPException(status_code=500, detail="AI Analysis returned empty result.")
+
+        # Hasil pre-screening (skip maupun downgrade) dan jalur fast karena beban / deadline
+        # tidak di-cache: key cache tidak membedakan jalur
+        if is_cacheable_result(result):
+            await result_cache.set(cache_key, result)
             
         return result
 
@@ -91,14 +337,249 @@ async def analyze_endpoint(
         raise HTTPException(status_code=500, detail=f"AI Engine Error: {str(e)}")
 
 
-@app.post("/api/customize", response_model=ImprovedCVResult)
-async def customize_endpoint(
+@app.post("/api/analyze")
+async def analyze_endpoint(
     file: UploadFile = File(...),
-    mode: str = Form(...),
     job_description: Optional[str] = Form(None),
-    analysis_context: Optional[str] = Form(None),
+    job_url: Optional[str] = Form(None),
+    current_date: Optional[str] = Form(None) 
+):
+  
+    final_jd = await resolve_job_description(job_description, job_url)
+
+    if not current_date:
+        current_date = datetime.now().strftime("%Y-%m-%d")
+    
+    upload = await read_upload(file)
+    try:
+        # Response langsung: hasil sudah berupa dict hasil model_dump, tidak perlu jsonable_encoder lagi
+        return FastJSONResponse(await run_analyze(upload, final_jd, current_date))
+    finally:
+        upload.close()
+
+
+@app.post("/api/analyze/stream")
+async def analyze_stream_endpoint(
+    file: UploadFile = File(...),
+    job_description: Optional[str] = Form(None),
+    job_url: Optional[str] = Form(None),
     current_date: Optional[str] = Form(None)
 ):
+    """
+    Varian Server-Sent Events dari /api/analyze. Urutan event:
+    `prescreen` (skor skill lokal, jika ada JD) -> `cv_data` -> `analysis_section` (berulang)
+    -> `result` (payload sama dengan /api/analyze),
+    atau `error` jika AI gagal di tengah stream. `analysis_reset` dikirim jika stream analisis putus
+    setelah ada section: client membuang section yang sudah tampil dan menunggu `result`.
+    Pre-screening dan routing model sama dengan /api/analyze.
+    """
+    final_jd = await resolve_job_description(job_description, job_url)
+
+    if not current_date:
+        current_date = datetime.now().strftime("%Y-%m-%d")
+
+    upload = await read_upload(file)
+
+    started = time.perf_counter()
+    cache_key = result_cache_key("analyze", upload.digest, final_jd, None, current_date, CACHE_VERSION)
+    with span("result_cache"):
+        cached = await result_cache.get(cache_key)
+    if cached is not None:
+        mark_result_cache_hit(cached, started)
+
+    # Validasi file dilakukan sebelum stream dibuka agar error tetap berupa HTTP 4xx biasa
+    # File tidak dibutuhkan lagi setelah teks diekstrak, jadi temp file tidak bertahan selama stream
+    cv_text = ""
+    try:
+        if cached is None:
+            cv_text = await load_cv_text(upload)
+            if len(cv_text) < 50:
+                raise HTTPException(status_code=400, detail="CV terlalu pendek atau kosong.")
+    finally:
+        upload.close()
+
+    async def event_stream():
+        if cached is not None:
+            yield sse_event("cv_data", cached["cv_data"])
+            yield sse_event("result", cached)
+            return
+
+        try:
+            async for event, payload in analyze_cv_stream(cv_text, final_jd, current_date):
+                if event == "result" and is_cacheable_result(payload):
+                    await result_cache.set(cache_key, payload)
+                yield sse_event(event, payload)
+        except Exception as e:
+            print(f"AI Stream Error: {e}")
+            yield sse_event("error", {"detail": f"AI Engine Error: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def unpack_batch_archive(data: StoredUpload, items: List[tuple]):
+    """
+    Tambahkan semua PDF/DOCX dari zip ke `items` sebagai [(nama, StoredUpload | None, error)].
+    Sinkron (dekompresi + tulis temp file): panggil lewat run_in_threadpool.
+    Sebelum member ditulis, ukuran dari header zip dicek terhadap UPLOAD_MAX_BYTES,
+    BATCH_MAX_COMPRESSION_RATIO, dan sisa BATCH_MAX_UNCOMPRESSED_BYTES. zipfile tidak pernah membaca
+    lebih dari ukuran di header, jadi header yang berbohong pun tidak bisa melewati batas ini.
+    """
+    source = data.path if data.spooled else io.BytesIO(data.source)
+    try:
+        archive = zipfile.ZipFile(source)
+    except zipfile.BadZipFile:
+        raise HTTPException(400, "Archive bukan file zip yang valid.")
+
+    total = 0
+    with archive:
+        for info in archive.infolist():
+            name = info.filename
+            extension = os.path.splitext(name)[1].lower()
+            if info.is_dir() or name.startswith("__MACOSX/") or extension not in EXTENSION_TYPES:
+                continue
+            if len(items) >= BATCH_MAX_FILES:
+                raise HTTPException(400, f"Maksimal {BATCH_MAX_FILES} CV per batch.")
+            if info.file_size > UPLOAD_MAX_BYTES:
+                items.append((name, None, f"File melebihi batas ukuran {UPLOAD_MAX_BYTES / (1024 * 1024):g} MB."))
+                continue
+            if info.file_size > BATCH_MAX_COMPRESSION_RATIO * max(info.compress_size, 1):
+                items.append((name, None, "Rasio kompresi file tidak wajar, file dilewati."))
+                continue
+            total += info.file_size
+            if total > BATCH_MAX_UNCOMPRESSED_BYTES:
+                raise HTTPException(
+                    413, f"Isi archive melebihi batas {BATCH_MAX_UNCOMPRESSED_BYTES / (1024 * 1024):g} MB.")
+            try:
+                with archive.open(info) as member:
+                    items.append((name, StoredUpload.from_stream(member, name, EXTENSION_TYPES[extension]), None))
+            except UploadTooLargeError as e:
+                items.append((name, None, str(e)))
+
+
+@app.post("/api/analyze/batch")
+async def analyze_batch_endpoint(
+    files: Optional[List[UploadFile]] = File(None),
+    archive: Optional[UploadFile] = File(None),
+    job_description: Optional[str] = Form(None),
+    job_url: Optional[str] = Form(None),
+    current_date: Optional[str] = Form(None),
+    include_cv_data: bool = Form(False)
+):
+    """
+    Ranking banyak CV terhadap satu JD. Input: beberapa `files` dan/atau satu `archive` zip.
+    Response NDJSON, satu baris per event:
+    `accepted` -> `result` / `error` per file (urutan selesai, dengan rank sementara) -> `ranking` final.
+    """
+    items = []
+
+    def close_items():
+        for _, upload, _ in items:
+            if upload is not None:
+                upload.close()
+
+    try:
+        for file in files or []:
+            try:
+                upload = await read_upload(file)
+            except HTTPException as e:
+                items.append((file.filename, None, e.detail))
+                continue
+            if upload.content_type not in (PDF_TYPE, DOCX_TYPE):
+                upload.content_type = EXTENSION_TYPES.get(
+                    os.path.splitext(upload.filename or "")[1].lower(), upload.content_type)
+            items.append((upload.filename, upload, None))
+        if archive is not None:
+            archive_upload = await read_upload(archive, BATCH_MAX_BYTES)
+            try:
+                # Dekompresi ratusan member tidak boleh menahan event loop worker ini
+                await run_in_threadpool(unpack_batch_archive, archive_upload, items)
+            finally:
+                archive_upload.close()
+
+        if not items:
+            raise HTTPException(400, "Sertakan minimal satu CV (files) atau archive zip.")
+        if len(items) > BATCH_MAX_FILES:
+            raise HTTPException(400, f"Maksimal {BATCH_MAX_FILES} CV per batch.")
+
+        # JD di-scrape sekali untuk seluruh batch
+        final_jd = await resolve_job_description(job_description, job_url)
+    except BaseException:
+        close_items()
+        raise
+    if not current_date:
+        current_date = datetime.now().strftime("%Y-%m-%d")
+
+    extract_semaphore = asyncio.Semaphore(BATCH_EXTRACT_CONCURRENCY)
+    analysis_semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def process(index: int, name: str, upload: Optional[StoredUpload], upload_error: Optional[str]):
+        if upload is None:
+            return index, name, None, upload_error
+        try:
+            if include_cv_data:
+                # Deadline per CV mulai dihitung setelah dapat giliran, bukan sejak batch diterima
+                async with analysis_semaphore:
+                    with request_deadline(REQUEST_DEADLINE):
+                        result = await run_analyze(upload, final_jd, current_date, PRESCREEN_BATCH_ACTION)
+            else:
+                async with extract_semaphore:
+                    cv_text = await load_cv_text(upload)
+                upload.close()
+                if len(cv_text) < 50:
+                    raise HTTPException(status_code=400, detail="CV terlalu pendek atau kosong.")
+                async with analysis_semaphore:
+                    with request_deadline(REQUEST_DEADLINE):
+                        result = await analyze_only(cv_text, final_jd, current_date)
+            if is_fallback_result(result):
+                raise ValueError(result["meta"].get("degraded") or result["analysis"]["overall_summary"])
+            return index, name, result, None
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            return index, name, None, detail
+        finally:
+            upload.close()
+
+    def line(payload: Dict[str, Any]) -> str:
+        return dumps_str(payload) + "\n"
+
+    async def event_stream():
+        yield line({"event": "accepted", "total": len(items)})
+        tasks = [asyncio.create_task(process(i, *item)) for i, item in enumerate(items)]
+        scores = []
+        failed = []
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, name, result, error = await next_done
+                if error is not None:
+                    failed.append({"index": index, "file": name, "detail": error})
+                    yield line({"event": "error", "index": index, "file": name, "detail": error})
+                    continue
+                score = result["analysis"]["overall_score"]
+                scores.append({"index": index, "file": name, "score": score,
+                               "candidate_name": result["analysis"]["candidate_name"]})
+                # Rank sementara di antara CV yang sudah selesai
+                rank = 1 + sum(1 for other in scores if other["score"] > score)
+                yield line({"event": "result", "index": index, "file": name, "score": score,
+                            "provisional_rank": rank, **result})
+        finally:
+            for task in tasks:
+                task.cancel()
+            close_items()
+
+        ranking = sorted(scores, key=lambda item: item["score"], reverse=True)
+        for position, item in enumerate(ranking, start=1):
+            item["rank"] = position
+        yield line({"event": "ranking", "ranking": ranking, "failed": failed,
+                    "completed": len(scores), "total": len(items)})
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+
+def resolve_customize_context(mode: str, job_description: Optional[str], analysis_context: Optional[str]) -> str:
     final_context = ""
     
     if mode == "job_desc":
@@ -113,26 +594,159 @@ async def customize_endpoint(
             final_context = analysis_context 
     else:
         raise HTTPException(400, "Mode tidak valid.")
+    return final_context
 
-  
-    content = await file.read()
-    try:
-        cv_text = await run_in_threadpool(
-            extract_text_from_bytes, 
-            content, 
-            file.content_type
-        )
-    except Exception as e:
-        raise HTTPException(400, f"Gagal membaca file: {str(e)}")
+
+async def run_customize(upload: StoredUpload, mode: str, final_context: str, current_date: str) -> Dict[str, Any]:
+    cache_key = result_cache_key("customize", upload.digest, final_context, mode, current_date, CACHE_VERSION)
+    with span("result_cache"):
+        cached = await result_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    cv_text = await load_cv_text(upload)
 
     
     try:
-        result = await customize_cv(cv_text, mode, final_context, current_date)
+        with track_model_fallbacks() as fallbacks:
+            result = await customize_cv(cv_text, mode, final_context, current_date)
+        # Dicek pada model, sebelum model_dump: stub "Error Generating CV" tidak boleh masuk cache.
+        # CV yang (sebagian) ditulis FAST_MODEL karena deadline juga tidak, key-nya milik REASONING_MODEL.
+        cacheable = not is_fallback_result(result) and not fallbacks
+        result = result.model_dump()
+        if cacheable:
+            await result_cache.set(cache_key, result)
         return result
     except Exception as e:
         print(f"Customize Error: {e}")
         raise HTTPException(500, "Gagal meng-generate CV baru.")
 
+
+@app.post("/api/customize", response_model=ImprovedCVResult)
+async def customize_endpoint(
+    file: UploadFile = File(...),
+    mode: str = Form(...),
+    job_description: Optional[str] = Form(None),
+    analysis_context: Optional[str] = Form(None),
+    current_date: Optional[str] = Form(None)
+):
+    final_context = resolve_customize_context(mode, job_description, analysis_context)
+
+    if not current_date:
+        current_date = datetime.now().strftime("%Y-%m-%d")
+  
+    upload = await read_upload(file)
+    try:
+        # Hasil sudah tervalidasi sebagai ImprovedCVResult; response_model hanya untuk skema OpenAPI
+        return FastJSONResponse(await run_customize(upload, mode, final_context, current_date))
+    finally:
+        upload.close()
+
+
+# --- ASYNC JOB MODE (submit -> poll / webhook) ---
+
+def submit_job(kind: str, runner, cv_id: Optional[str], webhook_url: Optional[str],
+               upload: StoredUpload) -> JSONResponse:
+    """`upload` milik job: ditutup oleh runner setelah selesai, atau di sini jika job ditolak."""
+    try:
+        job = job_manager.submit(kind, runner, cv_id=cv_id, webhook_url=webhook_url)
+    except JobQueueFullError as e:
+        upload.close()
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+    except WebhookNotAllowedError as e:
+        upload.close()
+        raise HTTPException(status_code=400, detail=str(e))
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job.id, "status": job.status, "status_url": f"/api/jobs/{job.id}"},
+    )
+
+
+@app.post("/api/jobs/analyze", status_code=202)
+async def analyze_job_endpoint(
+    file: UploadFile = File(...),
+    job_description: Optional[str] = Form(None),
+    job_url: Optional[str] = Form(None),
+    current_date: Optional[str] = Form(None),
+    cv_id: Optional[str] = Form(None),
+    webhook_url: Optional[str] = Form(None)
+):
+    """Versi async /api/analyze: langsung return job id, hasil via GET /api/jobs/{id} atau webhook."""
+    if not current_date:
+        current_date = datetime.now().strftime("%Y-%m-%d")
+
+    upload = await read_upload(file)
+
+    # Validasi file di depan agar error upload tetap 4xx; hasil ekstraksi masuk text cache
+    try:
+        cv_text = await load_cv_text(upload)
+        if len(cv_text) < 50:
+            raise HTTPException(status_code=400, detail="CV terlalu pendek atau kosong.")
+    except BaseException:
+        upload.close()
+        raise
+
+    async def runner():
+        try:
+            # Scraping JD (bisa lama) dilakukan di worker, bukan di request
+            final_jd = await resolve_job_description(job_description, job_url)
+            return await run_analyze(upload, final_jd, current_date)
+        finally:
+            upload.close()
+
+    return submit_job("analyze", runner, cv_id, webhook_url, upload)
+
+
+@app.post("/api/jobs/customize", status_code=202)
+async def customize_job_endpoint(
+    file: UploadFile = File(...),
+    mode: str = Form(...),
+    job_description: Optional[str] = Form(None),
+    analysis_context: Optional[str] = Form(None),
+    current_date: Optional[str] = Form(None),
+    cv_id: Optional[str] = Form(None),
+    webhook_url: Optional[str] = Form(None)
+):
+    final_context = resolve_customize_context(mode, job_description, analysis_context)
+
+    if not current_date:
+        current_date = datetime.now().strftime("%Y-%m-%d")
+
+    upload = await read_upload(file)
+    try:
+        await load_cv_text(upload)
+    except BaseException:
+        upload.close()
+        raise
+
+    async def runner():
+        try:
+            result = await run_customize(upload, mode, final_context, current_date)
+        finally:
+            upload.close()
+        if is_fallback_result(result):
+            # Job ditandai FAILED (dan webhook menerima status FAILED), bukan COMPLETED dengan stub error
+            raise ValueError(result["professional_summary"])
+        return result
+
+    return submit_job("customize", runner, cv_id, webhook_url, upload)
+
+
+@app.get("/api/jobs/stats")
+async def job_stats():
+    return job_manager.snapshot()
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(404, "Job tidak ditemukan atau sudah kedaluwarsa.")
+    return job.as_dict()
+
+# Termasuk registrasi route di atas; dengan serve.py hanya dibayar sekali oleh parent sebelum fork
+startup_state.record("import", _IMPORT_STARTED)
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True, timeout_keep_alive=30)
\ No newline at end of file
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True, timeout_keep_alive=30)
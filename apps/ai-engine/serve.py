@@ -0,0 +1,119 @@
+"""
+Entry point produksi ai-engine: parent memuat app sekali (fastapi, google-genai, semua service),
+bind socket, lalu fork WEB_CONCURRENCY worker uvicorn yang berbagi socket tersebut.
+
+Worker hasil fork tidak meng-import ulang apa pun; client Gemini / scraper, pool ekstraksi, dan job
+worker dibuat per worker di lifespan, dan /health baru melaporkan siap setelah warm-up worker selesai.
+Worker yang mati di-fork ulang; SIGTERM / SIGINT diteruskan ke semua worker (graceful shutdown uvicorn).
+
+State in-memory tetap per worker: result cache mode memory, status job async (/api/jobs/{id}),
+metrics, dan text / cv_data cache. Budget limiter Gemini & jumlah worker ekstraksi dibagi rata
+ke WEB_CONCURRENCY (lihat rate_limiter.py & extraction_pool.py).
+
+Jalankan dari apps/ai-engine:
+    WEB_CONCURRENCY=4 python serve.py
+"""
+import os
+import time
+import signal
+import socket
+import importlib
+import traceback
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+WEB_CONCURRENCY = max(int(os.getenv("WEB_CONCURRENCY", "1")), 1)
+# Antrian koneksi yang belum di-accept, dipakai bersama semua worker
+SERVE_BACKLOG = int(os.getenv("SERVE_BACKLOG", "2048"))
+# Worker yang mati lebih cepat dari ini di-fork ulang setelah jeda (hindari crash loop)
+RESPAWN_DELAY = 1.0
+# Modul yang baru di-import saat lifespan berjalan (transport httpx, pool ekstraksi spawn);
+# dimuat di parent agar tidak dibayar ulang oleh setiap worker
+PRELOAD_MODULES = (
+    "httpcore", "h11", "h2.connection", "anyio._backends._asyncio",
+    "concurrent.futures.process", "multiprocessing.popen_spawn_posix",
+)
+
+
+def bind_socket() -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in HOST else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((HOST, PORT))
+    sock.listen(SERVE_BACKLOG)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(config, sock: socket.socket):
+    import uvicorn
+
+    # Handler sinyal parent tidak berlaku di worker; uvicorn memasang handler sendiri
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def main():
+    started = time.perf_counter()
+    import uvicorn
+    # Preload: semua import berat dibayar sekali di sini, worker mewarisinya lewat fork
+    from main import app
+    for module in PRELOAD_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+    loaded = time.perf_counter()
+
+    config = uvicorn.Config(app, host=HOST, port=PORT, lifespan="on")
+    sock = bind_socket()
+    print(f"[serve] app dimuat dalam {(loaded - started) * 1000:.0f} ms, "
+          f"{WEB_CONCURRENCY} worker di {HOST}:{PORT}")
+
+    workers = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(config, sock)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        workers[pid] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(WEB_CONCURRENCY):
+        spawn()
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        spawned_at = workers.pop(pid, None)
+        if spawned_at is None or stopping:
+            continue
+        print(f"[serve] worker {pid} berhenti (exit {os.waitstatus_to_exitcode(status)}), fork ulang")
+        if time.monotonic() - spawned_at < RESPAWN_DELAY:
+            time.sleep(RESPAWN_DELAY)
+        spawn()
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -63,4 +63,20 @@ class ImprovedCVResult(BaseModel):
     education: List[CVEducation]
     projects: List[CVProject]
     certifications: Optional[List[str]] = None
-    section_labels: Optional[CVSectionLabels] = None
\ No newline at end of file
+    section_labels: Optional[CVSectionLabels] = None
+
+class CombinedAnalysisResult(BaseModel):
+    """Output mode single-call: analisis dan data CV terstruktur dari satu panggilan model"""
+    analysis: AnalysisResponse
+    cv_data: ImprovedCVResult
+
+# Output mode customize per bagian: setiap bagian CV di-generate dengan panggilan terpisah
+class SummarySection(BaseModel):
+    professional_summary: str
+
+class SkillsSection(BaseModel):
+    hard_skills: List[str]
+    soft_skills: List[str]
+
+class ProjectsSection(BaseModel):
+    projects: List[CVProject]
@@ -1,124 +1,413 @@
 import os
-import json
 import asyncio
 import re
+import time
+import httpx
 from datetime import datetime
-from dotenv import load_dotenv
+from typing import Optional
 from google import genai
 from google.genai import types
-from src.schemas import AnalysisResponse, ImprovedCVResult, CVContactInfo
+from src.schemas import (
+    AnalysisResponse, ImprovedCVResult, CVContactInfo, CombinedAnalysisResult, CriticalGap, CVExperience,
+    SummarySection, SkillsSection, ProjectsSection,
+)
+from src.services.cache import cv_data_cache, hash_parts
+from src.services.singleflight import SingleFlight
+from src.services.context_cache import ContextCache, is_cache_error
+from src.services.usage import record_usage
+from src.services.metrics import span, observe_gemini_queue, observe_gemini_call
+from src.services.json_parsing import parse_model, dumps_str, JsonFieldScanner
+from src.services.prompt_budget import (
+    configure_budget, clean_job_description, fit_cv, prompt_report,
+    PROMPT_TOKEN_BUDGET_FAST, PROMPT_TOKEN_BUDGET_REASONING,
+)
+from src.services.deadlines import (
+    configure_timeout, call_timeout, latency_for, record_deadline_event, deadline_at_risk, hedge_delay,
+    within_deadline, remaining, record_model_fallback, track_model_fallbacks, DeadlineExceededError,
+    GEMINI_CALL_TIMEOUT_FAST, GEMINI_CALL_TIMEOUT_REASONING,
+)
+from src.services.skill_match import (
+    SkillMatch, prescreen_cv, prescreen_action, prescreen_stats, PRESCREEN_ACTION, PRESCREEN_BATCH_ACTION,
+    PRESCREEN_THRESHOLD,
+)
+from src.services.rate_limiter import (
+    configure_model, limiter_for, is_rate_limit_error, retry_after_seconds, backoff_delay,
+    GEMINI_FAST_CONCURRENCY, GEMINI_FAST_RPM, GEMINI_REASONING_CONCURRENCY, GEMINI_REASONING_RPM,
+)
 
-load_dotenv()
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+# --- KONFIGURASI KONEKSI GEMINI ---
+# GEMINI_BASE_URL hanya diisi untuk mengarahkan ke fake server (benchmark/load test)
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL") or None
+GEMINI_MAX_CONNECTIONS = int(os.getenv("GEMINI_MAX_CONNECTIONS", "100"))
+GEMINI_MAX_KEEPALIVE = int(os.getenv("GEMINI_MAX_KEEPALIVE", "20"))
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "120"))
+
+# Satu connection pool async per proses, dipakai semua panggilan client.aio. Dibuat di lifespan
+# (start_client), bukan saat import: parent serve.py memuat modul ini sebelum fork, dan tiap worker
+# harus punya pool koneksi sendiri.
+http_client: Optional[httpx.AsyncClient] = None
+client: Optional[genai.Client] = None
+
+# Handle explicit cached content untuk system instruction statis + JD yang sering dipakai
+context_cache = ContextCache(None)
+
+
+async def start_client():
+    global http_client, client
+    if client is not None:
+        return
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=GEMINI_MAX_CONNECTIONS,
+            max_keepalive_connections=GEMINI_MAX_KEEPALIVE,
+            keepalive_expiry=60,
+        ),
+        timeout=httpx.Timeout(GEMINI_TIMEOUT, connect=10),
+    )
+    client = genai.Client(
+        api_key=os.getenv("GEMINI_API_KEY"),
+        http_options=types.HttpOptions(base_url=GEMINI_BASE_URL, httpx_async_client=http_client),
+    )
+    context_cache.client = client
+
+
+async def close_client():
+    global http_client, client
+    await context_cache.close()
+    if http_client is not None:
+        await http_client.aclose()
+    http_client = None
+    client = None
 
 # --- KONFIGURASI MODEL (MODEL ROUTING) ---
 FAST_MODEL = "gemini-2.5-flash-lite"  
 REASONING_MODEL = "gemini-2.5-flash" 
 
+# Single-flight per jenis panggilan: request identik yang paralel berbagi satu panggilan Gemini
+extract_flight = SingleFlight("extract_data_only")
+analysis_flight = SingleFlight("perform_analysis")
+customize_flight = SingleFlight("customize_cv")
+combined_flight = SingleFlight("perform_combined")
+
+configure_model(FAST_MODEL, GEMINI_FAST_CONCURRENCY, GEMINI_FAST_RPM)
+configure_model(REASONING_MODEL, GEMINI_REASONING_CONCURRENCY, GEMINI_REASONING_RPM)
+configure_budget(FAST_MODEL, PROMPT_TOKEN_BUDGET_FAST)
+configure_budget(REASONING_MODEL, PROMPT_TOKEN_BUDGET_REASONING)
+configure_timeout(FAST_MODEL, GEMINI_CALL_TIMEOUT_FAST)
+configure_timeout(REASONING_MODEL, GEMINI_CALL_TIMEOUT_REASONING)
+
+# --- ROUTING ANALYZE ---
+# auto: pilih jalur per request | single / parallel / fast: paksa satu jalur
+ANALYZE_ROUTING = os.getenv("ANALYZE_ROUTING", "auto").lower()
+# CV pendek -> analisis + ekstraksi dalam satu panggilan (CV hanya dikirim sekali)
+SINGLE_CALL_MAX_CHARS = int(os.getenv("SINGLE_CALL_MAX_CHARS", "6000"))
+# Pressure limiter REASONING_MODEL di atas batas ini -> analisis dialihkan ke FAST_MODEL
+FAST_PATH_PRESSURE = float(os.getenv("FAST_PATH_PRESSURE", "0.9"))
+
+# --- ROUTING CUSTOMIZE ---
+# single: seluruh CV dalam satu panggilan | sections: ringkasan, tiap pengalaman, proyek, dan skill
+# di-generate paralel | auto: sections untuk CV yang cv_data-nya sudah di-cache (output panjang = p99 terburuk)
+CUSTOMIZE_MODE = os.getenv("CUSTOMIZE_MODE", "auto").lower()
+# CV lebih pendek dari ini tetap satu panggilan di mode auto (fan-out tidak sebanding dengan RPM tambahan)
+CUSTOMIZE_SECTIONS_MIN_CHARS = int(os.getenv("CUSTOMIZE_SECTIONS_MIN_CHARS", "2000"))
+# Panggilan bagian yang boleh berjalan bersamaan, dibagi oleh semua request customize
+CUSTOMIZE_SECTION_CONCURRENCY = int(os.getenv("CUSTOMIZE_SECTION_CONCURRENCY", "16"))
+customize_section_slots = asyncio.Semaphore(CUSTOMIZE_SECTION_CONCURRENCY)
+
+# Naikkan setiap kali isi prompt berubah, agar result cache lama tidak terpakai lagi.
+PROMPT_VERSION = "2026.03"
+CACHE_VERSION = f"{PROMPT_VERSION}|{FAST_MODEL}|{REASONING_MODEL}"
+
+# Penanda hasil fallback (error) agar tidak ikut disimpan di cache
+ANALYSIS_ERROR_PREFIX = "Error: "
+CUSTOMIZE_ERROR_NAME = "Error Generating CV"
+# meta["degraded"] pada hasil analyze yang cv_data-nya berasal dari fallback ekstraksi
+EXTRACT_FAILED = "cv_data_extraction_failed"
+
 # Sanitasi Input
 def sanitize_content(text: str) -> str:
+    # Tanpa dedup baris: bullet yang sama di dua pengalaman adalah isi CV (header/footer PDF
+    # sudah dibuang per batas halaman oleh extractor)
     text = re.sub(r'\s+', ' ', text)
     return text.strip()
 
-# Smart JSON Parsing
-def clean_json_text(text: str) -> str:
+def coalescing_snapshot():
+    flights = (extract_flight, analysis_flight, customize_flight, combined_flight)
+    return {flight.name: flight.snapshot() for flight in flights}
+
+
+def is_fallback_result(result) -> bool:
+    """True jika hasil berasal dari blok fallback (AI gagal), bukan output model."""
+    if isinstance(result, ImprovedCVResult):
+        return result.full_name == CUSTOMIZE_ERROR_NAME
+    if isinstance(result, dict) and "full_name" in result:
+        # Hasil customize yang sudah di-model_dump (result cache / job)
+        return result["full_name"] == CUSTOMIZE_ERROR_NAME
+    if isinstance(result, dict) and "analysis" in result:
+        if result.get("meta", {}).get("degraded"):
+            return True
+        return result["analysis"].get("overall_summary", "").startswith(ANALYSIS_ERROR_PREFIX)
+    return False
+
+# Jalur fast karena kondisi sesaat (kuota tertekan / deadline mepet): hasil FAST_MODEL tidak boleh
+# menggantikan hasil REASONING_MODEL untuk request identik berikutnya. Hal yang sama berlaku untuk
+# fallback model di tengah retry (meta["model_fallback"]).
+TRANSIENT_ROUTE_REASONS = ("quota_pressure", "deadline_risk")
+
+
+# Jalur dari pre-screening (skip / downgrade ke FAST_MODEL): tindakannya bergantung pada endpoint
+# (PRESCREEN_ACTION vs PRESCREEN_BATCH_ACTION), jadi hasil batch tidak boleh terbaca oleh /api/analyze
+PRESCREEN_ROUTE_REASON = "low_skill_match"
+
+
+def is_cacheable_result(result: dict) -> bool:
+    """True jika hasil analyze boleh disimpan di result cache (key-nya tidak membedakan jalur)."""
+    meta = result.get("meta", {})
+    if meta.get("path") == "prescreen" or meta.get("reason") == PRESCREEN_ROUTE_REASON:
+        return False
+    if meta.get("reason") in TRANSIENT_ROUTE_REASONS or meta.get("model_fallback"):
+        return False
+    return not is_fallback_result(result)
+
+def user_content(text: str) -> types.Content:
+    return types.Content(role="user", parts=[types.Part.from_text(text=text)])
+
+
+def prepare_request(model_name, contents, config, system_instruction=None, shared_text=None):
+    """
+    Susun (contents, config, nama cache) untuk satu panggilan.
+    Prefix statis = system instruction + `shared_text` (mis. JD). Jika sudah ada di context cache
+    Gemini, prefix cukup dirujuk lewat `cached_content`; jika belum, dikirim penuh
+    dengan urutan yang sama (tetap bisa kena implicit caching).
+    """
+    if system_instruction is None:
+        return contents, config, None
+
+    cache_name = context_cache.lookup(model_name, system_instruction, shared_text)
+    if cache_name:
+        return contents, config.model_copy(update={"cached_content": cache_name}), cache_name
+
+    if shared_text:
+        contents = [user_content(shared_text)] + list(contents)
+    return contents, config.model_copy(update={"system_instruction": system_instruction}), None
+
+
+async def _call_gemini(model_name, attempt, contents, config, cache_name):
+    """
+    Satu panggilan: antri limiter lalu generate_content dengan timeout per model
+    (diperpendek ke sisa deadline request). Metrik, AIMD, dan latency tracker dicatat di sini.
+    """
+    limiter = limiter_for(model_name)
+    queued_at = time.perf_counter()
+    called_at = None
     try:
-        if "```json" in text:
-            return text.split("```json")[1].split("```")[0].strip()
-        elif "```" in text:
-            return text.split("```")[1].split("```")[0].strip()
-        
-        match = re.search(r'\{.*\}', text, re.DOTALL)
-        if match:
-            return match.group(0)
-            
-        return text.strip()
-    except Exception:
-        return text
+        async with limiter.acquire():
+            called_at = time.perf_counter()
+            observe_gemini_queue(model_name, called_at - queued_at)
+            timeout = call_timeout(model_name)
+            if timeout <= 0:
+                raise DeadlineExceededError(f"Deadline request habis saat antri limiter {model_name}")
+            # Native async: tidak memakan thread executor selama round trip LLM
+            response = await asyncio.wait_for(
+                client.aio.models.generate_content(
+                    model=model_name, # Menggunakan model yang di-inject
+                    contents=contents,
+                    config=config
+                ),
+                timeout,
+            )
+    except asyncio.CancelledError:
+        # Kalah dari attempt hedge / deadline request habis
+        if called_at is not None:
+            observe_gemini_call(model_name, attempt, "cancelled", time.perf_counter() - called_at)
+        raise
+    except Exception as e:
+        if called_at is not None:
+            observe_gemini_call(model_name, attempt, call_outcome(e, cache_name), time.perf_counter() - called_at)
+        raise
+    elapsed = time.perf_counter() - called_at
+    observe_gemini_call(model_name, attempt, "ok", elapsed)
+    latency_for(model_name).observe(elapsed)
+    limiter.on_success()
+    record_usage(model_name, response.usage_metadata)
+    return response
+
+
+async def _hedged_call(model_name, make_call):
+    """
+    Jalankan make_call(); jika belum selesai setelah latency p95 model (dan limiter masih longgar),
+    kirim attempt kedua dan pakai yang lebih dulu berhasil. Attempt yang kalah dibatalkan.
+    """
+    delay = hedge_delay(model_name)
+    if delay is None:
+        return await within_deadline(make_call())
+
+    first = asyncio.create_task(within_deadline(make_call()))
+    tasks = {first}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done and limiter_for(model_name).pressure < 1:
+            record_deadline_event(model_name, "hedge")
+            tasks.add(asyncio.create_task(within_deadline(make_call())))
+        pending = set(tasks)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not first:
+                        record_deadline_event(model_name, "hedge_won")
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+
 
 # [MODIFIED] Menambahkan parameter `model_name`
-async def generate_with_retry(contents, config, model_name, retries=3):
+async def generate_with_retry(contents, config, model_name, retries=3, system_instruction=None, shared_text=None,
+                              fallback_model=None):
     """
     Melakukan panggilan ke AI dengan auto-retry.
     Sekarang menerima `model_name` secara dinamis.
+    Setiap panggilan melewati limiter per model (concurrency + RPM), dan retry memakai
+    jittered backoff yang menghormati retry-after dari Gemini.
+    `system_instruction` / `shared_text` adalah prefix statis yang boleh dilayani dari context cache.
+    Tiap attempt dibatasi timeout per model dan deadline request (opsional di-hedge); jika sisa
+    deadline lebih pendek dari latency p95 `model_name`, attempt berikutnya pindah ke `fallback_model`.
     """
     last_exception = None
     for attempt in range(retries):
+        if fallback_model and deadline_at_risk(model_name):
+            print(f"Gemini API ({model_name}) deadline at risk, falling back to {fallback_model}")
+            record_model_fallback(model_name, fallback_model)
+            model_name, fallback_model = fallback_model, None
+        left = remaining()
+        if left is not None and left <= 0:
+            record_deadline_event(model_name, "deadline_exceeded")
+            raise DeadlineExceededError(
+                f"Deadline request habis sebelum attempt {attempt+1} ke {model_name}") from last_exception
+
+        retry_after = None
+        request_contents, request_config, cache_name = prepare_request(
+            model_name, contents, config, system_instruction, shared_text)
         try:
-            response = await asyncio.to_thread(
-                client.models.generate_content,
-                model=model_name, # Menggunakan model yang di-inject
-                contents=contents,
-                config=config
-            )
-            return response
+            return await _hedged_call(model_name, lambda: _call_gemini(
+                model_name, attempt, request_contents, request_config, cache_name))
         except Exception as e:
-            print(f"Gemini API ({model_name}) Attempt {attempt+1}/{retries} failed: {e}")
+            print(f"Gemini API ({model_name}) Attempt {attempt+1}/{retries} failed: {e!r}")
             last_exception = e
+            if isinstance(e, asyncio.TimeoutError):
+                record_deadline_event(model_name, "timeout")
+            if cache_name and is_cache_error(e):
+                # Cache kedaluwarsa di sisi Gemini -> attempt berikutnya kirim prompt penuh
+                context_cache.invalidate(cache_name)
+                continue
+            if is_rate_limit_error(e):
+                retry_after = retry_after_seconds(e)
+                limiter_for(model_name).on_throttle(retry_after)
             if attempt < retries - 1:
-                await asyncio.sleep(1 * (2 ** attempt))
+                delay = backoff_delay(attempt, retry_after)
+                left = remaining()
+                if left is not None and delay >= left:
+                    # Backoff saja sudah melewati deadline -> tidak ada attempt yang bisa selesai
+                    break
+                with span("gemini_backoff"):
+                    await asyncio.sleep(delay)
     
     raise last_exception
 
+
+def call_outcome(error: Exception, cache_name=None) -> str:
+    """Label outcome attempt Gemini yang gagal untuk metrik."""
+    if isinstance(error, asyncio.TimeoutError):
+        return "timeout"
+    if cache_name and is_cache_error(error):
+        return "cache_miss"
+    if is_rate_limit_error(error):
+        return "rate_limited"
+    return "error"
+
+def cv_data_key(clean_cv: str) -> str:
+    return hash_parts("cv_data", clean_cv, PROMPT_VERSION, FAST_MODEL)
+
+
 async def extract_data_only(cv_text: str) -> ImprovedCVResult:
     clean_cv = sanitize_content(cv_text)
 
-    prompt_text = f"""
+    # Hasil ekstraksi terstruktur dipakai ulang untuk CV yang sama (analyze -> customize)
+    cache_key = cv_data_key(clean_cv)
+    cached = cv_data_cache.get(cache_key)
+    if cached is not None:
+        return cached.model_copy(deep=True)
+
+    # Request identik yang sedang berjalan cukup ditunggu, tidak dikirim ulang ke Gemini
+    result = await extract_flight.do(cache_key, lambda: _extract_data_only(clean_cv, cache_key))
+    return result.model_copy(deep=True)
+
+
+# Instruksi statis (identik di semua request) dipisah dari konten variabel agar bisa di-cache
+EXTRACT_SYSTEM_INSTRUCTION = """
     You are a strict data parser. 
-    Extract the following CV text into a structured JSON format matching this schema.
+    Extract the CV text given by the user into a structured JSON format matching this schema.
     
     RULES:
     1. DO NOT rewrite, improve, or change the content. Extract it exactly as is.
     2. If a field is missing, use an empty string "" or empty list [].
     3. HYPERLINKS: If you find text in format "Text [URL]", render it as HTML: <a href='URL'>Text</a>.
     4. Do not use markdown for links, use strictly HTML <a> tags.
-    
-    CV TEXT:
-    {clean_cv}
 
     OUTPUT SCHEMA: ImprovedCVResult (JSON)
     """
+
+EXTRACT_CONFIG = types.GenerateContentConfig(
+    response_mime_type="application/json", 
+    response_schema=ImprovedCVResult,
+    temperature=0.0
+)
+
+
+async def _extract_data_only(clean_cv: str, cache_key: str) -> ImprovedCVResult:
+    prompt_text = f"""
+    CV TEXT:
+    {fit_cv(clean_cv, FAST_MODEL)}
+    """
     try:
         
         response = await generate_with_retry(
-            contents=[types.Content(role="user", parts=[types.Part.from_text(text=prompt_text)])],
-            config=types.GenerateContentConfig(
-                response_mime_type="application/json", 
-                response_schema=ImprovedCVResult,
-                temperature=0.0
-            ),
-            model_name=FAST_MODEL # <--- Explicitly use Fast Model
+            contents=[user_content(prompt_text)],
+            config=EXTRACT_CONFIG,
+            model_name=FAST_MODEL, # <--- Explicitly use Fast Model
+            system_instruction=EXTRACT_SYSTEM_INSTRUCTION
         )
-        if response.parsed: return response.parsed
-        return ImprovedCVResult(**json.loads(clean_json_text(response.text)))
+        if response.parsed:
+            result = response.parsed
+        else:
+            with span("json_fallback_parse"):
+                # Output terpotong masih bisa dipulihkan: field yang hilang diisi kosong
+                result = parse_model(response.text, ImprovedCVResult, allow_partial=True)
+        cv_data_cache.set(cache_key, result.model_copy(deep=True), len(result.model_dump_json()))
+        return result
     except Exception as e:
         print(f"Extract Error: {e}")
-        return ImprovedCVResult(
-            full_name="Candidate", professional_summary="", 
-            contact_info=CVContactInfo(email="", phone="", location=""), 
-            hard_skills=[], soft_skills=[], work_experience=[], education=[], projects=[]
-        )
+        return EXTRACT_FALLBACK.model_copy(deep=True)
 
 
-async def analyze_cv(cv_text: str, job_desc: str, current_date: str = None):
-    
-    if not current_date:
-        current_date = datetime.now().strftime("%Y-%m-%d")
+# Hasil ekstraksi saat Gemini gagal; tidak pernah masuk cv_data_cache
+EXTRACT_FALLBACK = ImprovedCVResult(
+    full_name="Candidate", professional_summary="",
+    contact_info=CVContactInfo(email="", phone="", location=""),
+    hard_skills=[], soft_skills=[], work_experience=[], education=[], projects=[]
+)
 
-    clean_cv = sanitize_content(cv_text)
 
-    is_auto_detect = False
-    final_job_desc = job_desc
-    # Logic pengecekan flag dari main.py
-    if not job_desc or job_desc.strip() == "" or job_desc == "AUTO_DETECT_ROLE":
-        is_auto_detect = True
-        # Placeholder sementara agar variabel tidak kosong
-        final_job_desc = "DYNAMIC_INFERENCE_MODE"
-
-    async def _perform_analysis():
-        if is_auto_detect:
-            # Logic: 1. Baca CV -> 2. Tentukan Role -> 3. Nilai berdasarkan Role itu
-            role_context_instruction = """
+def is_extract_fallback(cv_data: ImprovedCVResult) -> bool:
+    """True jika cv_data adalah stub EXTRACT_FALLBACK (ekstraksi gagal), bukan output model."""
+    return cv_data == EXTRACT_FALLBACK
+
+
+AUTO_DETECT_INSTRUCTION = """
             *** NO JOB DESCRIPTION PROVIDED - AUTO-INFERENCE MODE ***
             1. **IDENTIFY ROLE**: First, deep-read the candidate's CV to determine their primary professional role (e.g., "Senior Business Development Manager", "Junior Data Analyst", "Marketing Specialist").
             2. **ESTABLISH STANDARD**: Mentally retrieve the standard industry Job Description and requirements for that SPECIFIC identified role.
@@ -126,22 +415,15 @@ async def analyze_cv(cv_text: str, job_desc: str, current_date: str = None):
             
             *IMPORTANT*: In the 'overall_summary', explicitly state: "Analyzed based on inferred role: [Insert Role Name]"
             """
-            
-            # Kita kosongkan field JOB DESCRIPTION di prompt agar AI fokus ke instruksi di atas
-            jd_display = "Not Provided (Please infer role from CV as instructed above)"
-        else:
-            # Jika ada JD asli (Url/Text), gunakan instruksi standar
-            role_context_instruction = "Analyze the candidate CV strictly against the provided JOB DESCRIPTION below."
-            jd_display = final_job_desc
-        
-        prompt_text = f"""
+
+ANALYSIS_SYSTEM_TEMPLATE = """
         You are a Senior Technical Recruiter and CV Expert.
         {role_context_instruction}. Use "You" to address the candidate directly.
 
         *** TIME CONTEXT (CRITICAL) ***:
-        - Today's Date is: **{current_date}**.
-        - Any experience listed with a year equal to or before the current year ({current_date.split('-')[0]}) is VALID.
-        - DO NOT flag "{current_date.split('-')[0]}" (Current Year) as a "future date error".
+        - Today's Date is given in the TIME CONTEXT section of the request.
+        - Any experience listed with a year equal to or before the current year is VALID.
+        - DO NOT flag the current year as a "future date error".
         - "Present" or "Current" means valid up to today.
 
         *** LANGUAGE INSTRUCTION (CRITICAL) ***:
@@ -150,13 +432,7 @@ async def analyze_cv(cv_text: str, job_desc: str, current_date: str = None):
            - IF the CV is in **Indonesian** -> ALL your feedback, summaries, details, and action items MUST be in **INDONESIAN**.
            - IF the CV is in **English** -> ALL your feedback, summaries, details, and action items MUST be in **ENGLISH**.
         3. Do not mix languages (e.g., do not write English feedback for an Indonesian CV).
-
-        JOB DESCRIPTION:
-        {jd_display}
-
-        CANDIDATE CV CONTENT:
-        {clean_cv}
-
+{job_description_block}
         Please perform a deep analysis based on these 6 specific criteria:
         1. **Candidate Overview**:
            - Extract the candidate's full name.
@@ -178,53 +454,236 @@ async def analyze_cv(cv_text: str, job_desc: str, current_date: str = None):
              - If the candidate has senior experience in a **different field** (e.g., Candidate is an ML Engineer, Job is Business Dev), the score MUST be **LOW (under 50)**.
              - If the candidate's past projects directly solve the problems listed in the JD, the score should be **HIGH**.
            - Define the main seniority level relative to the specific JD (Junior, Mid, Senior, Lead). 
-           - CHECK DATES CAREFULLY: Do not incorrectly mark valid recent dates as future errors based on the 'Today's Date' provided above.
+           - CHECK DATES CAREFULLY: Do not incorrectly mark valid recent dates as future errors based on the 'Today's Date' provided in the TIME CONTEXT.
 
         6. **Keyword Relevance & Critical Gaps (Score 0-100)**:
            - Identify critical gaps.
            - **CRITICAL INSTRUCTION**: For EACH gap identified, provide a specific "action". 
              Example: Gap="Docker", Action="Build a simple microservice using Docker."
 
+{output_instruction}
+        """
+
+ANALYSIS_OUTPUT_INSTRUCTION = """
         *** REQUIRED JSON OUTPUT FORMAT ***
         You MUST output strictly JSON matching the AnalysisResponse schema.
+"""
+
+# Mode single-call: analisis + ekstraksi data (aturan sama dengan EXTRACT_SYSTEM_INSTRUCTION)
+COMBINED_OUTPUT_INSTRUCTION = """
+        7. **Structured CV Data (`cv_data`)**:
+           - Extract the CANDIDATE CV CONTENT into the ImprovedCVResult structure.
+           - DO NOT rewrite, improve, or change the content. Extract it exactly as is.
+           - If a field is missing, use an empty string "" or empty list [].
+           - HYPERLINKS: If you find text in format "Text [URL]", render it as HTML: <a href='URL'>Text</a>.
+           - Do not use markdown for links, use strictly HTML <a> tags.
+
+        *** REQUIRED JSON OUTPUT FORMAT ***
+        You MUST output strictly JSON with two fields:
+        - `analysis`: matching the AnalysisResponse schema (criteria 1-6).
+        - `cv_data`: matching the ImprovedCVResult schema (criterion 7).
+"""
 
+JD_PROVIDED_INSTRUCTION = "Analyze the candidate CV strictly against the JOB DESCRIPTION provided in the request"
+NO_JD_BLOCK = """
+        JOB DESCRIPTION:
+        Not Provided (Please infer role from CV as instructed above)
+"""
+
+# Varian system instruction statis per (auto-detect role?, single-call?).
+# Dengan JD, JD dikirim sebagai konten bersama agar bisa ikut context cache.
+ANALYSIS_SYSTEM_INSTRUCTIONS = {
+    (is_auto, combined): ANALYSIS_SYSTEM_TEMPLATE.format(
+        role_context_instruction=AUTO_DETECT_INSTRUCTION if is_auto else JD_PROVIDED_INSTRUCTION,
+        job_description_block=NO_JD_BLOCK if is_auto else "",
+        output_instruction=COMBINED_OUTPUT_INSTRUCTION if combined else ANALYSIS_OUTPUT_INSTRUCTION,
+    )
+    for is_auto in (False, True)
+    for combined in (False, True)
+}
+
+
+def _build_analysis_prompt(clean_cv: str, job_desc: str, current_date: str, combined: bool = False,
+                           model_name: str = REASONING_MODEL):
+    """
+    Return (system_instruction, shared_text, prompt_text).
+    system_instruction + shared_text (JD) adalah prefix yang sama untuk banyak CV -> kandidat context cache.
+    CV dipotong agar CV + JD muat di prompt budget `model_name`.
+    """
+    # Logic pengecekan flag dari main.py
+    if not job_desc or job_desc.strip() == "" or job_desc == "AUTO_DETECT_ROLE":
+        # Logic: 1. Baca CV -> 2. Tentukan Role -> 3. Nilai berdasarkan Role itu
+        system_instruction = ANALYSIS_SYSTEM_INSTRUCTIONS[(True, combined)]
+        shared_text = None
+    else:
+        # Jika ada JD asli (Url/Text), gunakan instruksi standar
+        system_instruction = ANALYSIS_SYSTEM_INSTRUCTIONS[(False, combined)]
+        shared_text = f"""
+        JOB DESCRIPTION:
+        {job_desc}
         """
+
+    current_year = current_date.split('-')[0]
+    prompt_text = f"""
+        *** TIME CONTEXT (CRITICAL) ***:
+        - Today's Date is: **{current_date}**.
+        - Any experience listed with a year equal to or before the current year ({current_year}) is VALID.
+        - DO NOT flag "{current_year}" (Current Year) as a "future date error".
+
+        CANDIDATE CV CONTENT:
+        {fit_cv(clean_cv, model_name, shared_text or "")}
+        """
+    return system_instruction, shared_text, prompt_text
+
+
+ANALYSIS_CONFIG = types.GenerateContentConfig(
+    response_mime_type="application/json", 
+    response_schema=AnalysisResponse,
+    temperature=0.0,
+    top_p=0.1,
+    top_k=20
+)
+
+COMBINED_CONFIG = ANALYSIS_CONFIG.model_copy(update={"response_schema": CombinedAnalysisResult})
+
+
+def _analysis_fallback(error: Exception) -> AnalysisResponse:
+    return AnalysisResponse(
+        candidate_name="Unknown", overall_score=0, overall_summary=f"{ANALYSIS_ERROR_PREFIX}{str(error)}",
+        writing_score=0, writing_detail="", ats_score=0, ats_detail="",
+        skill_score=0, skill_detail="", experience_score=0, experience_detail="",
+        keyword_score=0, critical_gaps=[]
+    )
+
+
+async def perform_analysis(clean_cv: str, job_desc: str, current_date: str,
+                           model_name: str = REASONING_MODEL) -> AnalysisResponse:
+    """Analisis CV vs JD (tanpa ekstraksi data terstruktur), default dengan REASONING_MODEL."""
+    key = hash_parts("analysis", clean_cv, job_desc, current_date, PROMPT_VERSION, model_name)
+    result = await analysis_flight.do(key, lambda: _perform_analysis(clean_cv, job_desc, current_date, model_name))
+    return result.model_copy(deep=True)
+
+
+async def _perform_analysis(clean_cv: str, job_desc: str, current_date: str, model_name: str) -> AnalysisResponse:
+    system_instruction, shared_text, prompt_text = _build_analysis_prompt(
+        clean_cv, job_desc, current_date, model_name=model_name)
+    try:
         
-        try:
+        response = await generate_with_retry(
+            contents=[user_content(prompt_text)],
+            config=ANALYSIS_CONFIG,
+            model_name=model_name,
+            system_instruction=system_instruction,
+            shared_text=shared_text,
+            fallback_model=FAST_MODEL if model_name != FAST_MODEL else None
+        )
+        if response.parsed: 
+            return response.parsed
+        else:
+            with span("json_fallback_parse"):
+                return parse_model(response.text, AnalysisResponse, allow_partial=True)
             
-            response = await generate_with_retry(
-                contents=[types.Content(role="user", parts=[types.Part.from_text(text=prompt_text)])],
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json", 
-                    response_schema=AnalysisResponse,
-                    temperature=0.0,
-                    top_p=0.1,
-                    top_k=20
-                ),
-                model_name=REASONING_MODEL 
-            )
-            if response.parsed: 
-                return response.parsed
-            else:
-                return AnalysisResponse(**json.loads(clean_json_text(response.text)))
-                
-        except Exception as e:
-            print(f"Analyze Error: {e}")
-            return AnalysisResponse(
-                candidate_name="Unknown", overall_score=0, overall_summary=f"Error: {str(e)}",
-                writing_score=0, writing_detail="", ats_score=0, ats_detail="",
-                skill_score=0, skill_detail="", experience_score=0, experience_detail="",
-                keyword_score=0, critical_gaps=[]
-            )
+    except Exception as e:
+        print(f"Analyze Error: {e}")
+        return _analysis_fallback(e)
+
+
+async def perform_combined(clean_cv: str, job_desc: str, current_date: str) -> CombinedAnalysisResult:
+    """
+    Mode single-call: analisis + data CV terstruktur dalam satu panggilan REASONING_MODEL.
+    Tidak punya fallback sendiri -- error di-raise agar pemanggil bisa pindah ke jalur paralel.
+    """
+    key = hash_parts("combined", clean_cv, job_desc, current_date, PROMPT_VERSION, REASONING_MODEL)
+    result = await combined_flight.do(key, lambda: _perform_combined(clean_cv, job_desc, current_date))
+    return result.model_copy(deep=True)
+
+
+async def _perform_combined(clean_cv: str, job_desc: str, current_date: str) -> CombinedAnalysisResult:
+    system_instruction, shared_text, prompt_text = _build_analysis_prompt(
+        clean_cv, job_desc, current_date, combined=True)
+    response = await generate_with_retry(
+        contents=[user_content(prompt_text)],
+        config=COMBINED_CONFIG,
+        model_name=REASONING_MODEL,
+        retries=2, # Gagal -> masih ada jalur paralel sebagai cadangan
+        system_instruction=system_instruction,
+        shared_text=shared_text
+    )
+    if response.parsed:
+        result = response.parsed
+    else:
+        with span("json_fallback_parse"):
+            result = parse_model(response.text, CombinedAnalysisResult, allow_partial=True)
+    # cv_data ikut disimpan agar /api/customize untuk CV yang sama tidak mengekstrak ulang
+    cv_data_cache.set(cv_data_key(clean_cv), result.cv_data.model_copy(deep=True),
+                      len(result.cv_data.model_dump_json()))
+    return result
+
+
+def route_analysis(clean_cv: str, need_cv_data: bool = True, prescreen: str = "off"):
+    """
+    Pilih jalur analyze_cv -> (path, reason):
+    - "prescreen": skor skill lokal jelas di bawah ambang dan tindakan = skip, tanpa panggilan analisis LLM
+    - "fast": kuota REASONING_MODEL sedang tertekan atau sisa deadline request lebih pendek dari
+      latency p95-nya, analisis pakai FAST_MODEL (+ ekstraksi paralel)
+    - "single": CV pendek, analisis + ekstraksi dalam satu panggilan REASONING_MODEL
+    - "parallel": analisis REASONING_MODEL + ekstraksi FAST_MODEL secara paralel (jalur lama)
+    `prescreen` adalah tindakan efektif dari prescreen_decision (off / downgrade / skip).
+    """
+    if prescreen == "skip":
+        return "prescreen", PRESCREEN_ROUTE_REASON
+    if prescreen == "downgrade":
+        return "fast", PRESCREEN_ROUTE_REASON
+    if ANALYZE_ROUTING in ("single", "parallel", "fast"):
+        return ANALYZE_ROUTING, "forced"
+
+    reasoning_pressure = limiter_for(REASONING_MODEL).pressure
+    if reasoning_pressure >= FAST_PATH_PRESSURE and limiter_for(FAST_MODEL).pressure < FAST_PATH_PRESSURE:
+        return "fast", "quota_pressure"
+    if deadline_at_risk(REASONING_MODEL):
+        return "fast", "deadline_risk"
+    if not need_cv_data:
+        return "parallel", "analysis_only"
+    if cv_data_key(clean_cv) in cv_data_cache:
+        # cv_data sudah ada -> jalur paralel tinggal satu panggilan analisis
+        return "parallel", "cv_data_cached"
+    if len(clean_cv) <= SINGLE_CALL_MAX_CHARS:
+        return "single", "short_cv"
+    return "parallel", "long_cv"
+
+
+def prescreen_decision(match: Optional[SkillMatch], action: str) -> str:
+    """Tindakan efektif untuk CV ini (off jika skor di atas ambang / JD kurang jelas), dicatat di stats."""
+    decision = prescreen_action(action, match)
+    if match is not None:
+        prescreen_stats.record_decision("llm" if decision == "off" else decision)
+    return decision
+
 
-    # Eksekusi Paralel:
-    # 1. Analisis butuh waktu lama & otak kuat -> REASONING_MODEL
-    # 2. Ekstraksi data butuh cepat -> FAST_MODEL
-    analysis_res, original_data = await asyncio.gather(
-        _perform_analysis(),
-        extract_data_only(clean_cv)
+def prescreen_analysis(match: SkillMatch) -> AnalysisResponse:
+    """
+    Analisis lokal untuk CV yang dilewati (tanpa LLM). Hanya skill yang dinilai; overall_score
+    diisi skor skill sementara agar urutan ranking batch tetap bermakna.
+    """
+    matched = ", ".join(sorted(match.matched_skills)) or "-"
+    missing = ", ".join(sorted(match.missing_skills)) or "-"
+    not_scored = "Tidak dinilai: CV dilewati oleh pre-screening skill lokal."
+    return AnalysisResponse(
+        candidate_name="Unknown", overall_score=match.skill_score,
+        overall_summary=(f"Kecocokan skill dengan JD {match.skill_score}% (di bawah ambang {PRESCREEN_THRESHOLD}%), "
+                         "analisis AI lengkap tidak dijalankan."),
+        writing_score=0, writing_detail=not_scored, ats_score=0, ats_detail=not_scored,
+        skill_score=match.skill_score, skill_detail=f"Skill yang cocok: {matched}. Tidak ditemukan: {missing}.",
+        experience_score=0, experience_detail=not_scored,
+        critical_gaps=[
+            CriticalGap(gap=skill, action=f"Tunjukkan pengalaman nyata dengan {skill} di CV jika memang dimiliki.")
+            for skill in sorted(match.missing_skills)[:5]
+        ]
     )
 
+
+def apply_overall_score(analysis_res: AnalysisResponse) -> AnalysisResponse:
+    """Overall score dihitung ulang dari rata-rata 4 skor detail (tidak mempercayai angka model)."""
     avg_score = (
         analysis_res.ats_score + 
         analysis_res.writing_score + 
@@ -232,43 +691,293 @@ async def analyze_cv(cv_text: str, job_desc: str, current_date: str = None):
         analysis_res.experience_score
     ) / 4
     analysis_res.overall_score = int(round(avg_score))
+    return analysis_res
+
+
+async def stream_analysis(clean_cv: str, job_desc: str, current_date: str, model_name: str = REASONING_MODEL):
+    """
+    Versi streaming dari perform_analysis via Gemini streaming API.
+    Yield ("section", {field: value}) setiap field top-level selesai di-generate,
+    lalu ("analysis", AnalysisResponse) sebagai hasil akhir.
+    Jika stream gagal setelah ada section terkirim, ("reset", {"detail": ...}) di-yield dulu:
+    hasil akhir dari jalur non-streaming bisa berbeda dengan section yang sudah diterima client.
+    """
+    system_instruction, shared_text, prompt_text = _build_analysis_prompt(
+        clean_cv, job_desc, current_date, model_name=model_name)
+    contents, config, cache_name = prepare_request(
+        model_name, [user_content(prompt_text)], ANALYSIS_CONFIG, system_instruction, shared_text)
+    scanner = JsonFieldScanner()
+    usage_metadata = None
+    called_at = None
+    sections_sent = False
+    try:
+        limiter = limiter_for(model_name)
+        queued_at = time.perf_counter()
+        async with limiter.acquire():
+            called_at = time.perf_counter()
+            observe_gemini_queue(model_name, called_at - queued_at)
+            # Timeout per model berlaku untuk membuka stream dan untuk jeda antar chunk
+            stream = await asyncio.wait_for(client.aio.models.generate_content_stream(
+                model=model_name,
+                contents=contents,
+                config=config
+            ), call_timeout(model_name))
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(stream.__anext__(), call_timeout(model_name))
+                except StopAsyncIteration:
+                    break
+                # usage_metadata lengkap ada di chunk terakhir
+                usage_metadata = chunk.usage_metadata or usage_metadata
+                if not chunk.text:
+                    continue
+                for field, value in scanner.feed(chunk.text).items():
+                    # overall_score dari model akan dihitung ulang, jadi tidak di-stream
+                    if field == "overall_score":
+                        continue
+                    sections_sent = True
+                    yield "section", {field: value}
+        observe_gemini_call(model_name, 0, "ok", time.perf_counter() - called_at)
+        called_at = None
+        limiter.on_success()
+        record_usage(model_name, usage_metadata)
+
+        with span("json_stream_parse"):
+            result = parse_model(scanner.buffer, AnalysisResponse)
+    except Exception as e:
+        if called_at is not None:
+            observe_gemini_call(model_name, 0, call_outcome(e, cache_name), time.perf_counter() - called_at)
+        if cache_name and is_cache_error(e):
+            context_cache.invalidate(cache_name)
+        if is_rate_limit_error(e):
+            limiter_for(model_name).on_throttle(retry_after_seconds(e))
+        if isinstance(e, asyncio.TimeoutError):
+            record_deadline_event(model_name, "timeout")
+        # Stream putus / output rusak -> ulangi lewat jalur non-streaming (dengan retry & fallback)
+        print(f"Analyze Stream Error ({model_name}): {e}")
+        if sections_sent:
+            yield "reset", {"detail": "Stream analisis terputus, section sebelumnya dibatalkan."}
+        result = await perform_analysis(clean_cv, job_desc, current_date, model_name)
+
+    yield "analysis", result
+
+
+async def analyze_cv(cv_text: str, job_desc: str, current_date: str = None, prescreen_action: str = None):
+    with track_model_fallbacks() as fallbacks:
+        result = await _analyze_cv(cv_text, job_desc, current_date, prescreen_action)
+    return with_model_fallbacks(result, fallbacks)
+
+
+def with_model_fallbacks(result: dict, fallbacks: list) -> dict:
+    """Catat fallback REASONING_MODEL -> FAST_MODEL di tengah retry (karena deadline) di meta."""
+    if fallbacks:
+        result["meta"]["model_fallback"] = list(fallbacks)
+    return result
+
 
+async def _analyze_cv(cv_text: str, job_desc: str, current_date: str = None, prescreen_action: str = None):
+    
+    if not current_date:
+        current_date = datetime.now().strftime("%Y-%m-%d")
+
+    clean_cv = sanitize_content(cv_text)
+    clean_jd = clean_job_description(job_desc)
+    started = time.perf_counter()
+    match = prescreen_cv(clean_cv, clean_jd)
+    path, reason = route_analysis(clean_cv, prescreen=prescreen_decision(match, prescreen_action or PRESCREEN_ACTION))
+
+    analysis_res = original_data = None
+    if path == "prescreen":
+        # CV jelas tidak cocok: hanya ekstraksi data (FAST_MODEL), analisis dari skor lokal
+        analysis_res, original_data = prescreen_analysis(match), await extract_data_only(clean_cv)
+    elif path == "single":
+        try:
+            combined = await perform_combined(clean_cv, clean_jd, current_date)
+            analysis_res, original_data = combined.analysis, combined.cv_data
+        except Exception as e:
+            print(f"Combined Analyze Error, falling back to parallel: {e}")
+            path, reason = "parallel", "single_call_failed"
+
+    if analysis_res is None:
+        # Eksekusi Paralel:
+        # 1. Analisis butuh waktu lama & otak kuat -> REASONING_MODEL (FAST_MODEL jika kuota tertekan)
+        # 2. Ekstraksi data butuh cepat -> FAST_MODEL
+        analysis_res, original_data = await asyncio.gather(
+            perform_analysis(clean_cv, clean_jd, current_date, analysis_model_for(path)),
+            extract_data_only(clean_cv)
+        )
+
+    if path != "prescreen":
+        apply_overall_score(analysis_res)
+
+    meta = analysis_meta(path, reason, started,
+                         prompt_report(cv_text, job_desc, clean_cv, clean_jd, analysis_model_for(path)), match)
+    if is_extract_fallback(original_data):
+        # Ditandai agar hasil ini (analisis maupun cv_data) tidak disimpan di result cache
+        meta["degraded"] = EXTRACT_FAILED
     return {
         "analysis": analysis_res.model_dump(),
-        "cv_data": original_data.model_dump()
+        "cv_data": original_data.model_dump(),
+        "meta": meta
     }
 
+
+def analysis_model_for(path: str) -> str:
+    return FAST_MODEL if path == "fast" else REASONING_MODEL
+
+
+def analysis_meta(path: str, reason: str, started: float, prompt: dict = None,
+                  prescreen: Optional[SkillMatch] = None) -> dict:
+    meta = {"path": path, "reason": reason, "latency_ms": round((time.perf_counter() - started) * 1000, 1)}
+    if prompt is not None:
+        # Token sebelum/sesudah dedup, strip boilerplate JD, dan pemotongan ke budget model
+        meta["prompt"] = prompt
+    if prescreen is not None:
+        # Skor skill sementara (lokal, deterministik) + skill JD yang cocok / tidak ditemukan
+        meta["prescreen"] = prescreen.as_dict()
+    return meta
+
+async def analyze_only(cv_text: str, job_desc: str, current_date: str = None,
+                       prescreen_action: str = PRESCREEN_BATCH_ACTION):
+    """Hanya analisis (tanpa extract_data_only), untuk ranking banyak CV sekaligus."""
+    with track_model_fallbacks() as fallbacks:
+        result = await _analyze_only(cv_text, job_desc, current_date, prescreen_action)
+    return with_model_fallbacks(result, fallbacks)
+
+
+async def _analyze_only(cv_text: str, job_desc: str, current_date: str, prescreen_action: str):
+    if not current_date:
+        current_date = datetime.now().strftime("%Y-%m-%d")
+
+    clean_cv = sanitize_content(cv_text)
+    clean_jd = clean_job_description(job_desc)
+    started = time.perf_counter()
+    match = prescreen_cv(clean_cv, clean_jd)
+    path, reason = route_analysis(clean_cv, need_cv_data=False, prescreen=prescreen_decision(match, prescreen_action))
+    analysis_model = analysis_model_for(path)
+    if path == "prescreen":
+        analysis_res = prescreen_analysis(match)
+    else:
+        analysis_res = apply_overall_score(await perform_analysis(clean_cv, clean_jd, current_date, analysis_model))
+    if path not in ("fast", "prescreen"):
+        path = "analysis_only"
+    prompt = prompt_report(cv_text, job_desc, clean_cv, clean_jd, analysis_model)
+    return {"analysis": analysis_res.model_dump(), "meta": analysis_meta(path, reason, started, prompt, match)}
+
+
+async def analyze_cv_stream(cv_text: str, job_desc: str, current_date: str = None):
+    """
+    Varian streaming analyze_cv untuk SSE, dengan pre-screening dan routing yang sama. Yield (event, payload):
+    - "prescreen": skor skill sementara dari pre-screening lokal (langsung, sebelum panggilan Gemini)
+    - "cv_data": hasil extract_data_only (FAST_MODEL), biasanya selesai lebih dulu
+    - "analysis_section": field analisis yang sudah selesai di-stream (jalur parallel / fast)
+    - "analysis_reset": stream analisis gagal di tengah; semua analysis_section sebelumnya harus dibuang
+    - "result": payload final identik dengan analyze_cv (overall_score sudah dihitung ulang)
+    """
+    if not current_date:
+        current_date = datetime.now().strftime("%Y-%m-%d")
+
+    clean_cv = sanitize_content(cv_text)
+    clean_jd = clean_job_description(job_desc)
+    started = time.perf_counter()
+    match = prescreen_cv(clean_cv, clean_jd)
+    if match is not None:
+        yield "prescreen", match.as_dict()
+    path, reason = route_analysis(clean_cv, prescreen=prescreen_decision(match, PRESCREEN_ACTION))
+
+    analysis_res = original_data = None
+    if path == "prescreen":
+        original_data = await extract_data_only(clean_cv)
+        yield "cv_data", original_data.model_dump()
+        analysis_res = prescreen_analysis(match)
+    elif path == "single":
+        # Satu panggilan tanpa streaming: tidak ada analysis_section, langsung cv_data + result
+        try:
+            combined = await perform_combined(clean_cv, clean_jd, current_date)
+            analysis_res, original_data = apply_overall_score(combined.analysis), combined.cv_data
+            yield "cv_data", original_data.model_dump()
+        except Exception as e:
+            print(f"Combined Analyze Error, falling back to parallel: {e}")
+            path, reason = "parallel", "single_call_failed"
+
+    fallbacks = []
+    if analysis_res is None:
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def _extract():
+            try:
+                await queue.put(("cv_data", await extract_data_only(clean_cv)))
+            except Exception as e:
+                await queue.put(("error", e))
+
+        async def _analyze():
+            try:
+                with track_model_fallbacks() as analysis_fallbacks:
+                    async for kind, payload in stream_analysis(clean_cv, clean_jd, current_date,
+                                                               analysis_model_for(path)):
+                        if kind == "analysis":
+                            fallbacks.extend(analysis_fallbacks)
+                        await queue.put((kind, payload))
+            except Exception as e:
+                await queue.put(("error", e))
+
+        tasks = [asyncio.create_task(_extract()), asyncio.create_task(_analyze())]
+        try:
+            while original_data is None or analysis_res is None:
+                kind, payload = await queue.get()
+                if kind == "error":
+                    raise payload
+                if kind == "cv_data":
+                    original_data = payload
+                    yield "cv_data", original_data.model_dump()
+                elif kind == "section":
+                    yield "analysis_section", payload
+                elif kind == "reset":
+                    yield "analysis_reset", payload
+                else:
+                    analysis_res = apply_overall_score(payload)
+        finally:
+            # Client disconnect / error -> jangan biarkan panggilan Gemini tetap berjalan
+            for task in tasks:
+                task.cancel()
+
+    meta = analysis_meta(path, reason, started,
+                         prompt_report(cv_text, job_desc, clean_cv, clean_jd, analysis_model_for(path)), match)
+    meta["stream"] = True
+    if is_extract_fallback(original_data):
+        meta["degraded"] = EXTRACT_FAILED
+    yield "result", with_model_fallbacks({
+        "analysis": analysis_res.model_dump(),
+        "cv_data": original_data.model_dump(),
+        "meta": meta
+    }, fallbacks)
+
 async def customize_cv(cv_text: str, mode: str, context_data: str, current_date: str = None):
     
     if not current_date:
         current_date = datetime.now().strftime("%Y-%m-%d")
 
     clean_cv = sanitize_content(cv_text)
+    if mode == "job_desc":
+        context_data = clean_job_description(context_data)
 
-    if mode == 'job_desc':
-        mode_context = f"TARGET JOB DESCRIPTION: {context_data}"
-        goal = "Tailor the CV keywords to match the Target Job, but PRESERVE the candidate's history."
-    else: 
-        mode_context = f"ANALYSIS FEEDBACK: {context_data}"
-        goal = "Improve the CV based on the weakness analysis provided."
+    path = customize_path(clean_cv)
+    runner = _customize_sections if path == "sections" else _customize_cv
+    key = hash_parts("customize", clean_cv, mode, context_data, current_date, PROMPT_VERSION, REASONING_MODEL, path)
+    result = await customize_flight.do(key, lambda: runner(clean_cv, mode, context_data, current_date))
+    return result.model_copy(deep=True)
 
-    prompt_text = f"""
-    You are an Expert Resume Writer. Your task is to REWRITE the candidate's CV to be world-class, ATS-friendly, and high-impact.
-    
-    CONTEXT:
-    - Today's Date: {current_date}
-    - {mode_context}
-    
-    GOAL: {goal}
 
-    ORIGINAL CV CONTENT:
-    {clean_cv}
+CUSTOMIZE_SYSTEM_INSTRUCTION = """
+    You are an Expert Resume Writer. Your task is to REWRITE the candidate's CV to be world-class, ATS-friendly, and high-impact.
+    The request provides the CONTEXT (Today's Date and either a Target Job Description or Analysis Feedback),
+    the GOAL, and the ORIGINAL CV CONTENT.
     
     *** CRITICAL RULES ***:
     1. **NO DELETION**: Preserve all work history.
     2. **NO HALLUCINATIONS**: Do not invent skills.
     3. **LINKS**: Preserve all URLs. Convert "Text [URL]" to <a href='URL'>Text</a>.
-    3. **DATE ACCURACY**: Ensure dates are formatted correctly relative to today ({current_date}). 
+    3. **DATE ACCURACY**: Ensure dates are formatted correctly relative to Today's Date given in the CONTEXT. 
        If a job is current, ensure it is clear (e.g., "Jan 2024 - Present").
     4. **LANGUAGE CONSISTENCY (IMPORTANT)**: 
        - Detect the language of the 'ORIGINAL CV CONTENT'.
@@ -284,24 +993,243 @@ async def customize_cv(cv_text: str, mode: str, context_data: str, current_date:
     OUTPUT: Strictly JSON matching the ImprovedCVResult schema.
     """
 
+CUSTOMIZE_CONFIG = types.GenerateContentConfig(
+    response_mime_type="application/json", 
+    response_schema=ImprovedCVResult,
+    temperature=0.2 # Sedikit kreativitas untuk penulisan
+)
+
+
+def customize_shared_text(mode: str, context_data: str) -> str:
+    if mode == 'job_desc':
+        mode_context = f"TARGET JOB DESCRIPTION: {context_data}"
+        goal = "Tailor the CV keywords to match the Target Job, but PRESERVE the candidate's history."
+    else: 
+        mode_context = f"ANALYSIS FEEDBACK: {context_data}"
+        goal = "Improve the CV based on the weakness analysis provided."
+
+    # Target JD + goal sama untuk semua CV yang di-tailor ke lowongan yang sama -> konten bersama
+    return f"""
+    CONTEXT:
+    - {mode_context}
+    
+    GOAL: {goal}
+    """
+
+
+def _customize_error(error: Exception) -> ImprovedCVResult:
+    return ImprovedCVResult(
+        full_name=CUSTOMIZE_ERROR_NAME, professional_summary=f"AI Error: {str(error)}",
+        contact_info=CVContactInfo(email="", phone="", location=""),
+        hard_skills=[], soft_skills=[], work_experience=[], education=[], projects=[]
+    )
+
+
+async def _customize_cv(clean_cv: str, mode: str, context_data: str, current_date: str) -> ImprovedCVResult:
+    shared_text = customize_shared_text(mode, context_data)
+
+    prompt_text = f"""
+    CONTEXT:
+    - Today's Date: {current_date}
+
+    ORIGINAL CV CONTENT:
+    {fit_cv(clean_cv, REASONING_MODEL, shared_text)}
+    """
+
     try:
         # [ROUTING] Customize CV memerlukan kemampuan menulis yang baik (Creative/Reasoning)
         
         response = await generate_with_retry(
-            contents=[types.Content(role="user", parts=[types.Part.from_text(text=prompt_text)])],
-            config=types.GenerateContentConfig(
-                response_mime_type="application/json", 
-                response_schema=ImprovedCVResult,
-                temperature=0.2 # Sedikit kreativitas untuk penulisan
-            ),
-            model_name=REASONING_MODEL # <--- Explicitly use Strong Model
+            contents=[user_content(prompt_text)],
+            config=CUSTOMIZE_CONFIG,
+            model_name=REASONING_MODEL, # <--- Explicitly use Strong Model
+            system_instruction=CUSTOMIZE_SYSTEM_INSTRUCTION,
+            shared_text=shared_text,
+            fallback_model=FAST_MODEL # Deadline mepet: CV versi FAST_MODEL lebih baik daripada error
         )
         if response.parsed: return response.parsed
-        return ImprovedCVResult(**json.loads(clean_json_text(response.text)))
+        with span("json_fallback_parse"):
+            return parse_model(response.text, ImprovedCVResult, allow_partial=True)
     except Exception as e:
         print(f"Customize Error: {e}")
-        return ImprovedCVResult(
-            full_name="Error Generating CV", professional_summary=f"AI Error: {str(e)}",
-            contact_info=CVContactInfo(email="", phone="", location=""),
-            hard_skills=[], soft_skills=[], work_experience=[], education=[], projects=[]
-        )
\ No newline at end of file
+        return _customize_error(e)
+
+
+# Satu instruksi untuk semua jenis bagian: prefix (instruksi + JD) identik di semua panggilan bagian
+# milik lowongan yang sama, jadi bisa dilayani dari context cache
+CUSTOMIZE_SECTION_SYSTEM_INSTRUCTION = """
+    You are an Expert Resume Writer. You REWRITE ONE SECTION of the candidate's CV at a time
+    to be world-class, ATS-friendly, and high-impact.
+    The request provides the CONTEXT (Today's Date and either a Target Job Description or Analysis Feedback),
+    the GOAL, the SECTION name, and the ORIGINAL SECTION as JSON.
+
+    *** CRITICAL RULES ***:
+    1. **NO DELETION**: Keep every entry, company, title, date, and project of the section.
+    2. **NO HALLUCINATIONS**: Do not invent skills, employers, or metrics that are not in the original.
+    3. **LINKS**: Preserve all <a href='URL'>Text</a> tags exactly.
+    4. **DATE ACCURACY**: Format dates relative to Today's Date given in the CONTEXT.
+       If a job is current, ensure it is clear (e.g., "Jan 2024 - Present").
+    5. **LANGUAGE CONSISTENCY (IMPORTANT)**: Rewrite in the SAME language as the original section.
+
+    *** WRITING INSTRUCTIONS ***:
+    - summary: Metric-driven, based on the whole CV given as reference.
+    - experience: Google XYZ formula for every achievement.
+    - projects: Highlight impact and the technologies used.
+    - skills: Re-organize based on priority for the GOAL.
+
+    OUTPUT: Strictly JSON matching the response schema of the section.
+    """
+
+SECTION_SCHEMAS = {
+    "summary": SummarySection,
+    "experience": CVExperience,
+    "projects": ProjectsSection,
+    "skills": SkillsSection,
+}
+SECTION_CONFIGS = {
+    kind: CUSTOMIZE_CONFIG.model_copy(update={"response_schema": schema})
+    for kind, schema in SECTION_SCHEMAS.items()
+}
+
+
+class CustomizeSectionStats:
+    def __init__(self):
+        self.requests = 0
+        self.sections = 0
+        self.retried = 0
+        self.reused = 0
+        self.single_fallbacks = 0
+
+    def snapshot(self):
+        return {
+            "mode": CUSTOMIZE_MODE,
+            "section_concurrency": CUSTOMIZE_SECTION_CONCURRENCY,
+            "requests": self.requests,
+            "sections": self.sections,
+            "retried": self.retried,
+            "reused_original": self.reused,
+            "single_call_fallbacks": self.single_fallbacks,
+        }
+
+
+customize_section_stats = CustomizeSectionStats()
+
+
+def customize_path(clean_cv: str) -> str:
+    """
+    auto memilih sections hanya jika cv_data CV ini sudah di-cache (biasanya dari analyze):
+    tanpa cache, ekstraksi dulu menghasilkan output sepanjang CV penuh, jadi tidak lebih cepat dari single.
+    """
+    if CUSTOMIZE_MODE in ("single", "sections"):
+        return CUSTOMIZE_MODE
+    if len(clean_cv) >= CUSTOMIZE_SECTIONS_MIN_CHARS and cv_data_key(clean_cv) in cv_data_cache:
+        return "sections"
+    return "single"
+
+
+def cv_sections(original: ImprovedCVResult):
+    """[(nama, jenis, JSON bagian asli)] yang ditulis ulang; bagian lain dipakai apa adanya."""
+    sections = [("summary", "summary", {"professional_summary": original.professional_summary})]
+    sections += [(f"experience:{i}", "experience", experience.model_dump())
+                 for i, experience in enumerate(original.work_experience)]
+    if original.projects:
+        sections.append(("projects", "projects", {"projects": [project.model_dump() for project in original.projects]}))
+    if original.hard_skills or original.soft_skills:
+        sections.append(("skills", "skills", {"hard_skills": original.hard_skills, "soft_skills": original.soft_skills}))
+    return sections
+
+
+async def _customize_section(kind: str, payload: dict, clean_cv: str, shared_text: str, current_date: str,
+                             retries: int):
+    reference = ""
+    if kind == "summary":
+        # Ringkasan butuh gambaran seluruh CV; bagian lain cukup isinya sendiri
+        reference = f"""
+    CANDIDATE CV (reference only):
+    {fit_cv(clean_cv, REASONING_MODEL, shared_text)}
+    """
+    prompt_text = f"""
+    CONTEXT:
+    - Today's Date: {current_date}
+
+    SECTION: {kind}
+    ORIGINAL SECTION (JSON):
+    {dumps_str(payload)}
+    {reference}"""
+    async with customize_section_slots:
+        response = await generate_with_retry(
+            contents=[user_content(prompt_text)],
+            config=SECTION_CONFIGS[kind],
+            model_name=REASONING_MODEL,
+            retries=retries,
+            system_instruction=CUSTOMIZE_SECTION_SYSTEM_INSTRUCTION,
+            shared_text=shared_text,
+            fallback_model=FAST_MODEL
+        )
+    if response.parsed:
+        return response.parsed
+    with span("json_fallback_parse"):
+        return parse_model(response.text, SECTION_SCHEMAS[kind], allow_partial=True)
+
+
+async def _customize_sections(clean_cv: str, mode: str, context_data: str, current_date: str) -> ImprovedCVResult:
+    """
+    Customize per bagian: kerangka CV dari extract_data_only (biasanya sudah di-cache oleh analyze),
+    lalu ringkasan, tiap pengalaman, proyek, dan skill ditulis ulang paralel dengan output kecil.
+    Hanya bagian yang gagal di-retry; jika tetap gagal, bagian asli dipakai apa adanya.
+    """
+    original = await extract_data_only(clean_cv)
+    if not original.work_experience and not original.professional_summary:
+        # Ekstraksi gagal / CV tanpa struktur yang bisa dipecah -> satu panggilan seperti biasa
+        customize_section_stats.single_fallbacks += 1
+        return await _customize_cv(clean_cv, mode, context_data, current_date)
+
+    shared_text = customize_shared_text(mode, context_data)
+    sections = cv_sections(original)
+    customize_section_stats.requests += 1
+    customize_section_stats.sections += len(sections)
+
+    results = {}
+    pending = sections
+    last_error = None
+    # Putaran 1: satu attempt per bagian; putaran 2: hanya bagian yang gagal, dengan retry + backoff
+    for retries in (1, 2):
+        outcomes = await asyncio.gather(
+            *(_customize_section(kind, payload, clean_cv, shared_text, current_date, retries)
+              for _, kind, payload in pending),
+            return_exceptions=True
+        )
+        failed = []
+        for section, outcome in zip(pending, outcomes):
+            if isinstance(outcome, Exception):
+                print(f"Customize Section Error ({section[0]}): {outcome!r}")
+                last_error = outcome
+                failed.append(section)
+            else:
+                results[section[0]] = outcome
+        pending = failed
+        if not pending:
+            break
+        if retries == 1:
+            customize_section_stats.retried += len(pending)
+
+    if not results:
+        return _customize_error(last_error)
+    customize_section_stats.reused += len(pending)
+
+    summary = results.get("summary")
+    skills = results.get("skills")
+    projects = results.get("projects")
+    return ImprovedCVResult(
+        full_name=original.full_name,
+        professional_summary=summary.professional_summary if summary else original.professional_summary,
+        contact_info=original.contact_info,
+        hard_skills=skills.hard_skills if skills else original.hard_skills,
+        soft_skills=skills.soft_skills if skills else original.soft_skills,
+        work_experience=[results.get(f"experience:{i}", experience)
+                         for i, experience in enumerate(original.work_experience)],
+        education=original.education,
+        projects=projects.projects if projects else original.projects,
+        certifications=original.certifications,
+        section_labels=original.section_labels,
+    )
@@ -0,0 +1,301 @@
+import os
+import re
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+from urllib.parse import urlparse
+
+from src.services.json_parsing import loads, dumps_str
+
+# --- KONFIGURASI RESULT CACHE ---
+# RESULT_CACHE_BACKEND: "memory" (default), "redis", atau "off"
+RESULT_CACHE_BACKEND = os.getenv("RESULT_CACHE_BACKEND", "memory").lower()
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "21600"))  # 6 jam
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "512"))
+RESULT_CACHE_REDIS_URL = os.getenv("RESULT_CACHE_REDIS_URL") or "redis://{auth}{host}:{port}/0".format(
+    auth=f":{os.getenv('REDIS_PASSWORD')}@" if os.getenv("REDIS_PASSWORD") else "",
+    host=os.getenv("REDIS_HOST", "localhost"),
+    port=os.getenv("REDIS_PORT", "6379"),
+)
+
+# --- KONFIGURASI CACHE HASIL PARSING (per proses, dibatasi ukuran dalam bytes) ---
+TEXT_CACHE_MAX_BYTES = int(os.getenv("TEXT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+CV_DATA_CACHE_MAX_BYTES = int(os.getenv("CV_DATA_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+
+def hash_parts(*parts) -> str:
+    """SHA-256 dari beberapa bagian (bytes/str/None), dipisah NUL agar tidak ambigu."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if part is None:
+            part = b""
+        elif isinstance(part, str):
+            part = part.encode("utf-8")
+        digest.update(part)
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Normalisasi JD/context agar perbedaan whitespace tidak membuat cache miss."""
+    if not text:
+        return ""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "sets": self.sets,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class MemoryCacheBackend:
+    """LRU in-process dengan TTL per entry. Aman dipakai di event loop (tanpa await di dalamnya)."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int, stats: CacheStats):
+        self.max_entries = max_entries
+        self.stats = stats
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl: int):
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.stats.evictions += 1
+
+    async def close(self):
+        self._data.clear()
+
+    def size(self) -> int:
+        return len(self._data)
+
+
+class RedisCacheBackend:
+    """
+    Backend minimal yang berbicara protokol Redis (RESP) langsung lewat asyncio,
+    sehingga bisa dilayani Redis asli, KeyDB/Dragonfly, atau stand-in lokal apa pun.
+    Kegagalan koneksi diperlakukan sebagai cache miss, bukan error request.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, stats: CacheStats, prefix: str = "ai-engine:result:"):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.prefix = prefix
+        self.stats = stats
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), timeout=2
+        )
+        if self.password:
+            await self._send("AUTH", self.password)
+        if self.db:
+            await self._send("SELECT", str(self.db))
+
+    async def _send(self, *args: str):
+        payload = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg.encode("utf-8")
+            payload.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self._writer.write(b"".join(payload))
+        await self._writer.drain()
+        return await self._read_reply()
+
+    async def _read_reply(self):
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body.decode()
+        if kind == b"-":
+            raise RuntimeError(body.decode())
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            length = int(body)
+            if length < 0:
+                return None
+            data = await self._reader.readexactly(length + 2)
+            return data[:-2].decode("utf-8")
+        raise RuntimeError(f"Unsupported Redis reply: {line!r}")
+
+    async def _command(self, *args: str):
+        async with self._lock:
+            try:
+                if self._writer is None:
+                    await self._connect()
+                return await asyncio.wait_for(self._send(*args), timeout=2)
+            except Exception:
+                await self._reset()
+                raise
+
+    async def _reset(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader, self._writer = None, None
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._command("GET", self.prefix + key)
+
+    async def set(self, key: str, value: str, ttl: int):
+        await self._command("SET", self.prefix + key, value, "EX", str(ttl))
+
+    async def close(self):
+        async with self._lock:
+            await self._reset()
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+class ResultCache:
+    """Cache hasil AI (JSON-serializable) dengan key content-addressed dan counter hit/miss."""
+
+    def __init__(self, backend: str, ttl: int, max_entries: int = RESULT_CACHE_MAX_ENTRIES,
+                 prefix: str = "ai-engine:result:"):
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self.enabled = backend != "off"
+        if backend == "redis":
+            self.backend = RedisCacheBackend(RESULT_CACHE_REDIS_URL, self.stats, prefix=prefix)
+        else:
+            self.backend = MemoryCacheBackend(max_entries, self.stats)
+
+    async def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        try:
+            raw = await self.backend.get(key)
+        except Exception as e:
+            print(f"Result Cache Error (get): {e}")
+            self.stats.errors += 1
+            raw = None
+        if raw is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return loads(raw)
+
+    async def set(self, key: str, value: Any):
+        if not self.enabled:
+            return
+        try:
+            await self.backend.set(key, dumps_str(value), self.ttl)
+            self.stats.sets += 1
+        except Exception as e:
+            print(f"Result Cache Error (set): {e}")
+            self.stats.errors += 1
+
+    async def close(self):
+        await self.backend.close()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.name if self.enabled else "off",
+            "ttl_seconds": self.ttl,
+            "entries": self.backend.size(),
+            **self.stats.as_dict(),
+        }
+
+
+class SizedLRUCache:
+    """
+    LRU in-process yang dibatasi total ukuran (bytes), bukan jumlah entry.
+    Dipakai untuk hasil parsing yang dipakai ulang antara /api/analyze dan /api/customize.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self.current_bytes = 0
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.stats.hits += 1
+        return entry[0]
+
+    def __contains__(self, key: str) -> bool:
+        # Cek keberadaan tanpa menggeser urutan LRU / menghitung hit-miss
+        return key in self._data
+
+    def set(self, key: str, value: Any, size: int):
+        # Entry yang lebih besar dari seluruh budget tidak pernah disimpan
+        if size > self.max_bytes:
+            return
+        old = self._data.pop(key, None)
+        if old is not None:
+            self.current_bytes -= old[1]
+        self._data[key] = (value, size)
+        self.current_bytes += size
+        self.stats.sets += 1
+        while self.current_bytes > self.max_bytes:
+            _, (_, evicted_size) = self._data.popitem(last=False)
+            self.current_bytes -= evicted_size
+            self.stats.evictions += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._data),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            **self.stats.as_dict(),
+        }
+
+
+result_cache = ResultCache(RESULT_CACHE_BACKEND, RESULT_CACHE_TTL)
+text_cache = SizedLRUCache(TEXT_CACHE_MAX_BYTES)
+cv_data_cache = SizedLRUCache(CV_DATA_CACHE_MAX_BYTES)
+
+
+def result_cache_key(kind: str, content_digest: bytes, context: Optional[str], mode: Optional[str],
+                     current_date: str, version: str) -> str:
+    """
+    Key = hash(SHA-256 file, JD/context ternormalisasi, mode, versi prompt+model, tanggal).
+    `content_digest` dihitung saat upload di-stream (StoredUpload.digest), file tidak dibaca ulang.
+    `version` berasal dari ai_engine agar perubahan prompt/model otomatis meng-invalidasi cache.
+    """
+    return hash_parts(kind, content_digest, normalize_text(context), mode or "", version, current_date)
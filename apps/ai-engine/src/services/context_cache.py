@@ -0,0 +1,190 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+
+from google.genai import types
+
+from src.services.cache import hash_parts
+from src.services.prompt_budget import estimate_tokens
+
+# --- KONFIGURASI GEMINI CONTEXT CACHE ---
+# Explicit cached content untuk prefix prompt yang sama di banyak request
+# (system instruction statis, ditambah JD yang sedang sering dipakai, mis. batch ranking)
+GEMINI_CONTEXT_CACHE = os.getenv("GEMINI_CONTEXT_CACHE", "on").lower() not in ("off", "false", "0")
+GEMINI_CONTEXT_CACHE_TTL = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL", "900"))
+# Gemini menolak cache di bawah batas token minimum model (1024 untuk 2.5 Flash)
+GEMINI_CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("GEMINI_CONTEXT_CACHE_MIN_TOKENS", "1024"))
+# JD baru di-cache setelah dipakai sekian kali dalam satu TTL
+GEMINI_CONTEXT_CACHE_HOT_THRESHOLD = int(os.getenv("GEMINI_CONTEXT_CACHE_HOT_THRESHOLD", "2"))
+GEMINI_CONTEXT_CACHE_MAX_ENTRIES = int(os.getenv("GEMINI_CONTEXT_CACHE_MAX_ENTRIES", "64"))
+# Jeda sebelum mencoba lagi membuat cache yang gagal dibuat
+GEMINI_CONTEXT_CACHE_RETRY_AFTER = 300
+
+
+def is_cache_error(error: Exception) -> bool:
+    """Cached content sudah kedaluwarsa / dihapus di sisi Gemini."""
+    message = str(error).lower()
+    return "cachedcontent" in message or "cached content" in message
+
+
+class _Entry:
+    def __init__(self, name: str, ttl: int):
+        self.name = name
+        self.expires_at = time.monotonic() + ttl
+        self.refreshing = False
+
+
+class ContextCache:
+    """
+    Mengelola handle cached content Gemini per (model, system instruction, teks bersama).
+    Lookup tidak pernah menunggu network: cache dibuat / diperpanjang TTL-nya di background,
+    request yang datang sebelum cache siap memakai prompt penuh seperti biasa.
+    """
+
+    def __init__(self, client, enabled: bool = GEMINI_CONTEXT_CACHE, ttl: int = GEMINI_CONTEXT_CACHE_TTL,
+                 min_tokens: int = GEMINI_CONTEXT_CACHE_MIN_TOKENS,
+                 hot_threshold: int = GEMINI_CONTEXT_CACHE_HOT_THRESHOLD,
+                 max_entries: int = GEMINI_CONTEXT_CACHE_MAX_ENTRIES):
+        self.client = client
+        self.enabled = enabled
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+        self.hot_threshold = hot_threshold
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._seen: "OrderedDict[str, int]" = OrderedDict()
+        self._failed: Dict[str, float] = {}
+        self._creating: set = set()
+        self._tasks: set = set()
+        self.hits = 0
+        self.misses = 0
+        self.created = 0
+        self.refreshed = 0
+        self.expired = 0
+        self.evicted = 0
+        self.invalidated = 0
+        self.skipped_small = 0
+        self.errors = 0
+
+    def lookup(self, model: str, system_instruction: str, shared_text: Optional[str] = None) -> Optional[str]:
+        """Nama cached content yang bisa dipakai sekarang, atau None (kirim prompt penuh)."""
+        if not self.enabled:
+            return None
+
+        key = hash_parts(model, system_instruction, shared_text or "")
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        # Margin 30 detik agar cache tidak kedaluwarsa di tengah panggilan
+        if entry is not None and entry.expires_at > now + 30:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if entry.expires_at - now < self.ttl / 4 and not entry.refreshing:
+                entry.refreshing = True
+                self._spawn(self._refresh(key, entry))
+            return entry.name
+        if entry is not None:
+            del self._entries[key]
+            self.expired += 1
+
+        self.misses += 1
+        if estimate_tokens(system_instruction + (shared_text or "")) < self.min_tokens:
+            self.skipped_small += 1
+            return None
+        if key in self._creating or self._failed.get(key, 0) > now:
+            return None
+
+        if shared_text:
+            seen = self._seen.pop(key, 0) + 1
+            self._seen[key] = seen
+            while len(self._seen) > self.max_entries * 8:
+                self._seen.popitem(last=False)
+            if seen < self.hot_threshold:
+                return None
+
+        self._creating.add(key)
+        self._spawn(self._create(key, model, system_instruction, shared_text))
+        return None
+
+    def invalidate(self, name: str):
+        for key, entry in list(self._entries.items()):
+            if entry.name == name:
+                del self._entries[key]
+                self.invalidated += 1
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _create(self, key: str, model: str, system_instruction: str, shared_text: Optional[str]):
+        try:
+            contents = None
+            if shared_text:
+                contents = [types.Content(role="user", parts=[types.Part.from_text(text=shared_text)])]
+            cached = await self.client.aio.caches.create(
+                model=model,
+                config=types.CreateCachedContentConfig(
+                    system_instruction=system_instruction,
+                    contents=contents,
+                    ttl=f"{self.ttl}s",
+                    display_name=f"ai-engine-{key[:16]}",
+                ),
+            )
+            self._entries[key] = _Entry(cached.name, self.ttl)
+            self._seen.pop(key, None)
+            self.created += 1
+            while len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.evicted += 1
+                self._spawn(self._delete(evicted.name))
+        except Exception as e:
+            self.errors += 1
+            self._failed[key] = time.monotonic() + GEMINI_CONTEXT_CACHE_RETRY_AFTER
+            print(f"Context Cache Create Error ({model}): {e}")
+        finally:
+            self._creating.discard(key)
+
+    async def _refresh(self, key: str, entry: _Entry):
+        try:
+            await self.client.aio.caches.update(
+                name=entry.name, config=types.UpdateCachedContentConfig(ttl=f"{self.ttl}s"))
+            entry.expires_at = time.monotonic() + self.ttl
+            self.refreshed += 1
+        except Exception as e:
+            self.errors += 1
+            self.invalidate(entry.name)
+            print(f"Context Cache Refresh Error: {e}")
+        finally:
+            entry.refreshing = False
+
+    async def _delete(self, name: str):
+        try:
+            await self.client.aio.caches.delete(name=name)
+        except Exception as e:
+            print(f"Context Cache Delete Error: {e}")
+
+    async def close(self):
+        """Hapus semua cached content milik proses ini (storage cache ditagih per jam)."""
+        for task in list(self._tasks):
+            task.cancel()
+        names = [entry.name for entry in self._entries.values()]
+        self._entries.clear()
+        if names:
+            await asyncio.gather(*(self._delete(name) for name in names))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "active": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "created": self.created,
+            "refreshed": self.refreshed,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "invalidated": self.invalidated,
+            "skipped_small": self.skipped_small,
+            "errors": self.errors,
+        }
@@ -0,0 +1,234 @@
+import os
+import time
+import asyncio
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, Dict, Any, List
+
+from src.services.metrics import Counter
+
+# --- KONFIGURASI DEADLINE & HEDGING ---
+# Batas total satu request (detik); header X-Request-Timeout hanya boleh memperpendek
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "90"))
+# Batas satu attempt panggilan Gemini per model, dihitung setelah lolos antrian limiter
+GEMINI_CALL_TIMEOUT_FAST = float(os.getenv("GEMINI_CALL_TIMEOUT_FAST", "30"))
+GEMINI_CALL_TIMEOUT_REASONING = float(os.getenv("GEMINI_CALL_TIMEOUT_REASONING", "60"))
+# Hedging: attempt kedua dikirim jika attempt pertama belum selesai setelah latency persentil ini.
+# Default off karena tiap hedge memakai kuota RPM & token tambahan.
+GEMINI_HEDGE = os.getenv("GEMINI_HEDGE", "off").lower() in ("on", "true", "1")
+GEMINI_HEDGE_QUANTILE = float(os.getenv("GEMINI_HEDGE_QUANTILE", "0.95"))
+GEMINI_HEDGE_MIN_DELAY = float(os.getenv("GEMINI_HEDGE_MIN_DELAY", "1.0"))
+# Persentil latency baru dipakai (hedging & fallback) setelah sampel cukup
+LATENCY_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+
+DEADLINE_EVENTS = Counter(
+    "ai_engine_gemini_deadline_events_total", "Timeout, hedge, dan fallback model karena deadline",
+    ("model", "event"))
+
+
+class DeadlineExceededError(TimeoutError):
+    """Sisa waktu request habis sebelum panggilan Gemini berikutnya bisa dimulai."""
+
+
+class LatencyTracker:
+    """Durasi panggilan sukses terakhir satu model (sliding window) untuk delay hedging & cek deadline."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if len(self._samples) < LATENCY_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def snapshot(self) -> Dict[str, Any]:
+        p50 = self.quantile(0.5)
+        p95 = self.quantile(0.95)
+        return {
+            "samples": len(self._samples),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+_trackers: Dict[str, LatencyTracker] = {}
+_timeouts: Dict[str, float] = {}
+_events: Dict[str, Dict[str, int]] = {}
+
+
+def configure_timeout(model: str, seconds: float):
+    _timeouts[model] = seconds
+
+
+def latency_for(model: str) -> LatencyTracker:
+    tracker = _trackers.get(model)
+    if tracker is None:
+        tracker = _trackers[model] = LatencyTracker()
+    return tracker
+
+
+def record_deadline_event(model: str, event: str):
+    """event: timeout | hedge | hedge_won | fallback | deadline_exceeded."""
+    counts = _events.setdefault(model, {})
+    counts[event] = counts.get(event, 0) + 1
+    DEADLINE_EVENTS.inc(model=model, event=event)
+
+
+class SharedDeadline:
+    """
+    Deadline komputasi single-flight yang ditunggu beberapa request: deadline terlama di antara
+    penunggunya (None jika ada penunggu tanpa deadline), agar request dengan X-Request-Timeout
+    pendek tidak memotong waktu request identik lain yang ikut menunggu.
+    """
+
+    def __init__(self, deadline: Optional[float]):
+        self.at = deadline
+
+    def extend(self, deadline: Optional[float]):
+        if self.at is not None:
+            self.at = None if deadline is None else max(self.at, deadline)
+
+
+# Deadline absolut (time.monotonic) milik request yang sedang berjalan, atau SharedDeadline di dalam
+# single-flight. Task anak (gather, hedge) menyalin context sehingga ikut terikat deadline yang sama.
+_request_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+@contextmanager
+def request_deadline(seconds: Optional[float]):
+    """Semua panggilan Gemini di dalam blok dibatasi `seconds` dari sekarang; None = tanpa deadline."""
+    token = _request_deadline.set(time.monotonic() + seconds if seconds else None)
+    try:
+        yield
+    finally:
+        _request_deadline.reset(token)
+
+
+# Fallback model karena deadline (REASONING_MODEL -> FAST_MODEL) di bawah operasi yang sedang berjalan.
+# Hasil yang terkena fallback tidak boleh disimpan di result cache dengan key REASONING_MODEL.
+_model_fallbacks: ContextVar[Optional[List[Dict[str, str]]]] = ContextVar("model_fallbacks", default=None)
+
+
+@contextmanager
+def track_model_fallbacks():
+    """
+    Kumpulkan fallback model yang terjadi di dalam blok (termasuk task anak dan single-flight).
+    Saat blok selesai, isinya juga diteruskan ke blok luar (mis. dari analyze_cv ke request).
+    """
+    fallbacks: List[Dict[str, str]] = []
+    outer = _model_fallbacks.get()
+    token = _model_fallbacks.set(fallbacks)
+    try:
+        yield fallbacks
+    finally:
+        _model_fallbacks.reset(token)
+        if outer is not None:
+            _extend_unique(outer, fallbacks)
+
+
+def fallback_header_value(fallbacks: List[Dict[str, str]]) -> str:
+    return ", ".join(f"{fallback['from']}->{fallback['to']}" for fallback in fallbacks)
+
+
+def record_model_fallback(from_model: str, to_model: str):
+    record_deadline_event(from_model, "fallback")
+    fallbacks = _model_fallbacks.get()
+    if fallbacks is not None:
+        fallbacks.append({"from": from_model, "to": to_model, "reason": "deadline_risk"})
+
+
+def bind_model_fallbacks(fallbacks: List[Dict[str, str]]):
+    """Pasang list fallback di context komputasi single-flight (dipanggil lewat Context.run)."""
+    _model_fallbacks.set(fallbacks)
+
+
+def merge_model_fallbacks(fallbacks: List[Dict[str, str]]):
+    """Tambahkan fallback dari komputasi bersama ke operasi yang sedang berjalan."""
+    current = _model_fallbacks.get()
+    if current is not None and current is not fallbacks:
+        _extend_unique(current, fallbacks)
+
+
+def _extend_unique(target: List[Dict[str, str]], fallbacks: List[Dict[str, str]]):
+    # Penunggu single-flight di request yang sama menerima fallback yang sama lebih dari sekali
+    target.extend(fallback for fallback in fallbacks if fallback not in target)
+
+
+def deadline_from_header(value: Optional[str]) -> float:
+    """Deadline request dari header X-Request-Timeout (detik), dibatasi REQUEST_DEADLINE."""
+    try:
+        requested = float(value) if value else REQUEST_DEADLINE
+    except ValueError:
+        return REQUEST_DEADLINE
+    return min(requested, REQUEST_DEADLINE) if requested > 0 else REQUEST_DEADLINE
+
+
+def current_deadline() -> Optional[float]:
+    """Deadline absolut (time.monotonic) yang berlaku di context ini, None jika tidak ada."""
+    deadline = _request_deadline.get()
+    return deadline.at if isinstance(deadline, SharedDeadline) else deadline
+
+
+def bind_deadline(deadline: SharedDeadline):
+    """Pasang deadline bersama di context komputasi single-flight (dipanggil lewat Context.run)."""
+    _request_deadline.set(deadline)
+
+
+def remaining() -> Optional[float]:
+    """Sisa waktu request (detik, bisa negatif), None jika tidak ada deadline."""
+    deadline = current_deadline()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def call_timeout(model: str) -> float:
+    """Timeout satu attempt: batas per model, diperpendek ke sisa deadline request."""
+    timeout = _timeouts.get(model, GEMINI_CALL_TIMEOUT_REASONING)
+    left = remaining()
+    return timeout if left is None else min(timeout, left)
+
+
+def deadline_at_risk(model: str) -> bool:
+    """True jika sisa deadline lebih pendek dari latency p95 model ini (panggilan kemungkinan tidak sempat)."""
+    left = remaining()
+    if left is None:
+        return False
+    expected = latency_for(model).quantile(GEMINI_HEDGE_QUANTILE)
+    return expected is not None and left < expected
+
+
+def hedge_delay(model: str) -> Optional[float]:
+    """Jeda sebelum attempt hedge dikirim, None jika hedging mati / sampel latency belum cukup."""
+    if not GEMINI_HEDGE:
+        return None
+    expected = latency_for(model).quantile(GEMINI_HEDGE_QUANTILE)
+    if expected is None:
+        return None
+    delay = max(expected, GEMINI_HEDGE_MIN_DELAY)
+    left = remaining()
+    # Hedge yang baru dikirim saat deadline hampir habis hanya membuang kuota
+    if left is not None and delay >= left:
+        return None
+    return delay
+
+
+def within_deadline(awaitable):
+    """Batasi awaitable dengan sisa deadline request (termasuk waktu antri limiter)."""
+    left = remaining()
+    return awaitable if left is None else asyncio.wait_for(awaitable, max(left, 0))
+
+
+def deadline_snapshot() -> Dict[str, Any]:
+    return {
+        "request_deadline_s": REQUEST_DEADLINE,
+        "call_timeouts_s": dict(_timeouts),
+        "hedge": GEMINI_HEDGE,
+        "hedge_quantile": GEMINI_HEDGE_QUANTILE,
+        "latency": {model: tracker.snapshot() for model, tracker in _trackers.items()},
+        "events": {model: dict(counts) for model, counts in _events.items()},
+    }
@@ -0,0 +1,173 @@
+import os
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Dict, Any, Union
+
+from fastapi.concurrency import run_in_threadpool
+
+from src.services.extractor import extract_text_timed, warm_up as warm_up_extractor
+from src.services.metrics import record_stage
+
+# --- KONFIGURASI EXTRACTION ENGINE ---
+# Jumlah worker web (serve.py / uvicorn --workers); tiap worker punya pool ekstraksi sendiri
+WEB_CONCURRENCY = max(int(os.getenv("WEB_CONCURRENCY", "1")), 1)
+# EXTRACTION_WORKERS=0 -> kembali ke threadpool (berguna untuk `--reload` saat development).
+# Default: core dibagi rata ke semua worker web agar total proses ekstraksi tetap = jumlah core.
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", str(max((os.cpu_count() or 2) // WEB_CONCURRENCY, 1))))
+# Worker di-recycle setelah N dokumen karena pdfplumber bisa bocor memori di PDF patologis
+EXTRACTION_MAX_TASKS_PER_WORKER = int(os.getenv("EXTRACTION_MAX_TASKS_PER_WORKER", "50"))
+EXTRACTION_TIMEOUT = float(os.getenv("EXTRACTION_TIMEOUT", "30"))
+# Batas job yang sedang berjalan + mengantri; lebih dari ini langsung ditolak (backpressure)
+EXTRACTION_MAX_PENDING = int(os.getenv("EXTRACTION_MAX_PENDING", str(max(EXTRACTION_WORKERS, 1) * 8)))
+
+
+class ExtractionBusyError(Exception):
+    """Antrian extraction penuh, request harus dicoba lagi nanti."""
+
+
+class ExtractionTimeoutError(ValueError):
+    """Dokumen melebihi batas waktu ekstraksi (biasanya PDF patologis)."""
+
+
+class ExtractionPool:
+    """
+    Menjalankan ekstraksi dokumen (CPU-bound, memegang GIL) di ProcessPoolExecutor terpisah,
+    sehingga event loop tetap responsif dan satu worker uvicorn bisa memakai semua core.
+    """
+
+    def __init__(self, workers: int, max_tasks_per_worker: int, timeout: float, max_pending: int):
+        self.workers = workers
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.restarts = 0
+        self.collateral_retries = 0
+
+    @property
+    def mode(self) -> str:
+        return "process" if self.workers > 0 else "thread"
+
+    def start(self):
+        if self.workers <= 0 or self._executor is not None:
+            return
+        # max_tasks_per_child tidak boleh dipakai dengan start method "fork"
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            max_tasks_per_child=self.max_tasks_per_worker or None,
+        )
+
+    async def warm_up(self) -> int:
+        """
+        Spawn semua worker dan import library PDF di masing-masing sebelum request pertama,
+        sehingga dokumen pertama tidak menanggung cold start. Return jumlah proses yang siap.
+        """
+        if self._executor is None:
+            await run_in_threadpool(warm_up_extractor)
+            return 0
+        loop = asyncio.get_running_loop()
+        pids = await asyncio.gather(*(loop.run_in_executor(self._executor, warm_up_extractor)
+                                      for _ in range(self.workers)))
+        return len(set(pids))
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _restart(self):
+        """
+        Matikan worker yang hang lalu buat pool baru. Job lain yang sedang jalan di pool lama
+        menerima BrokenProcessPool dan dijalankan ulang di pool baru (lihat _run_in_process).
+        Shutdown dan start dipanggil berurutan tanpa await, jadi selama restart tidak ada job yang
+        dikirim ke pool mana pun; proses worker baru baru di-spawn saat job berikutnya masuk.
+        """
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            # ProcessPoolExecutor tidak punya API publik untuk membunuh worker di Python 3.11
+            for process in list(getattr(executor, "_processes", {}).values()):
+                process.terminate()
+            # Tanpa cancel_futures: job lain menerima BrokenProcessPool lalu di-retry di pool baru
+            executor.shutdown(wait=False)
+        self.restarts += 1
+        self.start()
+
+    async def extract(self, source: Union[bytes, str], content_type: str) -> str:
+        """`source` berupa bytes atau path upload yang di-spool; path hanya dikirim sebagai string ke worker."""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise ExtractionBusyError("Extraction queue penuh, coba lagi beberapa saat.")
+
+        self.pending += 1
+        try:
+            if self._executor is None:
+                text, timings = await run_in_threadpool(extract_text_timed, source, content_type)
+            else:
+                text, timings = await self._run_in_process(source, content_type)
+            # Tahap di dalam worker (pdf_open, pdf_words, ...) dicatat dari proses utama
+            for stage, seconds in timings.items():
+                record_stage(f"extract_{stage}", seconds)
+            self.completed += 1
+            return text
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+
+    async def _run_in_process(self, source: Union[bytes, str], content_type: str):
+        """
+        Job yang ikut mati karena pool di-restart oleh job lain (timeout) diulang sampai selesai,
+        tanpa batas: dokumennya sendiri tidak bermasalah. Pool yang rusak saat job ini sendiri
+        berjalan (worker crash) hanya diulang sekali, karena dokumen ini bisa jadi penyebabnya.
+        """
+        loop = asyncio.get_running_loop()
+        crashes = 0
+        while True:
+            executor = self._executor
+            try:
+                future = loop.run_in_executor(executor, extract_text_timed, source, content_type)
+                return await asyncio.wait_for(future, timeout=self.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                if self._executor is executor:
+                    self._restart()
+                raise ExtractionTimeoutError(f"Ekstraksi melebihi batas waktu {self.timeout:.0f} detik.")
+            except BrokenProcessPool:
+                if self._executor is not executor:
+                    # Pool sudah diganti oleh job lain yang timeout -> ulangi di pool baru
+                    self.collateral_retries += 1
+                    continue
+                self._restart()
+                crashes += 1
+                if crashes > 1:
+                    raise
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "max_tasks_per_worker": self.max_tasks_per_worker,
+            "timeout_seconds": self.timeout,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "restarts": self.restarts,
+            "collateral_retries": self.collateral_retries,
+        }
+
+
+extraction_pool = ExtractionPool(
+    EXTRACTION_WORKERS, EXTRACTION_MAX_TASKS_PER_WORKER, EXTRACTION_TIMEOUT, EXTRACTION_MAX_PENDING
+)
@@ -1,80 +1,515 @@
 import io
-from fastapi import UploadFile, HTTPException
-import pdfplumber
-import docx
+import os
+import re
+import mmap
+import time
+import zipfile
+import xml.etree.ElementTree as ElementTree
+from xml.parsers import expat
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Optional, Dict, List, Tuple, Union, Iterator
 
+# pdfplumber / pdfminer (dan fastapi) di-import di dalam fungsi: modul ini juga di-import oleh proses web
+# (DocumentRejectedError) dan oleh tiap worker ekstraksi yang di-spawn, dan import PDF baru dibutuhkan
+# saat dokumen PDF pertama diproses (atau saat warm_up()).
 
-def extract_text_from_bytes(content: bytes, content_type: str) -> str:
-    file_stream = io.BytesIO(content)
+# Toleransi (pt) perbedaan posisi vertikal sebelum dianggap baris baru
+LINE_TOLERANCE = 5
+# Batas dokumen sebelum parsing penuh (melindungi worker dari page bomb / zip bomb)
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "50"))
+DOCX_MAX_UNCOMPRESSED_BYTES = int(os.getenv("DOCX_MAX_UNCOMPRESSED_BYTES", str(64 * 1024 * 1024)))
+# Budget ekstraksi PDF: halaman setelahnya tidak di-layout sama sekali, teks dipotong di batas karakter
+PDF_PAGE_BUDGET = int(os.getenv("PDF_PAGE_BUDGET", "10"))
+PDF_CHAR_BUDGET = int(os.getenv("PDF_CHAR_BUDGET", "40000"))
+
+PDF_TYPE = "application/pdf"
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+# Namespace OOXML (expat dengan namespace_separator=" " -> nama "<uri> <local>")
+_W = "http://schemas.openxmlformats.org/wordprocessingml/2006/main "
+_R_ID = "http://schemas.openxmlformats.org/officeDocument/2006/relationships id"
+_MC_FALLBACK = "http://schemas.openxmlformats.org/markup-compatibility/2006 Fallback"
+_HYPERLINK_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink"
+_RELS_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+# Field code hyperlink: HYPERLINK "url" (anchor internal `HYPERLINK \l "x"` tidak cocok)
+_FIELD_HYPERLINK_RE = re.compile(r'^\s*HYPERLINK\s+(?:"([^"]+)"|([^\s"\\]+))')
+DOCX_READ_CHUNK = 64 * 1024
+
+
+class DocumentRejectedError(ValueError):
+    """Dokumen melebihi batas (jumlah halaman / ukuran setelah dekompresi), ditolak sebelum parsing penuh."""
+
+
+def warm_up() -> int:
+    """Import library PDF lebih awal (dijalankan di tiap worker ekstraksi saat startup); return pid worker."""
+    import pdfplumber  # noqa: F401
+    import pdfminer.layout  # noqa: F401
+    return os.getpid()
+
+
+def _attach_links(words: list, links: list):
+    """
+    Inject " [URL]" ke kata terakhir (urutan asli extract_words) yang bersinggungan dengan bbox link.
+    Kata di-index berdasarkan `top` (sorted interval), jadi tiap link hanya memeriksa kata
+    yang berada di pita vertikalnya: O((L + W) log W) alih-alih O(L x W).
+    """
+    if not words or not links:
+        return
+
+    order = sorted(range(len(words)), key=lambda i: words[i]['top'])
+    tops = [words[i]['top'] for i in order]
+    # Kata yang overlap wajib punya top > link.top - tinggi kata maksimum; +1pt untuk rounding float
+    max_height = max(w['bottom'] - w['top'] for w in words) + 1
+
+    for link in links:
+        link_uri = link['uri']
+        lo = bisect_left(tops, link['top'] - max_height)
+        hi = bisect_left(tops, link['bottom'])
+
+        last_index = -1
+        for k in range(lo, hi):
+            index = order[k]
+            word = words[index]
+            # Cek overlap sederhana
+            if (index > last_index and word['x0'] < link['x1'] and word['x1'] > link['x0'] and
+                    word['bottom'] > link['top']):
+                last_index = index
+
+        if last_index >= 0:
+            # Append URL ke kata terakhir yang match link ini
+            last_word = words[last_index]
+            if f"[{link_uri}]" not in last_word['text']: # Prevent duplicates
+                last_word['text'] += f" [{link_uri}]"
+
+
+def _words_to_text(words: list) -> str:
+    """Susun ulang kata menjadi baris (layout preservation sederhana) dengan list-join."""
+    # Sort by top (y) then left (x)
+    words.sort(key=lambda w: (w['top'], w['x0']))
+
+    lines = []
+    line_words = []
+    current_top = words[0]['top']
+    for word in words:
+        # Jika beda baris cukup jauh, new line
+        if abs(word['top'] - current_top) > LINE_TOLERANCE:
+            lines.append(" ".join(line_words).strip())
+            line_words = []
+            current_top = word['top']
+        line_words.append(word['text'])
+
+    lines.append(" ".join(line_words).strip())
+    return "\n".join(lines) + "\n"
+
+
+def _strip_page_margins(page_texts: List[str]) -> List[str]:
+    """
+    Buang header/footer PDF: baris pertama (atau terakhir) halaman yang sama dengan baris pertama
+    (atau terakhir) halaman sebelumnya. Kemunculan pertama tetap ada; baris di tengah halaman
+    tidak pernah dibuang, jadi bullet yang sama di dua pengalaman kerja tetap utuh.
+    """
+    if len(page_texts) < 2:
+        return page_texts
+    previous = (None, None)
+    stripped = []
+    for text in page_texts:
+        lines = text.rstrip("\n").split("\n")
+        # Dibandingkan dengan baris tepi asli halaman sebelumnya (sebelum dibuang), bukan semua halaman
+        edges = (" ".join(lines[0].split()).lower(), " ".join(lines[-1].split()).lower())
+        if edges[0] and edges[0] == previous[0]:
+            del lines[0]
+        if lines and edges[1] and edges[1] == previous[1]:
+            del lines[-1]
+        previous = edges
+        stripped.append("\n".join(lines) + "\n" if lines else "")
+    return stripped
+
+
+def _add_time(timings: Optional[Dict[str, float]], stage: str, start: float) -> float:
+    """Akumulasi durasi sejak `start` ke timings[stage]; return waktu sekarang untuk tahap berikutnya."""
+    now = time.perf_counter()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + (now - start)
+    return now
+
+
+@contextmanager
+def _open_source(source: Union[bytes, str], use_mmap: bool):
+    """
+    Bytes -> BytesIO. Path (upload yang di-spool ke disk) -> mmap read-only agar page cache OS
+    dipakai langsung tanpa menyalin isi file ke heap; file kosong / mmap gagal -> file handle biasa.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(source)
+        return
+    with open(source, "rb") as f:
+        mapped = None
+        if use_mmap:
+            try:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):
+                mapped = None
+        try:
+            yield mapped if mapped is not None else f
+        finally:
+            if mapped is not None:
+                try:
+                    mapped.close()
+                except BufferError:
+                    # Masih ada view yang dipegang parser; dilepas oleh GC
+                    pass
+
+
+def _check_pdf_header(stream) -> None:
+    if b"%PDF-" not in stream.read(1024):
+        raise ValueError("File bukan PDF yang valid.")
+    stream.seek(0)
+
+
+def _check_pdf_pages(pdf) -> None:
+    from pdfminer.pdftypes import resolve1
+
+    # Baca /Count dari page tree tanpa membangun objek halaman
+    pages = resolve1(pdf.doc.catalog.get("Pages"))
+    count = resolve1(pages.get("Count")) if isinstance(pages, dict) else None
+    if isinstance(count, int) and count > PDF_MAX_PAGES:
+        raise DocumentRejectedError(f"PDF memiliki {count} halaman, maksimal {PDF_MAX_PAGES} halaman.")
+
+
+def _page_has_text(page_obj) -> bool:
+    """
+    Cek murah dari resource dictionary: tanpa font (langsung atau lewat Form XObject) halaman
+    tidak bisa menggambar teks, jadi halaman hasil scan bisa dilewati tanpa layout analysis.
+    """
+    from pdfminer.pdftypes import resolve1, PDFStream
+    from pdfminer.psparser import LIT
+
+    resources = resolve1(page_obj.resources) or {}
+    if resolve1(resources.get("Font")):
+        return True
+    # Form XObject punya resource sendiri; anggap berisi teks daripada salah melewatkan
+    for xobj in (resolve1(resources.get("XObject")) or {}).values():
+        xobj = resolve1(xobj)
+        if isinstance(xobj, PDFStream) and xobj.get("Subtype") is LIT("Form"):
+            return True
+    return False
+
+
+def iter_pdf_pages(pdf, timings: Optional[Dict[str, float]] = None,
+                   max_pages: int = PDF_PAGE_BUDGET) -> Iterator[str]:
+    """
+    Teks per halaman (kata + hyperlink, layout sederhana), satu halaman per iterasi.
+    Halaman dibuat langsung dari page tree (bukan `pdf.pages` yang menyimpan semua Page)
+    dan cache layout-nya dibuang setelah dipakai, jadi memori puncak setara satu halaman.
+    Berhenti setelah `max_pages` halaman; caller boleh berhenti lebih awal (budget karakter).
+    """
+    from pdfplumber.page import Page
+    from pdfminer.pdfpage import PDFPage
+
+    mark = time.perf_counter()
+    doctop = 0
+    for index, page_obj in enumerate(PDFPage.create_pages(pdf.doc)):
+        if index >= max_pages:
+            break
+        if not _page_has_text(page_obj):
+            # Halaman gambar saja: tidak ada kata untuk ditempeli link
+            mark = _add_time(timings, "pdf_skip", mark)
+            continue
+
+        page = Page(pdf, page_obj, page_number=index + 1, initial_doctop=doctop)
+        doctop += page.height
+        try:
+            # Logic Custom: Extract text + Hyperlinks
+            # 1. Ambil semua kata dengan posisi
+            words = page.extract_words()
+            mark = _add_time(timings, "pdf_words", mark)
+            # 2. Ambil semua hyperlink
+            links = page.hyperlinks
+            mark = _add_time(timings, "pdf_links", mark)
+
+            # 3. Mapping link ke kata (lewat index spasial, bukan scan semua kata per link)
+            _attach_links(words, links)
+
+            # 4. Reconstruct text dari words yang sudah dimodifikasi
+            text = _words_to_text(words) if words else ""
+            mark = _add_time(timings, "pdf_layout", mark)
+        finally:
+            page.close()
+        if text:
+            yield text
+
+
+def _check_docx(archive: zipfile.ZipFile) -> None:
+    infos = archive.infolist()
+    if "word/document.xml" not in {info.filename for info in infos}:
+        raise ValueError("File bukan DOCX yang valid.")
+    # Ukuran dari central directory, dicek sebelum ada yang didekompresi
+    if sum(info.file_size for info in infos) > DOCX_MAX_UNCOMPRESSED_BYTES:
+        raise DocumentRejectedError("Isi DOCX terlalu besar setelah didekompresi.")
+
+
+def _docx_hyperlinks(archive: zipfile.ZipFile) -> Dict[str, str]:
+    """rId -> URL dari word/_rels/document.xml.rels (file kecil, cukup di-parse sekali utuh)."""
+    try:
+        data = archive.read("word/_rels/document.xml.rels")
+    except KeyError:
+        return {}
+    links = {}
+    for rel in ElementTree.fromstring(data).iter(f"{_RELS_NS}Relationship"):
+        if rel.get("Type") == _HYPERLINK_REL and rel.get("Target"):
+            links[rel.get("Id")] = rel.get("Target")
+    return links
+
+
+def _field_url(instr: str) -> Optional[str]:
+    match = _FIELD_HYPERLINK_RE.match(instr)
+    return (match.group(1) or match.group(2)) if match else None
+
+
+def _append_link(buffer: List[str], start: int, url: Optional[str]):
+    """Konvensi yang sama dengan PDF: " [URL]" setelah teks link, kecuali URL sudah tertulis di teksnya."""
+    if url and url not in "".join(buffer[start:]):
+        buffer.append(f" [{url}]")
+
+
+class _DocxTextHandler:
+    """
+    Handler expat untuk word/document.xml: teks dikumpulkan per paragraf tanpa membangun tree.
+    Paragraf body & text box -> satu baris; tabel data -> satu baris per row dengan sel dipisah " | ",
+    tabel layout (sel berisi banyak paragraf) -> paragraf tiap kolom berurutan;
+    hyperlink (relationship maupun field code HYPERLINK) -> "Teks [URL]".
+    """
+
+    def __init__(self, hyperlinks: Dict[str, str]):
+        self.hyperlinks = hyperlinks
+        self.lines: List[str] = []
+        # Stack container: ("p", potongan teks) | ("tc", teks paragraf) | ("tr", list per sel) | ("txbx", None)
+        self._containers: List[Tuple[str, Optional[list]]] = []
+        # Hyperlink terbuka: (buffer paragraf, posisi awal teks link, URL)
+        self._links: List[Tuple[Optional[list], int, Optional[str]]] = []
+        # Field code terbuka: {"instr": [...], "url", "buffer", "start"}
+        self._fields: List[Dict] = []
+        self._run_depth = 0
+        self._skip_depth = 0
+        self._in_text = False
+        self._in_instr = False
+
+    def _paragraph(self) -> Optional[list]:
+        if self._containers and self._containers[-1][0] == "p":
+            return self._containers[-1][1]
+        return None
+
+    def _emit(self, text: str):
+        # Paragraf / row di dalam sel tabel menjadi bagian teks sel itu
+        if self._containers and self._containers[-1][0] == "tc":
+            if text:
+                self._containers[-1][1].append(text)
+        else:
+            self.lines.append(text)
+
+    def start(self, name: str, attrs: Dict[str, str]):
+        if self._skip_depth:
+            self._skip_depth += 1
+            return
+        if name == _MC_FALLBACK:
+            # Salinan VML dari text box yang sama (mc:Choice sudah dibaca)
+            self._skip_depth = 1
+            return
+        if not name.startswith(_W):
+            return
+        tag = name[len(_W):]
+        if tag == "t":
+            self._in_text = True
+        elif tag == "r":
+            self._run_depth += 1
+        elif tag == "p":
+            self._containers.append(("p", []))
+        elif tag in ("tab", "br", "cr") and self._run_depth:
+            buffer = self._paragraph()
+            if buffer is not None:
+                if tag == "tab":
+                    buffer.append("\t")
+                elif attrs.get(_W + "type", "textWrapping") == "textWrapping":
+                    buffer.append("\n")
+        elif tag == "hyperlink":
+            buffer = self._paragraph()
+            url = self.hyperlinks.get(attrs.get(_R_ID))
+            self._links.append((buffer, len(buffer) if buffer is not None else 0, url))
+        elif tag == "fldSimple":
+            buffer = self._paragraph()
+            self._links.append((buffer, len(buffer) if buffer is not None else 0,
+                                _field_url(attrs.get(_W + "instr", ""))))
+        elif tag == "fldChar":
+            kind = attrs.get(_W + "fldCharType")
+            if kind == "begin":
+                self._fields.append({"instr": [], "url": None, "buffer": None, "start": 0})
+            elif kind == "separate" and self._fields:
+                field = self._fields[-1]
+                field["url"] = _field_url("".join(field["instr"]))
+                field["buffer"] = self._paragraph()
+                field["start"] = len(field["buffer"]) if field["buffer"] is not None else 0
+            elif kind == "end" and self._fields:
+                field = self._fields.pop()
+                buffer = field["buffer"]
+                # Hasil field yang melewati batas paragraf: URL ditempel di paragraf saat ini
+                if buffer is None or buffer is not self._paragraph():
+                    buffer, field["start"] = self._paragraph(), 0
+                if buffer is not None:
+                    _append_link(buffer, field["start"], field["url"])
+        elif tag == "instrText":
+            self._in_instr = True
+        elif tag == "tc":
+            self._containers.append(("tc", []))
+        elif tag == "tr":
+            self._containers.append(("tr", []))
+        elif tag == "txbxContent":
+            self._containers.append(("txbx", None))
+
+    def end(self, name: str):
+        if self._skip_depth:
+            self._skip_depth -= 1
+            return
+        if not name.startswith(_W):
+            return
+        tag = name[len(_W):]
+        if tag == "t":
+            self._in_text = False
+        elif tag == "r":
+            self._run_depth -= 1
+        elif tag == "p":
+            _, parts = self._containers.pop()
+            self._emit("".join(parts))
+        elif tag in ("hyperlink", "fldSimple") and self._links:
+            buffer, start, url = self._links.pop()
+            if buffer is not None:
+                _append_link(buffer, start, url)
+        elif tag == "instrText":
+            self._in_instr = False
+        elif tag == "tc":
+            _, texts = self._containers.pop()
+            if self._containers and self._containers[-1][0] == "tr":
+                self._containers[-1][1].append(texts)
+        elif tag == "tr":
+            _, cells = self._containers.pop()
+            if all(len(texts) <= 1 for texts in cells):
+                # Tabel data: satu baris per row
+                row = " | ".join(texts[0] for texts in cells if texts)
+                if row:
+                    self._emit(row)
+            else:
+                # Tabel layout (kolom berisi banyak paragraf): isi tiap kolom berurutan
+                for texts in cells:
+                    for text in texts:
+                        self._emit(text)
+        elif tag == "txbxContent":
+            self._containers.pop()
+
+    def text(self, data: str):
+        if self._skip_depth:
+            return
+        if self._in_text:
+            buffer = self._paragraph()
+            if buffer is not None:
+                buffer.append(data)
+        elif self._in_instr and self._fields:
+            self._fields[-1]["instr"].append(data)
+
+
+def _reject_doctype(*args):
+    # document.xml tidak pernah punya DTD; tolak agar entity expansion tidak mungkin terjadi
+    raise ValueError("DOCX berisi DOCTYPE.")
+
+
+def iter_docx_lines(archive: zipfile.ZipFile) -> Iterator[str]:
+    """
+    Baris teks DOCX (paragraf, row tabel, text box, hyperlink "Teks [URL]") dari word/document.xml
+    yang di-stream per chunk lewat expat, tanpa DOM python-docx: memori puncak sebanding dengan
+    satu chunk + baris yang sudah dihasilkan, bukan dengan seluruh tree XML.
+    """
+    handler = _DocxTextHandler(_docx_hyperlinks(archive))
+    parser = expat.ParserCreate(namespace_separator=" ")
+    parser.buffer_text = True
+    parser.StartElementHandler = handler.start
+    parser.EndElementHandler = handler.end
+    parser.CharacterDataHandler = handler.text
+    parser.StartDoctypeDeclHandler = _reject_doctype
+    with archive.open("word/document.xml") as document:
+        while True:
+            chunk = document.read(DOCX_READ_CHUNK)
+            parser.Parse(chunk, not chunk)
+            if handler.lines:
+                yield from handler.lines
+                handler.lines.clear()
+            if not chunk:
+                break
+
+
+def extract_text(source: Union[bytes, str], content_type: str, timings: Optional[Dict[str, float]] = None) -> str:
+    """
+    `source` berupa bytes atau path file (upload besar yang di-spool ke disk).
+    `timings` (opsional) diisi durasi per tahap, karena di process pool metrik tidak bisa dicatat langsung.
+    """
     text = ""
 
     try:
-        if content_type == "application/pdf":
+        if content_type == PDF_TYPE:
+            import pdfplumber
+
             # [FIX] Menggunakan pdfplumber untuk hasil lebih akurat & layout terjaga
-            with pdfplumber.open(file_stream) as pdf:
-                for page in pdf.pages:
-                    # Logic Custom: Extract text + Hyperlinks
-                    # 1. Ambil semua kata dengan posisi
-                    words = page.extract_words()
-                    # 2. Ambil semua hyperlink
-                    links = page.hyperlinks
-                    
-                    # 3. Mapping link ke kata (intersection check)
-                    for link in links:
-                        link_bbox = (link['x0'], link['top'], link['x1'], link['bottom'])
-                        link_uri = link['uri']
-                        
-                        # Cari kata yang bersinggungan dengan bbox link
-                        # Kita inject URL ke kata terakhir yang match agar rapi
-                        matched_words = []
-                        for word in words:
-                            # Cek overlap sederhana
-                            if (word['x0'] < link['x1'] and word['x1'] > link['x0'] and
-                                word['top'] < link['bottom'] and word['bottom'] > link['top']):
-                                matched_words.append(word)
-                        
-                        if matched_words:
-                            # Append URL ke kata terakhir yang match link ini
-                            last_word = matched_words[-1]
-                            if f"[{link_uri}]" not in last_word['text']: # Prevent duplicates
-                                last_word['text'] += f" [{link_uri}]"
-                    
-                    # 4. Reconstruct text dari words yang sudah dimodifikasi
-                    # Menggunakan logic sederhana layout preservation
-                    if words:
-                        # Sort by top (y) then left (x)
-                        words.sort(key=lambda w: (w['top'], w['x0']))
-                        
-                        current_top = words[0]['top']
-                        line_text = ""
-                        page_text = ""
-                        
-                        for word in words:
-                            # Jika beda baris cukup jauh, new line
-                            if abs(word['top'] - current_top) > 5: # tolerance 5pt
-                                page_text += line_text.strip() + "\n"
-                                line_text = ""
-                                current_top = word['top']
-                            line_text += word['text'] + " "
-                        
-                        page_text += line_text.strip() + "\n"
-                        text += page_text
-
-        elif content_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-            doc = docx.Document(file_stream)
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
+            mark = time.perf_counter()
+            with _open_source(source, use_mmap=True) as file_stream:
+                _check_pdf_header(file_stream)
+                with pdfplumber.open(file_stream) as pdf:
+                    _check_pdf_pages(pdf)
+                    _add_time(timings, "pdf_open", mark)
+                    page_texts = []
+                    total_chars = 0
+                    for page_text in iter_pdf_pages(pdf, timings):
+                        page_texts.append(page_text)
+                        total_chars += len(page_text)
+                        if total_chars >= PDF_CHAR_BUDGET:
+                            break
+                    text = "".join(_strip_page_margins(page_texts))[:PDF_CHAR_BUDGET]
+
+        elif content_type == DOCX_TYPE:
+            mark = time.perf_counter()
+            # zipfile butuh file object yang seekable(), mmap tidak punya -> file handle biasa
+            with _open_source(source, use_mmap=False) as file_stream:
+                try:
+                    archive = zipfile.ZipFile(file_stream)
+                except zipfile.BadZipFile:
+                    raise ValueError("File bukan DOCX yang valid.")
+                with archive:
+                    _check_docx(archive)
+                    text = "\n".join(iter_docx_lines(archive))
+            _add_time(timings, "docx_parse", mark)
         
         else:
             raise ValueError("Format file tidak didukung. Gunakan PDF atau DOCX.")
 
+    except DocumentRejectedError:
+        raise
     except Exception as e:
         raise ValueError(f"Gagal mengekstrak teks: {str(e)}")
 
     return text.strip()
 
 
-async def extract_text_from_file(file: UploadFile) -> str:
+def extract_text_from_bytes(content: bytes, content_type: str, timings: Optional[Dict[str, float]] = None) -> str:
+    return extract_text(content, content_type, timings)
+
+
+def extract_text_timed(source: Union[bytes, str], content_type: str) -> Tuple[str, Dict[str, float]]:
+    """Entry point untuk extraction pool: teks + durasi per tahap (detik)."""
+    timings: Dict[str, float] = {}
+    text = extract_text(source, content_type, timings)
+    return text, timings
+
+
+async def extract_text_from_file(file) -> str:
+    from fastapi import HTTPException
+
     content = await file.read()
     try:
         
@@ -0,0 +1,208 @@
+import os
+import time
+import uuid
+import random
+import asyncio
+from typing import Optional, Dict, Any, Callable, Awaitable
+
+import httpx
+from fastapi import HTTPException
+
+from src.services.usage import track_usage
+from src.services.deadlines import track_model_fallbacks
+
+# --- KONFIGURASI JOB QUEUE ---
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "1000"))
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", "3600"))
+BACKEND_WEBHOOK_URL = os.getenv("BACKEND_WEBHOOK_URL")
+# webhook_url dari client hanya dipakai jika persis ada di daftar ini (dipisah koma); default hanya
+# BACKEND_WEBHOOK_URL, agar server tidak bisa disuruh POST ke alamat internal sembarang (SSRF)
+WEBHOOK_ALLOWED_URLS = {
+    url.strip() for url in os.getenv("WEBHOOK_ALLOWED_URLS", BACKEND_WEBHOOK_URL or "").split(",") if url.strip()
+}
+WEBHOOK_RETRIES = int(os.getenv("WEBHOOK_RETRIES", "5"))
+WEBHOOK_TIMEOUT = float(os.getenv("WEBHOOK_TIMEOUT", "10"))
+
+
+class JobQueueFullError(Exception):
+    """Antrian job penuh, client harus mencoba lagi nanti."""
+
+
+class WebhookNotAllowedError(ValueError):
+    """webhook_url dari client tidak ada di WEBHOOK_ALLOWED_URLS."""
+
+
+def resolve_webhook_url(webhook_url: Optional[str]) -> Optional[str]:
+    """webhook_url client (harus ada di allowlist) atau BACKEND_WEBHOOK_URL jika kosong."""
+    if not webhook_url:
+        return BACKEND_WEBHOOK_URL
+    if webhook_url.strip() not in WEBHOOK_ALLOWED_URLS:
+        raise WebhookNotAllowedError("webhook_url tidak diizinkan.")
+    return webhook_url.strip()
+
+
+class Job:
+    def __init__(self, kind: str, runner: Callable[[], Awaitable[Any]],
+                 cv_id: Optional[str], webhook_url: Optional[str]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.runner = runner
+        self.cv_id = cv_id
+        self.webhook_url = webhook_url
+        self.status = "queued"
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.webhook_status: Optional[str] = None
+        self.usage: Optional[Dict[str, Any]] = None
+        self.model_fallback: Optional[list] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "type": self.kind,
+            "status": self.status,
+            "cv_id": self.cv_id,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+            "webhook_status": self.webhook_status,
+            "usage": self.usage,
+            "model_fallback": self.model_fallback,
+        }
+
+
+class JobManager:
+    """
+    Mode submit/poll/webhook: request langsung mendapat job id, pekerjaan AI dijalankan
+    oleh worker pool asyncio yang jumlahnya dibatasi, hasil disimpan dengan TTL,
+    dan selesai-nya job dikirim ke webhook backend dengan retry.
+    """
+
+    def __init__(self, workers: int, queue_size: int, result_ttl: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.result_ttl = result_ttl
+        self._queue: Optional[asyncio.Queue] = None
+        self._jobs: Dict[str, Job] = {}
+        self._tasks = []
+        self._webhook_tasks = set()
+        self._http: Optional[httpx.AsyncClient] = None
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.webhook_failures = 0
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._http = httpx.AsyncClient(timeout=WEBHOOK_TIMEOUT)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._janitor()))
+
+    async def stop(self):
+        for task in self._tasks + list(self._webhook_tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._webhook_tasks, return_exceptions=True)
+        self._tasks = []
+        if self._http is not None:
+            await self._http.aclose()
+
+    def submit(self, kind: str, runner: Callable[[], Awaitable[Any]],
+               cv_id: Optional[str] = None, webhook_url: Optional[str] = None) -> Job:
+        job = Job(kind, runner, cv_id, resolve_webhook_url(webhook_url))
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise JobQueueFullError("Antrian job penuh, coba lagi beberapa saat.")
+        self._jobs[job.id] = job
+        self.submitted += 1
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            job.status = "processing"
+            job.started_at = time.time()
+            try:
+                # Token Gemini dan fallback model (karena deadline) job ini, ikut dikembalikan di GET /api/jobs/{id}
+                with track_usage() as usage, track_model_fallbacks() as fallbacks:
+                    job.result = await job.runner()
+                job.status = "completed"
+                self.completed += 1
+            except Exception as e:
+                job.error = e.detail if isinstance(e, HTTPException) else str(e)
+                job.status = "failed"
+                self.failed += 1
+                print(f"Job {job.id} ({job.kind}) failed: {job.error}")
+            finally:
+                job.runner = None  # lepas referensi ke file upload
+                job.usage = usage.as_dict()
+                job.model_fallback = list(fallbacks) or None
+                job.finished_at = time.time()
+                self._queue.task_done()
+
+            if job.webhook_url:
+                task = asyncio.create_task(self._notify(job))
+                self._webhook_tasks.add(task)
+                task.add_done_callback(self._webhook_tasks.discard)
+
+    async def _notify(self, job: Job):
+        # Payload persis WebhookResultDto di backend (cvId, result, status): ValidationPipe backend
+        # memakai forbidNonWhitelisted, jadi field tambahan membuat webhook ditolak 400
+        payload = {
+            "cvId": job.cv_id or job.id,
+            "status": "COMPLETED" if job.status == "completed" else "FAILED",
+            "result": job.result if job.status == "completed" else {"detail": job.error},
+        }
+        for attempt in range(WEBHOOK_RETRIES):
+            try:
+                response = await self._http.post(job.webhook_url, json=payload)
+                if response.is_success:
+                    job.webhook_status = f"delivered ({response.status_code})"
+                    return
+                job.webhook_status = f"rejected ({response.status_code})"
+                print(f"Webhook {job.id} Attempt {attempt+1}/{WEBHOOK_RETRIES} status {response.status_code}")
+            except httpx.HTTPError as e:
+                print(f"Webhook {job.id} Attempt {attempt+1}/{WEBHOOK_RETRIES} failed: {e}")
+            if attempt < WEBHOOK_RETRIES - 1:
+                await asyncio.sleep(min(30, 2 ** attempt) + random.random())
+        # Status terakhir (mis. "failed: rejected (404)") tetap terlihat di GET /api/jobs/{id}
+        job.webhook_status = f"failed: {job.webhook_status}" if job.webhook_status else "failed"
+        self.webhook_failures += 1
+
+    async def _janitor(self):
+        """Hapus hasil job yang sudah melewati TTL."""
+        while True:
+            await asyncio.sleep(min(60, self.result_ttl))
+            cutoff = time.time() - self.result_ttl
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished_at is not None and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "processing": sum(1 for job in self._jobs.values() if job.status == "processing"),
+            "stored": len(self._jobs),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "webhook_failures": self.webhook_failures,
+        }
+
+
+job_manager = JobManager(JOB_WORKERS, JOB_QUEUE_SIZE, JOB_RESULT_TTL)
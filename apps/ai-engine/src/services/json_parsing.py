@@ -0,0 +1,269 @@
+import re
+import json
+import typing
+from typing import Any, Dict, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson opsional, fallback ke json stdlib
+    orjson = None
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+def loads(data) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(value: Any) -> bytes:
+    """UTF-8 bytes tanpa escape non-ASCII (CV berbahasa Indonesia / nama dengan aksen)."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_str(value: Any) -> str:
+    return dumps(value).decode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """Seperti ORJSONResponse FastAPI, tapi tetap jalan (json stdlib) jika orjson tidak terpasang."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# String JSON utuh (dengan escape) atau kurung; string dilompati oleh regex engine, bukan loop Python
+_STRUCTURE_RE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\]]')
+
+
+def find_json_object(text: str, start: int = 0) -> Optional[str]:
+    """
+    Objek dari `{` pertama sampai kurung penutupnya (string & escape dihormati).
+    Berbeda dengan regex greedy `\\{.*\\}`, teks setelah objek (penutup fence,
+    komentar model yang berisi `}`) tidak ikut terambil. None jika objek tidak pernah ditutup.
+    """
+    start = text.find("{", start)
+    if start < 0:
+        return None
+    depth = 0
+    for match in _STRUCTURE_RE.finditer(text, start):
+        token = match.group()
+        if token == "{" or token == "[":
+            depth += 1
+        elif token == "}" or token == "]":
+            depth -= 1
+            if depth == 0:
+                return text[start:match.end()]
+    return None
+
+
+def repair_truncated_json(text: str) -> Optional[str]:
+    """
+    Tutup JSON yang terpotong (output kena max_output_tokens / stream putus): string terbuka,
+    key / koma yang menggantung dibuang, lalu semua kurung yang masih terbuka ditutup.
+    Nilai yang sudah lengkap dipertahankan; None jika tidak ada objek sama sekali.
+    """
+    start = text.find("{")
+    if start < 0:
+        return None
+    # [kurung pembuka, sedang di posisi value (setelah ':')?]
+    stack = []
+    in_string = False
+    escape = False
+    # Posisi setelah elemen lengkap terakhir, beserta kurung yang masih terbuka saat itu
+    safe_end = None
+    safe_openers = None
+
+    def in_value() -> bool:
+        return stack[-1][0] == "[" or stack[-1][1]
+
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+                if in_value():
+                    safe_end, safe_openers = i + 1, [opener for opener, _ in stack]
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch == "{" or ch == "[":
+            stack.append([ch, False])
+            safe_end, safe_openers = i + 1, [opener for opener, _ in stack]
+        elif ch == "}" or ch == "]":
+            stack.pop()
+            if not stack:
+                return text[start:i + 1]
+            safe_end, safe_openers = i + 1, [opener for opener, _ in stack]
+        elif ch == ":":
+            stack[-1][1] = True
+        elif ch == ",":
+            stack[-1][1] = False
+            safe_end, safe_openers = i, [opener for opener, _ in stack]
+        elif ch not in " \t\r\n" and in_value() and _is_literal_end(text, i):
+            # Angka / true / false / null yang sudah diikuti pemisah
+            safe_end, safe_openers = i + 1, [opener for opener, _ in stack]
+
+    head = text[start:safe_end].rstrip()
+    closing = "".join("}" if opener == "{" else "]" for opener in reversed(safe_openers))
+    return head + closing
+
+
+def _is_literal_end(text: str, i: int) -> bool:
+    """True jika text[i] adalah karakter terakhir literal (angka/true/false/null) yang diikuti pemisah."""
+    if i + 1 >= len(text) or text[i + 1] not in ",}] \t\r\n":
+        return False
+    j = i
+    while j > 0 and text[j - 1] not in ",:[{ \t\r\n":
+        j -= 1
+    token = text[j:i + 1]
+    if token in ("true", "false", "null"):
+        return True
+    try:
+        float(token)
+        return True
+    except ValueError:
+        return False
+
+
+def _parse(text: str, allow_partial: bool) -> Tuple[Any, bool]:
+    """Return (data, dipulihkan dari JSON terpotong?)."""
+    start = text.find("{")
+    end = text.rfind("}")
+    if start >= 0 and end > start:
+        # Jalur umum (JSON murni / dalam code fence): satu kali parse tanpa scan
+        try:
+            return loads(text[start:end + 1]), False
+        except ValueError:
+            pass
+        block = find_json_object(text, start)
+        if block is not None:
+            return loads(block), False
+    if allow_partial:
+        repaired = repair_truncated_json(text)
+        if repaired is not None:
+            return loads(repaired), True
+    # Tidak ada objek yang lengkap: biarkan parser memberi pesan error yang jelas
+    return loads(text.strip()), False
+
+
+def parse_json(text: str, allow_partial: bool = False) -> Any:
+    """Objek JSON dari output model (boleh dibungkus code fence / teks); opsional pulihkan JSON terpotong."""
+    return _parse(text, allow_partial)[0]
+
+
+def _empty_value(annotation) -> Any:
+    origin = typing.get_origin(annotation)
+    if origin is typing.Union:
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        return None if len(args) < len(typing.get_args(annotation)) else _empty_value(args[0])
+    if origin is list or annotation is list:
+        return []
+    if annotation is str:
+        return ""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return fill_missing(annotation, {})
+    # Angka / bool tidak diisi: skor 0 karangan lebih buruk daripada validasi yang gagal
+    raise KeyError(annotation)
+
+
+def fill_missing(model_cls: Type[BaseModel], data: Dict[str, Any]) -> Dict[str, Any]:
+    """Lengkapi field teks / list yang hilang dari JSON hasil recovery (rekursif ke model nested)."""
+    for name, field in model_cls.model_fields.items():
+        annotation = field.annotation
+        value = data.get(name)
+        if name not in data:
+            if not field.is_required():
+                continue
+            try:
+                data[name] = _empty_value(annotation)
+            except KeyError:
+                continue
+            continue
+        item_type = typing.get_args(annotation)[0] if typing.get_origin(annotation) is list else None
+        if isinstance(value, dict) and isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            fill_missing(annotation, value)
+        elif isinstance(value, list) and isinstance(item_type, type) and issubclass(item_type, BaseModel):
+            for item in value:
+                if isinstance(item, dict):
+                    fill_missing(item_type, item)
+    return data
+
+
+def parse_model(text: str, model_cls: Type[ModelT], allow_partial: bool = False) -> ModelT:
+    """
+    Parse + validasi dalam satu jalur (tanpa string split berulang / regex greedy).
+    Dengan `allow_partial`, output yang terpotong dipulihkan dan field teks/list yang hilang
+    diisi kosong; field angka yang hilang tetap membuat validasi gagal.
+    """
+    data, repaired = _parse(text, allow_partial)
+    if repaired and isinstance(data, dict):
+        data = fill_missing(model_cls, data)
+    return model_cls.model_validate(data)
+
+
+# Seperti _STRUCTURE_RE plus koma; `"` tunggal = string yang belum selesai di-stream
+_FIELD_RE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|"|[{}\[\],]')
+
+
+class JsonFieldScanner:
+    """
+    Field top-level yang sudah lengkap dari JSON object yang masih di-stream, secara inkremental:
+    scan dilanjutkan dari posisi terakhir dan setiap field hanya di-parse sekali,
+    alih-alih scan ulang seluruh buffer setiap chunk datang.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._field_start = None
+        self.done = False
+
+    def feed(self, chunk: str) -> Dict[str, Any]:
+        self.buffer += chunk
+        completed: Dict[str, Any] = {}
+        text = self.buffer
+        for match in _FIELD_RE.finditer(text, self._pos):
+            token = match.group()
+            if token == '"':
+                # String terpotong di akhir chunk: lanjutkan dari awal string di feed berikutnya
+                self._pos = match.start()
+                return completed
+            if token == "{" or token == "[":
+                self._depth += 1
+                if self._depth == 1:
+                    self._field_start = match.end()
+            elif token == "}" or token == "]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._emit(text[self._field_start:match.start()], completed)
+                    self.done = True
+                    break
+            elif token == "," and self._depth == 1:
+                self._emit(text[self._field_start:match.start()], completed)
+                self._field_start = match.end()
+            # Token string (key / value) tidak mengubah state
+        self._pos = len(text)
+        return completed
+
+    @staticmethod
+    def _emit(segment: str, completed: Dict[str, Any]):
+        if not segment.strip():
+            return
+        try:
+            completed.update(loads("{" + segment + "}"))
+        except ValueError:
+            pass
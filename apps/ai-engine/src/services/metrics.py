@@ -0,0 +1,185 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, Dict, Tuple, List
+
+# Bucket (detik) dari operasi cache lokal sampai panggilan LLM yang lama
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, key)} {value}" for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, key)} {value}" for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+        # key -> [count per bucket..., +Inf count, sum]
+        self._values: Dict[Tuple, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[i] += 1
+        state[-2] += 1
+        state[-1] += value
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, state in self._values.items():
+            for bound, count in zip(self.buckets, state):
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {count}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {state[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {state[-2]}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {round(state[-1], 6)}")
+        return lines
+
+
+_registry: List[_Metric] = []
+
+STAGE_SECONDS = Histogram(
+    "ai_engine_stage_duration_seconds", "Durasi per tahap pemrosesan request", ("stage",))
+GEMINI_QUEUE_SECONDS = Histogram(
+    "ai_engine_gemini_queue_seconds", "Waktu tunggu limiter sebelum panggilan Gemini", ("model",))
+GEMINI_CALL_SECONDS = Histogram(
+    "ai_engine_gemini_call_duration_seconds", "Durasi satu attempt panggilan Gemini",
+    ("model", "attempt", "outcome"))
+GEMINI_TOKENS = Counter(
+    "ai_engine_gemini_tokens_total", "Token Gemini dari usage_metadata", ("model", "type"))
+HTTP_REQUEST_SECONDS = Histogram(
+    "ai_engine_http_request_duration_seconds", "Durasi request HTTP sampai header response dikirim",
+    ("method", "route", "status"))
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Durasi per tahap milik request yang sedang berjalan (untuk header Server-Timing).
+# Tahap yang berjalan paralel (mis. dua panggilan Gemini) dijumlahkan.
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def track_timings():
+    timings: Dict[str, float] = {}
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def bind_timings(timings: Dict[str, float]):
+    """Pasang dict tahap di context komputasi single-flight (dipanggil lewat Context.run)."""
+    _request_timings.set(timings)
+
+
+def merge_timings(timings: Dict[str, float]):
+    """Tambahkan tahap komputasi bersama ke Server-Timing request yang sedang berjalan."""
+    current = _request_timings.get()
+    if current is not None and current is not timings:
+        for stage, seconds in timings.items():
+            current[stage] = current.get(stage, 0.0) + seconds
+
+
+def record_stage(stage: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def span(stage: str):
+    """Catat durasi blok ke histogram per tahap dan ke Server-Timing request aktif (juga jika blok raise)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+def observe_gemini_queue(model: str, seconds: float):
+    GEMINI_QUEUE_SECONDS.observe(seconds, model=model)
+    record_stage("gemini_queue", seconds)
+
+
+def observe_gemini_call(model: str, attempt: int, outcome: str, seconds: float):
+    """`attempt` dimulai dari 0; attempt ke-2 dst dicatat sebagai tahap gemini_retry."""
+    GEMINI_CALL_SECONDS.observe(seconds, model=model, attempt=attempt + 1, outcome=outcome)
+    record_stage("gemini_generate" if attempt == 0 else "gemini_retry", seconds)
+
+
+def server_timing_header(timings: Dict[str, float], total: float) -> str:
+    entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
@@ -0,0 +1,208 @@
+import os
+import re
+from typing import Dict, Any
+
+from src.services.metrics import Counter
+from src.services.cache import SizedLRUCache, hash_parts
+
+# --- KONFIGURASI PROMPT BUDGET ---
+PROMPT_BUDGET = os.getenv("PROMPT_BUDGET", "on").lower() not in ("off", "false", "0")
+# Budget token konten variabel (CV + JD/context) per model; system instruction tidak dihitung
+PROMPT_TOKEN_BUDGET_FAST = int(os.getenv("PROMPT_TOKEN_BUDGET_FAST", "10000"))
+PROMPT_TOKEN_BUDGET_REASONING = int(os.getenv("PROMPT_TOKEN_BUDGET_REASONING", "16000"))
+# Batas JD setelah boilerplate dibuang; sisa budget model untuk CV
+JD_TOKEN_BUDGET = int(os.getenv("JD_TOKEN_BUDGET", "3000"))
+# JD hasil clean_job_description, di-key hash JD mentah (halaman scraping bisa ratusan KB)
+JD_CACHE_MAX_BYTES = int(os.getenv("JD_CACHE_MAX_BYTES", str(4 * 1024 * 1024)))
+# Baris yang lebih pendek dari ini (judul "Responsibilities:", bullet) tidak di-dedup
+DEDUPE_MIN_CHARS = 20
+TRUNCATION_MARKER = " [TRUNCATED]"
+
+PROMPT_TOKENS_REMOVED = Counter(
+    "ai_engine_prompt_tokens_removed_total", "Token (perkiraan lokal) yang dibuang oleh prompt budget", ("kind",))
+
+# Kata dan tanda baca; kata dihitung ~4 karakter per token (subword), tanda baca 1 token
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+# Header yang ditambahkan Jina Reader di atas markdown
+_JINA_HEADER_RE = re.compile(r"^(URL Source|Published Time|Markdown Content|Warning):", re.IGNORECASE)
+_JINA_TITLE_RE = re.compile(r"^Title:\s*", re.IGNORECASE)
+_IMAGE_RE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+# Baris yang isinya hanya link (menu navigasi, footer, tombol "Apply now")
+_LINK_ONLY_RE = re.compile(r"^\s*(?:[*\-+]\s+|\d+\.\s+)?(?:\[[^\]]*\]\([^)]*\)[\s|·•]*)+$")
+_LINK_RE = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+# Cookie banner & teks legal; hanya baris pendek agar paragraf JD yang kebetulan menyebut "privacy" aman
+_LEGAL_RE = re.compile(
+    r"\bcookies?\b|privacy policy|terms of (use|service)|all rights reserved|©|\(c\)\s*\d{4}", re.IGNORECASE)
+_LEGAL_MAX_CHARS = 160
+_RULE_RE = re.compile(r"^\s*([-*_=])\1{2,}\s*$")
+
+
+def estimate_tokens(text: str) -> int:
+    """Perkiraan token lokal (tanpa memanggil count_tokens API), cukup untuk budgeting & cek cache."""
+    if not text:
+        return 0
+    return sum((len(piece) + 3) // 4 for piece in _TOKEN_RE.findall(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Potong teks di batas kata terakhir yang masih muat dalam `max_tokens` (bagian awal dipertahankan)."""
+    if max_tokens <= 0:
+        return ""
+    used = 0
+    for match in _TOKEN_RE.finditer(text):
+        used += (len(match.group()) + 3) // 4
+        if used > max_tokens:
+            return text[:match.start()].rstrip() + TRUNCATION_MARKER
+    return text
+
+
+def dedupe_lines(text: str) -> str:
+    """Buang baris panjang yang berulang di JD (blok yang ter-scrape dua kali). Tidak dipakai untuk CV."""
+    seen = set()
+    lines = []
+    for line in text.splitlines():
+        key = " ".join(line.split()).lower()
+        if len(key) >= DEDUPE_MIN_CHARS:
+            if key in seen:
+                continue
+            seen.add(key)
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def strip_boilerplate(markdown: str) -> str:
+    """
+    Bersihkan markdown hasil scraping: header Jina, navigasi & footer yang isinya link saja,
+    cookie banner, gambar, dan URL di dalam link (teksnya tetap dipakai).
+    """
+    lines = []
+    for line in markdown.splitlines():
+        stripped = line.strip()
+        if _JINA_HEADER_RE.match(stripped) or _RULE_RE.match(stripped):
+            continue
+        if _LINK_ONLY_RE.match(stripped):
+            continue
+        if _LEGAL_RE.search(stripped) and len(stripped) <= _LEGAL_MAX_CHARS:
+            continue
+        line = _JINA_TITLE_RE.sub("", line)
+        line = _LINK_RE.sub(r"\1", _IMAGE_RE.sub("", line))
+        if line.strip() or (lines and lines[-1].strip()):
+            lines.append(line.rstrip())
+    return "\n".join(lines).strip()
+
+
+def strip_jd_boilerplate(markdown: str) -> str:
+    """strip_boilerplate untuk JD hasil scraping (Jina), dengan token yang dibuang dicatat di metrik."""
+    if not PROMPT_BUDGET or not markdown:
+        return markdown
+    cleaned = strip_boilerplate(markdown)
+    PROMPT_TOKENS_REMOVED.inc(max(estimate_tokens(markdown) - estimate_tokens(cleaned), 0), kind="jd")
+    return cleaned
+
+
+class PromptBudgetStats:
+    def __init__(self):
+        self.job_descriptions = 0
+        self.jd_tokens_before = 0
+        self.jd_tokens_after = 0
+        self.jd_truncated = 0
+        self.prompts = 0
+        self.cv_truncated = 0
+        self.cv_tokens_removed = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "enabled": PROMPT_BUDGET,
+            "budgets": dict(_budgets),
+            "jd_budget": JD_TOKEN_BUDGET,
+            "jd_cache": clean_jd_cache.snapshot(),
+            "job_descriptions": self.job_descriptions,
+            "jd_tokens_before": self.jd_tokens_before,
+            "jd_tokens_after": self.jd_tokens_after,
+            "jd_truncated": self.jd_truncated,
+            "prompts": self.prompts,
+            "cv_truncated": self.cv_truncated,
+            "cv_tokens_removed": self.cv_tokens_removed,
+        }
+
+
+prompt_budget_stats = PromptBudgetStats()
+_budgets: Dict[str, int] = {}
+
+
+def configure_budget(model: str, max_tokens: int):
+    _budgets[model] = max_tokens
+
+
+def budget_for(model: str) -> int:
+    return _budgets.get(model, PROMPT_TOKEN_BUDGET_FAST)
+
+
+clean_jd_cache = SizedLRUCache(JD_CACHE_MAX_BYTES)
+
+
+def clean_job_description(job_desc: str) -> str:
+    """
+    Dedup + potong ke JD_TOKEN_BUDGET. Boilerplate halaman hanya dibuang dari JD hasil scraping
+    (strip_jd_boilerplate di scraper): filter cookie/privacy akan memotong requirement asli di JD
+    yang diketik user. Di-memo karena satu JD
+    dipakai berulang (batch ranking, JD yang sama dari banyak user). Cache hanya menyimpan
+    hash JD mentah + JD yang sudah dipotong, dibatasi JD_CACHE_MAX_BYTES.
+    """
+    if not PROMPT_BUDGET or not job_desc or job_desc == "AUTO_DETECT_ROLE":
+        return job_desc
+    key = hash_parts("clean_jd", job_desc)
+    cached = clean_jd_cache.get(key)
+    if cached is not None:
+        return cached
+    before = estimate_tokens(job_desc)
+    cleaned = dedupe_lines(job_desc)
+    if estimate_tokens(cleaned) > JD_TOKEN_BUDGET:
+        cleaned = truncate_to_tokens(cleaned, JD_TOKEN_BUDGET)
+        prompt_budget_stats.jd_truncated += 1
+    after = estimate_tokens(cleaned)
+
+    prompt_budget_stats.job_descriptions += 1
+    prompt_budget_stats.jd_tokens_before += before
+    prompt_budget_stats.jd_tokens_after += after
+    PROMPT_TOKENS_REMOVED.inc(max(before - after, 0), kind="jd")
+    clean_jd_cache.set(key, cleaned, len(cleaned.encode("utf-8")))
+    return cleaned
+
+
+def cv_budget(model: str, reserved_tokens: int = 0) -> int:
+    """Token yang tersisa untuk CV setelah JD / context (`reserved_tokens`) di prompt model ini."""
+    return max(budget_for(model) - reserved_tokens, 0)
+
+
+def fit_cv(clean_cv: str, model: str, reserved_text: str = "") -> str:
+    """Potong CV (sudah disanitasi) agar CV + `reserved_text` muat di budget model."""
+    if not PROMPT_BUDGET:
+        return clean_cv
+    prompt_budget_stats.prompts += 1
+    limit = cv_budget(model, estimate_tokens(reserved_text))
+    tokens = estimate_tokens(clean_cv)
+    if tokens <= limit:
+        return clean_cv
+    trimmed = truncate_to_tokens(clean_cv, limit)
+    removed = tokens - estimate_tokens(trimmed)
+    prompt_budget_stats.cv_truncated += 1
+    prompt_budget_stats.cv_tokens_removed += removed
+    PROMPT_TOKENS_REMOVED.inc(removed, kind="cv")
+    return trimmed
+
+
+def prompt_report(raw_cv: str, raw_jd: str, clean_cv: str, clean_jd: str, model: str) -> Dict[str, int]:
+    """Token sebelum/sesudah budgeting (perkiraan lokal) untuk meta response."""
+    jd_before = 0 if raw_jd == "AUTO_DETECT_ROLE" else estimate_tokens(raw_jd)
+    jd_after = 0 if clean_jd == "AUTO_DETECT_ROLE" else estimate_tokens(clean_jd)
+    cv_after = estimate_tokens(clean_cv)
+    if PROMPT_BUDGET:
+        cv_after = min(cv_after, cv_budget(model, jd_after))
+    return {
+        "cv_tokens_before": estimate_tokens(raw_cv),
+        "cv_tokens_after": cv_after,
+        "jd_tokens_before": jd_before,
+        "jd_tokens_after": jd_after,
+    }
@@ -0,0 +1,173 @@
+import os
+import re
+import time
+import random
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any
+
+# --- KONFIGURASI LIMIT PER MODEL ---
+# Budget terpisah untuk FAST_MODEL dan REASONING_MODEL (lihat ai_engine.py), per replika:
+# dengan beberapa worker web (WEB_CONCURRENCY) budget dibagi rata ke tiap proses
+WEB_CONCURRENCY = max(int(os.getenv("WEB_CONCURRENCY", "1")), 1)
+GEMINI_FAST_CONCURRENCY = int(os.getenv("GEMINI_FAST_CONCURRENCY", "32"))
+GEMINI_FAST_RPM = float(os.getenv("GEMINI_FAST_RPM", "4000"))
+GEMINI_REASONING_CONCURRENCY = int(os.getenv("GEMINI_REASONING_CONCURRENCY", "16"))
+GEMINI_REASONING_RPM = float(os.getenv("GEMINI_REASONING_RPM", "1000"))
+
+# Backoff retry (detik)
+BACKOFF_BASE = float(os.getenv("GEMINI_BACKOFF_BASE", "1"))
+BACKOFF_CAP = float(os.getenv("GEMINI_BACKOFF_CAP", "30"))
+
+
+class ModelLimiter:
+    """
+    Semaphore (maks request paralel) + token bucket (RPM) per model, dengan kontrol adaptif AIMD:
+    setiap 429 menurunkan rate efektif dan menahan semua caller sampai retry-after lewat,
+    setiap sukses menaikkan rate kembali perlahan menuju batas kuota.
+    """
+
+    def __init__(self, model: str, max_concurrency: int, rpm: float):
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_rpm = rpm
+        self.current_rpm = rpm
+        self.min_rpm = max(1.0, rpm * 0.05)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tokens = min(max_concurrency, rpm / 60) or 1.0
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self.waiting = 0
+        self.in_flight = 0
+        self.acquired = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _capacity(self) -> float:
+        # Burst maksimal ~1 detik kuota, minimal 1 token
+        return max(1.0, min(self.max_concurrency, self.current_rpm / 60))
+
+    async def _take_token(self):
+        while True:
+            now = time.monotonic()
+            if now < self._blocked_until:
+                await asyncio.sleep(self._blocked_until - now)
+                continue
+            rate = self.current_rpm / 60
+            self._tokens = min(self._capacity(), self._tokens + (now - self._last_refill) * rate)
+            self._last_refill = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / rate)
+
+    @asynccontextmanager
+    async def acquire(self):
+        start = time.monotonic()
+        self.waiting += 1
+        try:
+            await self._take_token()
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        waited = time.monotonic() - start
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        self.acquired += 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def on_success(self):
+        # Additive increase: pulih ke kuota penuh dalam ~50 request sukses
+        self.current_rpm = min(self.max_rpm, self.current_rpm + self.max_rpm * 0.02)
+
+    def on_throttle(self, retry_after: Optional[float]):
+        # Multiplicative decrease + jeda global agar retry tidak berbarengan (lockstep)
+        self.throttled += 1
+        self.current_rpm = max(self.min_rpm, self.current_rpm * 0.7)
+        if retry_after:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+        self._tokens = min(self._tokens, 0.0)
+
+    @property
+    def pressure(self) -> float:
+        """0 = longgar, >=1 = antrian penuh / rate sedang diturunkan."""
+        queue_pressure = (self.waiting + self.in_flight) / self.max_concurrency
+        rate_pressure = 1 - self.current_rpm / self.max_rpm
+        return round(max(queue_pressure, rate_pressure), 3)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_rpm": self.max_rpm,
+            "current_rpm": round(self.current_rpm, 1),
+            "queue_depth": self.waiting,
+            "in_flight": self.in_flight,
+            "acquired": self.acquired,
+            "throttled": self.throttled,
+            "avg_wait_ms": round(self.total_wait / self.acquired * 1000, 1) if self.acquired else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+            "pressure": self.pressure,
+        }
+
+
+_limiters: Dict[str, ModelLimiter] = {}
+_limits: Dict[str, tuple] = {}
+
+
+def configure_model(model: str, max_concurrency: int, rpm: float):
+    _limits[model] = (max(max_concurrency // WEB_CONCURRENCY, 1), rpm / WEB_CONCURRENCY)
+
+
+def limiter_for(model: str) -> ModelLimiter:
+    limiter = _limiters.get(model)
+    if limiter is None:
+        max_concurrency, rpm = _limits.get(model, (GEMINI_REASONING_CONCURRENCY, GEMINI_REASONING_RPM))
+        limiter = _limiters[model] = ModelLimiter(model, max_concurrency, rpm)
+    return limiter
+
+
+def limiter_snapshot() -> Dict[str, Any]:
+    return {model: limiter.snapshot() for model, limiter in _limiters.items()}
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    return code == 429 or "RESOURCE_EXHAUSTED" in str(error)
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Ambil hint retry-after dari error Gemini (header Retry-After atau RetryInfo.retryDelay)."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers:
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                pass
+
+    details = getattr(error, "details", None)
+    if isinstance(details, dict):
+        details = details.get("error", details).get("details", [])
+    for item in details or []:
+        if isinstance(item, dict) and "retryDelay" in item:
+            match = re.match(r"([\d.]+)s", str(item["retryDelay"]))
+            if match:
+                return float(match.group(1))
+
+    match = re.search(r"retry in ([\d.]+)\s*s", str(error), re.IGNORECASE)
+    return float(match.group(1)) if match else None
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Full-jitter exponential backoff; jika server memberi retry-after, hormati itu + jitter kecil."""
+    if retry_after:
+        return retry_after + random.uniform(0, min(1.0, retry_after * 0.1))
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
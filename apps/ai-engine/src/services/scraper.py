@@ -1,27 +1,104 @@
+import os
+from typing import Optional
+
 import httpx
 from fastapi import HTTPException
 
+from src.services.cache import ResultCache, RESULT_CACHE_BACKEND
+from src.services.singleflight import SingleFlight
+from src.services.metrics import span
+from src.services.prompt_budget import strip_jd_boilerplate
+
+# --- KONFIGURASI SCRAPER ---
+JINA_READER_URL = os.getenv("JINA_READER_URL", "https://r.jina.ai").rstrip("/")
+SCRAPER_CONNECT_TIMEOUT = float(os.getenv("SCRAPER_CONNECT_TIMEOUT", "5"))
+SCRAPER_READ_TIMEOUT = float(os.getenv("SCRAPER_READ_TIMEOUT", "60"))
+SCRAPER_MAX_CONNECTIONS = int(os.getenv("SCRAPER_MAX_CONNECTIONS", "50"))
+JD_CACHE_BACKEND = os.getenv("JD_CACHE_BACKEND", RESULT_CACHE_BACKEND).lower()
+JD_CACHE_TTL = int(os.getenv("JD_CACHE_TTL", "900"))  # 15 menit
+JD_CACHE_MAX_ENTRIES = int(os.getenv("JD_CACHE_MAX_ENTRIES", "256"))
+
+# Client dibuat sekali per proses (lifespan FastAPI) agar koneksi TLS ke Jina dipakai ulang
+_client: Optional[httpx.AsyncClient] = None
+
+jd_cache = ResultCache(JD_CACHE_BACKEND, JD_CACHE_TTL, JD_CACHE_MAX_ENTRIES, prefix="ai-engine:jd:")
+jd_flight = SingleFlight("scrape_job")
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+async def start_client():
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            http2=_http2_available(),
+            limits=httpx.Limits(max_connections=SCRAPER_MAX_CONNECTIONS, max_keepalive_connections=10,
+                                keepalive_expiry=60),
+            timeout=httpx.Timeout(SCRAPER_READ_TIMEOUT, connect=SCRAPER_CONNECT_TIMEOUT),
+        )
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    await jd_cache.close()
+
+
+async def _fetch_job_page(url: str) -> str:
+    if _client is None:
+        await start_client()
+
+    jina_url = f"{JINA_READER_URL}/{url}"
+    try:
+
+        with span("jina_fetch"):
+            response = await _client.get(jina_url)
+
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Jina AI gagal mengambil URL. Status: {response.status_code}"
+            )
+
+
+        # Navigasi, cookie banner, dan footer halaman dibuang sekali di sini (sebelum di-cache);
+        # JD yang diketik user tidak melewati langkah ini
+        text = strip_jd_boilerplate(response.text)
+
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=400, detail=f"Gagal koneksi ke URL: {str(e)}")
+
+    # Hanya konten yang valid yang di-cache; error selalu dicoba ulang oleh request berikutnya
+    if text and text.strip():
+        await jd_cache.set(url, text)
+    return text
+
+
 async def scrape_job_with_jina(url: str) -> str:
     """
     Mengambil konten website menggunakan Jina AI Reader API.
-    Outputnya adalah teks format Markdown yang bersih.
+    Outputnya adalah teks format Markdown yang bersih, tanpa boilerplate halaman.
+    Hasil di-cache per URL (TTL) dan request paralel untuk URL yang sama digabung jadi satu.
     """
-    jina_url = f"https://r.jina.ai/{url}"
-    
-
-    async with httpx.AsyncClient() as client:
-        try:
-           
-            response = await client.get(jina_url, timeout=120)
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"Jina AI gagal mengambil URL. Status: {response.status_code}"
-                )
-            
-           
-            return response.text
-
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=400, detail=f"Gagal koneksi ke URL: {str(e)}")
\ No newline at end of file
+    url = url.strip()
+    cached = await jd_cache.get(url)
+    if cached is not None:
+        return cached
+
+    return await jd_flight.do(url, lambda: _fetch_job_page(url))
+
+
+def scraper_snapshot():
+    return {
+        "http2": _http2_available(),
+        "jd_cache": jd_cache.snapshot(),
+        "coalescing": jd_flight.snapshot(),
+    }
@@ -0,0 +1,85 @@
+import asyncio
+import contextvars
+from typing import Dict, Any, Callable, Awaitable
+
+from src.services.deadlines import (
+    SharedDeadline, bind_deadline, current_deadline, bind_model_fallbacks, merge_model_fallbacks
+)
+from src.services.metrics import bind_timings, merge_timings
+from src.services.usage import TokenUsage, bind_usage, merge_usage
+
+
+class _Flight:
+    def __init__(self):
+        self.task: asyncio.Task = None
+        self.waiters = 0
+        self.deadline = SharedDeadline(current_deadline())
+        self.usage = TokenUsage()
+        self.timings: Dict[str, float] = {}
+        self.model_fallbacks = []
+
+    def bind(self):
+        bind_deadline(self.deadline)
+        bind_usage(self.usage)
+        bind_timings(self.timings)
+        bind_model_fallbacks(self.model_fallbacks)
+
+
+class SingleFlight:
+    """
+    Request coalescing: pemanggil paralel dengan key yang sama menunggu satu komputasi yang sama.
+    Komputasi berjalan sebagai task tersendiri, jadi jika pemanggil pertama dibatalkan
+    (client disconnect) pemanggil lain tetap mendapatkan hasilnya. Jika semua pemanggil sudah
+    pergi, task dibatalkan agar panggilan Gemini yang tidak ditunggu siapa pun tidak memakai kuota.
+    Task berjalan di context sendiri, bukan salinan context pemanggil pertama: deadline-nya adalah
+    deadline terlama di antara penunggu, dan token usage, Server-Timing, serta fallback model-nya
+    digabung ke tiap penunggu.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[str, _Flight] = {}
+        self.executed = 0
+        self.deduplicated = 0
+        self.abandoned = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight()
+            context = contextvars.Context()
+            context.run(flight.bind)
+            flight.task = asyncio.get_running_loop().create_task(fn(), context=context)
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _, key=key, flight=flight: self._forget(key, flight))
+            self.executed += 1
+        else:
+            flight.deadline.extend(current_deadline())
+            self.deduplicated += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Pemanggil terakhir dibatalkan -> hentikan komputasinya; request baru memulai flight baru
+                self._forget(key, flight)
+                flight.task.cancel()
+                self.abandoned += 1
+            elif flight.task.done():
+                merge_usage(flight.usage)
+                merge_timings(flight.timings)
+                merge_model_fallbacks(flight.model_fallbacks)
+
+    def _forget(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._flights),
+            "executed": self.executed,
+            "deduplicated": self.deduplicated,
+            "abandoned": self.abandoned,
+        }
@@ -0,0 +1,240 @@
+import os
+import re
+import time
+import unicodedata
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, FrozenSet
+
+from src.services.metrics import Counter
+
+# --- KONFIGURASI PRE-SCREENING SKILL ---
+PRESCREEN = os.getenv("PRESCREEN", "on").lower() not in ("off", "false", "0")
+# Skor skill lokal (0-100) di bawah ambang ini = jelas tidak cocok dengan JD
+PRESCREEN_THRESHOLD = int(os.getenv("PRESCREEN_THRESHOLD", "20"))
+# Tindakan untuk CV yang jelas tidak cocok: off (hanya skor sementara) | downgrade (FAST_MODEL) | skip (tanpa LLM)
+PRESCREEN_ACTION = os.getenv("PRESCREEN_ACTION", "off").lower()
+PRESCREEN_BATCH_ACTION = os.getenv("PRESCREEN_BATCH_ACTION", "downgrade").lower()
+# JD dengan skill dikenal lebih sedikit dari ini dinilai dari kata kunci saja, dan tidak memicu tindakan
+PRESCREEN_MIN_SKILLS = int(os.getenv("PRESCREEN_MIN_SKILLS", "3"))
+PRESCREEN_ACTIONS = ("off", "downgrade", "skip")
+# Bobot skill dikenal vs kata kunci JD lain pada skor skill sementara
+SKILL_WEIGHT = 0.7
+MAX_LISTED = 10
+
+PRESCREEN_DECISIONS = Counter(
+    "ai_engine_prescreen_total", "Hasil pre-screening skill lokal per tindakan", ("decision",))
+
+# Skill / tools yang dikenali sebagai term utuh (termasuk frasa), dalam bentuk kanonik.
+# Nama yang juga kata umum bahasa Inggris (go, rest, express, excel) sengaja tidak dikenali sendirian.
+KNOWN_SKILLS = frozenset(skill.strip() for skill in """
+python, java, javascript, typescript, golang, rust, c++, c#, php, ruby, kotlin, swift, scala, dart, elixir,
+sql, nosql, bash, html, css, sass, react, angular, vue, svelte, next.js, node.js, django, flask, fastapi,
+spring boot, laravel, rails, .net, graphql, rest api, grpc, websocket, microservices,
+postgresql, mysql, sqlite, mongodb, redis, elasticsearch, cassandra, dynamodb, kafka, rabbitmq, airflow,
+spark, hadoop, dbt, snowflake, bigquery, redshift, tableau, power bi, looker, etl, data warehouse,
+aws, gcp, azure, docker, kubernetes, terraform, ansible, helm, linux, nginx, ci/cd, jenkins, github actions,
+gitlab, git, serverless, devops, sre, observability, prometheus, grafana,
+machine learning, deep learning, nlp, computer vision, tensorflow, pytorch, scikit-learn, pandas, numpy, llm,
+data analysis, data science, statistics, a/b testing,
+figma, ui/ux, seo, sem, crm, salesforce, sap, jira, scrum, agile, kanban,
+unit testing, tdd, selenium, cypress, jest, pytest, android, ios, flutter, react native,
+project management, product management, stakeholder management, leadership, mentoring, communication,
+negotiation, public speaking, problem solving, teamwork,
+accounting, financial analysis, budgeting, auditing, copywriting, content marketing, digital marketing
+""".split(","))
+
+# Bentuk lain -> bentuk kanonik (setelah lowercase)
+SYNONYMS = {
+    "js": "javascript", "ts": "typescript", "py": "python", "cpp": "c++", "csharp": "c#",
+    "nodejs": "node.js", "node": "node.js", "reactjs": "react", "react.js": "react", "vuejs": "vue",
+    "vue.js": "vue", "angularjs": "angular", "nextjs": "next.js", "dotnet": ".net", "asp.net": ".net",
+    "postgres": "postgresql", "postgre": "postgresql", "psql": "postgresql", "mongo": "mongodb",
+    "k8s": "kubernetes", "tf": "terraform", "spring": "spring boot", "sklearn": "scikit-learn",
+    "ml": "machine learning", "dl": "deep learning", "ai/ml": "machine learning", "llms": "llm",
+    "cicd": "ci/cd", "ux": "ui/ux", "ui": "ui/ux", "powerbi": "power bi",
+    "restful": "rest api", "rest apis": "rest api", "restful api": "rest api",
+    "amazon web services": "aws", "google cloud": "gcp", "google cloud platform": "gcp",
+    "microsoft azure": "azure", "continuous integration": "ci/cd", "natural language processing": "nlp",
+    "large language models": "llm", "github action": "github actions",
+    "kepemimpinan": "leadership", "komunikasi": "communication",
+    "manajemen proyek": "project management", "analisis data": "data analysis",
+}
+
+# Kata umum JD / CV (Inggris + Indonesia) yang tidak membedakan kandidat
+STOPWORDS = frozenset("""
+a an and are as at be been but by can for from has have in into is it its of on or our that the their this
+to we will with you your they them who what which when where how all any both each more most other some such
+than too very also about after before over under within without per via etc using use used able must should
+would could may might including include includes well new work working team teams experience experienced
+years year strong good excellent skills skill ability knowledge understanding required requirements
+preferred plus responsibilities responsibility role position job candidate candidates company opportunity
+apply join hiring hire nice looking seeking minimum least degree bachelor related field environment across ensure support
+develop developing development build building design designing maintain manage managing closely help
+yang dan di ke dari untuk dengan dalam pada atau ini itu akan adalah sebagai oleh serta juga memiliki
+mampu pengalaman tahun minimal kemampuan bekerja kerja tim dapat bisa lebih sangat baik mempunyai
+kandidat posisi perusahaan tanggung jawab kualifikasi persyaratan diutamakan menguasai memahami
+""".split())
+
+_TOKEN_RE = re.compile(r"[a-z0-9+#][a-z0-9+#]*(?:[./\-][a-z0-9+#]+)*|\.net\b")
+_MULTIWORD_SYNONYM_RE = re.compile(
+    r"\b(" + "|".join(sorted((re.escape(key) for key in SYNONYMS if " " in key), key=len, reverse=True)) + r")\b")
+_HAS_LETTER_RE = re.compile(r"[a-z]")
+_SKILL_TOKENS = frozenset(token for skill in KNOWN_SKILLS for token in skill.split())
+_MAX_NGRAM = max(len(skill.split()) for skill in KNOWN_SKILLS)
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _MULTIWORD_SYNONYM_RE.sub(lambda match: SYNONYMS[match.group(1)], text)
+
+
+def _stem(token: str) -> str:
+    """Plural sederhana (pipelines -> pipeline), kecuali token skill (kubernetes, analytics tetap)."""
+    if token in _SKILL_TOKENS or len(token) <= 4 or not token.endswith("s") or token.endswith("ss"):
+        return token
+    return token[:-1]
+
+
+# Dibandingkan dengan token yang sudah di-stem (requirements -> requirement)
+_STOPWORDS = frozenset(_stem(word) for word in STOPWORDS)
+
+
+def tokenize(text: str) -> List[str]:
+    """Token kanonik: lowercase, tanpa aksen, sinonim diganti, plural sederhana dibuang."""
+    tokens = []
+    for token in _TOKEN_RE.findall(_normalize(text)):
+        if "/" in token and token not in SYNONYMS and token not in KNOWN_SKILLS:
+            # "python/django" -> dua token; ci/cd, ui/ux, a/b tetap utuh
+            parts = token.split("/")
+        else:
+            parts = [token]
+        for part in parts:
+            canonical = SYNONYMS.get(part, part)
+            tokens.extend(_stem(piece) for piece in canonical.split())
+    return tokens
+
+
+def extract_terms(tokens: List[str]) -> FrozenSet[str]:
+    """Semua unigram + n-gram (sampai panjang frasa skill terpanjang) yang cocok dengan KNOWN_SKILLS."""
+    terms = set(tokens)
+    for size in range(2, _MAX_NGRAM + 1):
+        for i in range(len(tokens) - size + 1):
+            gram = " ".join(tokens[i:i + size])
+            if gram in KNOWN_SKILLS:
+                terms.add(gram)
+    return frozenset(terms)
+
+
+class JobIndex:
+    """Skill dikenal + kata kunci lain dari satu JD, dibangun sekali dan dipakai untuk banyak CV."""
+
+    def __init__(self, job_desc: str):
+        terms = extract_terms(tokenize(job_desc))
+        self.skills = frozenset(term for term in terms if term in KNOWN_SKILLS)
+        # Token yang sudah tercakup frasa skill (mis. "learning" dari "machine learning") tidak dihitung dua kali
+        covered = {token for skill in self.skills for token in skill.split()}
+        self.keywords = frozenset(
+            term for term in terms
+            if " " not in term and term not in _STOPWORDS and term not in covered
+            and len(term) >= 3 and _HAS_LETTER_RE.search(term)
+        )
+
+    @property
+    def decisive(self) -> bool:
+        """Cukup banyak skill dikenal untuk memutuskan skip / downgrade."""
+        return len(self.skills) >= PRESCREEN_MIN_SKILLS
+
+
+@lru_cache(maxsize=128)
+def build_job_index(job_desc: str) -> JobIndex:
+    return JobIndex(job_desc)
+
+
+class SkillMatch:
+    """Skor skill sementara satu CV terhadap JobIndex."""
+
+    def __init__(self, index: JobIndex, cv_terms: FrozenSet[str], elapsed: float):
+        self.matched_skills = index.skills & cv_terms
+        self.missing_skills = index.skills - cv_terms
+        matched_keywords = index.keywords & cv_terms
+        self.skill_coverage = len(self.matched_skills) / len(index.skills) if index.skills else 0.0
+        self.keyword_coverage = len(matched_keywords) / len(index.keywords) if index.keywords else 0.0
+        if index.skills:
+            score = SKILL_WEIGHT * self.skill_coverage + (1 - SKILL_WEIGHT) * self.keyword_coverage
+        else:
+            score = self.keyword_coverage
+        self.skill_score = int(round(score * 100))
+        self.decisive = index.decisive
+        self.jd_skills = len(index.skills)
+        self.jd_keywords = len(index.keywords)
+        self.elapsed = elapsed
+
+    @property
+    def below_threshold(self) -> bool:
+        return self.decisive and self.skill_score < PRESCREEN_THRESHOLD
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "skill_score": self.skill_score,
+            "skill_coverage": round(self.skill_coverage, 3),
+            "keyword_coverage": round(self.keyword_coverage, 3),
+            "matched_skills": sorted(self.matched_skills)[:MAX_LISTED],
+            "missing_skills": sorted(self.missing_skills)[:MAX_LISTED],
+            "jd_skills": self.jd_skills,
+            "jd_keywords": self.jd_keywords,
+            "below_threshold": self.below_threshold,
+            "elapsed_ms": round(self.elapsed * 1000, 2),
+        }
+
+
+class PrescreenStats:
+    def __init__(self):
+        self.scored = 0
+        self.below_threshold = 0
+        self.total_seconds = 0.0
+        self.decisions: Dict[str, int] = {}
+
+    def record_decision(self, decision: str):
+        self.decisions[decision] = self.decisions.get(decision, 0) + 1
+        PRESCREEN_DECISIONS.inc(decision=decision)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "enabled": PRESCREEN,
+            "threshold": PRESCREEN_THRESHOLD,
+            "action": PRESCREEN_ACTION,
+            "batch_action": PRESCREEN_BATCH_ACTION,
+            "scored": self.scored,
+            "below_threshold": self.below_threshold,
+            "avg_ms": round(self.total_seconds / self.scored * 1000, 3) if self.scored else 0.0,
+            "decisions": dict(self.decisions),
+            "job_index_cache": build_job_index.cache_info()._asdict(),
+        }
+
+
+prescreen_stats = PrescreenStats()
+
+
+def prescreen_cv(clean_cv: str, job_desc: str) -> Optional[SkillMatch]:
+    """Skor skill lokal CV vs JD dalam hitungan milidetik; None jika nonaktif atau tanpa JD (auto-detect)."""
+    if not PRESCREEN or not job_desc or job_desc == "AUTO_DETECT_ROLE":
+        return None
+    started = time.perf_counter()
+    index = build_job_index(job_desc)
+    match = SkillMatch(index, extract_terms(tokenize(clean_cv)), 0.0)
+    match.elapsed = time.perf_counter() - started
+
+    prescreen_stats.scored += 1
+    prescreen_stats.total_seconds += match.elapsed
+    if match.below_threshold:
+        prescreen_stats.below_threshold += 1
+    return match
+
+
+def prescreen_action(action: Optional[str], match: Optional[SkillMatch]) -> str:
+    """Tindakan efektif untuk CV ini: downgrade / skip hanya jika jelas di bawah ambang."""
+    action = action if action in PRESCREEN_ACTIONS else "off"
+    if match is None or not match.below_threshold:
+        return "off"
+    return action
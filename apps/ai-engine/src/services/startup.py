@@ -0,0 +1,43 @@
+import os
+import time
+from typing import Optional, Dict, Any
+
+from src.services.metrics import Gauge
+
+STARTUP_SECONDS = Gauge(
+    "ai_engine_startup_seconds", "Durasi import app, startup lifespan, dan warm-up proses ini", ("phase",))
+
+
+class StartupState:
+    """
+    Fase startup proses ini (import -> lifespan -> warm-up) dan status readiness untuk /health.
+    Dengan serve.py, fase import dibayar sekali oleh parent dan ikut ter-fork ke tiap worker.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.phases: Dict[str, float] = {}
+        self.warm_workers = 0
+        self.error: Optional[str] = None
+
+    def record(self, phase: str, started: float):
+        seconds = time.perf_counter() - started
+        self.phases[phase] = seconds
+        STARTUP_SECONDS.set(round(seconds, 4), phase=phase)
+
+    def mark_ready(self):
+        self.ready = True
+        print(f"[startup] pid {os.getpid()} siap: "
+              + ", ".join(f"{phase} {seconds * 1000:.0f} ms" for phase, seconds in self.phases.items()))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "ready": self.ready,
+            "phases_ms": {phase: round(seconds * 1000, 1) for phase, seconds in self.phases.items()},
+            "warm_extraction_workers": self.warm_workers,
+            "error": self.error,
+        }
+
+
+startup_state = StartupState()
@@ -0,0 +1,124 @@
+import os
+import hashlib
+import tempfile
+from typing import Optional, Union, BinaryIO
+
+from fastapi import UploadFile
+
+# --- KONFIGURASI UPLOAD ---
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+# Upload di atas batas ini ditulis ke temp file, bukan ditahan di memori
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(1024 * 1024)))
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(64 * 1024)))
+UPLOAD_TMP_DIR = os.getenv("UPLOAD_TMP_DIR") or None
+
+
+class UploadTooLargeError(ValueError):
+    """Upload melebihi batas ukuran; dihentikan saat streaming, sebelum dibaca penuh."""
+
+
+class StoredUpload:
+    """
+    Upload yang sudah diterima: bytes di memori jika kecil, temp file jika besar.
+    SHA-256 dihitung sambil streaming, jadi cache key tidak perlu membaca ulang isi file.
+    Pemilik wajib memanggil close() agar temp file terhapus.
+    """
+
+    def __init__(self, filename: Optional[str], content_type: Optional[str], max_bytes: int = UPLOAD_MAX_BYTES):
+        self.filename = filename
+        self.content_type = content_type
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.digest = b""
+        self.path: Optional[str] = None
+        self._hash = hashlib.sha256()
+        self._buffer = bytearray()
+        self._data = b""
+        self._file = None
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            self.close()
+            raise UploadTooLargeError(f"File melebihi batas ukuran {self.max_bytes / (1024 * 1024):g} MB.")
+        self._hash.update(chunk)
+        if self._file is None and len(self._buffer) + len(chunk) > UPLOAD_SPOOL_BYTES:
+            self._file = tempfile.NamedTemporaryFile(prefix="ai-engine-upload-", dir=UPLOAD_TMP_DIR, delete=False)
+            self.path = self._file.name
+            self._file.write(self._buffer)
+            self._buffer = bytearray()
+        if self._file is not None:
+            self._file.write(chunk)
+        else:
+            self._buffer += chunk
+
+    def finish(self) -> "StoredUpload":
+        self.digest = self._hash.digest()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        else:
+            self._data = bytes(self._buffer)
+        self._buffer = bytearray()
+        return self
+
+    @property
+    def spooled(self) -> bool:
+        return self.path is not None
+
+    @property
+    def source(self) -> Union[bytes, str]:
+        """Input extractor: path temp file (dibuka langsung di worker, tanpa pickling isi) atau bytes kecil."""
+        return self.path if self.path is not None else self._data
+
+    def read_bytes(self) -> bytes:
+        if self.path is None:
+            return self._data
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.path is not None:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+        self._buffer = bytearray()
+        self._data = b""
+
+    @classmethod
+    def from_stream(cls, stream: BinaryIO, filename: Optional[str], content_type: Optional[str],
+                    max_bytes: int = UPLOAD_MAX_BYTES) -> "StoredUpload":
+        """Versi sinkron receive_upload, mis. untuk member arsip ZIP."""
+        upload = cls(filename, content_type, max_bytes)
+        try:
+            while True:
+                chunk = stream.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                upload.write(chunk)
+        except BaseException:
+            upload.close()
+            raise
+        return upload.finish()
+
+
+async def receive_upload(file: UploadFile, max_bytes: int = UPLOAD_MAX_BYTES) -> StoredUpload:
+    """Baca UploadFile per chunk dengan batas ukuran; file besar langsung di-spool ke disk."""
+    upload = StoredUpload(file.filename, file.content_type, max_bytes)
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            upload.write(chunk)
+    except BaseException:
+        upload.close()
+        raise
+    finally:
+        await file.close()
+    return upload.finish()
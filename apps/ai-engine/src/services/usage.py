@@ -0,0 +1,87 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, Dict, Any
+
+from src.services.metrics import GEMINI_TOKENS
+
+
+class TokenUsage:
+    """Akumulasi usage_metadata Gemini (prompt, cached, output, thinking) untuk satu request / satu model."""
+
+    FIELDS = ("calls", "prompt_tokens", "cached_tokens", "output_tokens", "thoughts_tokens", "total_tokens")
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.output_tokens = 0
+        self.thoughts_tokens = 0
+        self.total_tokens = 0
+
+    def add(self, metadata):
+        self.calls += 1
+        if metadata is None:
+            return
+        self.prompt_tokens += metadata.prompt_token_count or 0
+        self.cached_tokens += metadata.cached_content_token_count or 0
+        self.output_tokens += metadata.candidates_token_count or 0
+        self.thoughts_tokens += metadata.thoughts_token_count or 0
+        self.total_tokens += metadata.total_token_count or 0
+
+    def merge(self, other: "TokenUsage"):
+        for field in self.FIELDS:
+            setattr(self, field, getattr(self, field) + getattr(other, field))
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = {field: getattr(self, field) for field in self.FIELDS}
+        # Porsi prompt yang dibaca dari context cache (ditagih dengan tarif diskon)
+        data["cached_ratio"] = round(self.cached_tokens / self.prompt_tokens, 3) if self.prompt_tokens else 0.0
+        return data
+
+    def header_value(self) -> str:
+        return "; ".join(f"{field}={getattr(self, field)}" for field in self.FIELDS)
+
+
+# Usage milik request yang sedang berjalan. Task anak (gather, hedge) menyalin context, jadi objek
+# yang sama ikut terisi oleh semua panggilan Gemini di bawah request itu. Single-flight berjalan
+# dengan usage sendiri yang digabung ke tiap request penunggunya (merge_usage).
+_request_usage: ContextVar[Optional[TokenUsage]] = ContextVar("request_usage", default=None)
+_model_usage: Dict[str, TokenUsage] = {}
+
+
+@contextmanager
+def track_usage():
+    usage = TokenUsage()
+    token = _request_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _request_usage.reset(token)
+
+
+def bind_usage(usage: TokenUsage):
+    """Pasang accumulator usage di context komputasi single-flight (dipanggil lewat Context.run)."""
+    _request_usage.set(usage)
+
+
+def merge_usage(usage: TokenUsage):
+    """Tambahkan usage komputasi bersama ke request yang sedang berjalan (global per model tidak berubah)."""
+    current = _request_usage.get()
+    if current is not None and current is not usage:
+        current.merge(usage)
+
+
+def record_usage(model: str, metadata):
+    _model_usage.setdefault(model, TokenUsage()).add(metadata)
+    if metadata is not None:
+        GEMINI_TOKENS.inc(metadata.prompt_token_count or 0, model=model, type="prompt")
+        GEMINI_TOKENS.inc(metadata.cached_content_token_count or 0, model=model, type="cached")
+        GEMINI_TOKENS.inc(metadata.candidates_token_count or 0, model=model, type="output")
+        GEMINI_TOKENS.inc(metadata.thoughts_token_count or 0, model=model, type="thoughts")
+    usage = _request_usage.get()
+    if usage is not None:
+        usage.add(metadata)
+
+
+def usage_snapshot() -> Dict[str, Any]:
+    return {model: usage.as_dict() for model, usage in _model_usage.items()}